@@ -0,0 +1,340 @@
+"""
+Автосохранение: журнал изменений с дозаписью + периодический снимок.
+
+В каталоге автосохранения лежат
+    snapshot-<g>.figb   полный документ поколения g (binary_format, без индекса)
+    journal.jsonl       первая строка — заголовок {"generation": g, "ids": [...]}: поколение снимка
+                        и номера его фигур; дальше по записи на строку:
+                          {"op": "add", "id", "row", "item"}  фигура вставлена на позицию row
+                          {"op": "del", "id", "row"}          фигура с позиции row удалена
+                          {"op": "set", "id", "item"}         фигура изменилась (последнее состояние)
+                          {"op": "cmd", "kind", "name"}       выполнена/отменена/повторена команда (метка)
+Фигуры в журнале — по постоянным номерам (id), поэтому изменения одной фигуры можно копить
+и писать одной записью. Запись на диск, сериализация в JSON и сжатие (снимок + журнал -> новый снимок)
+идут в фоновом потоке; в потоке GUI фигуры только переводятся в элементы v1. Заглушки лениво открытого
+.figb в потоке GUI не читаются: в очередь уходит ссылка (документ, строка), а элемент читает фоновый
+поток из своего отображения того же файла.
+Восстановление — снимок плюс записи журнала: время пропорционально изменениям, а не истории.
+"""
+from __future__ import annotations
+import json
+import mmap
+import os
+import queue
+import threading
+import weakref
+from pathlib import Path
+from PyQt6.QtCore import QObject, QStandardPaths, QTimer
+import binary_format
+import factory
+import lazy_document
+from lazy_document import LazyFigure
+from storage import ChangeSet
+
+JOURNAL = "journal.jsonl"
+SNAPSHOT = "snapshot-{}" + binary_format.SUFFIX
+# после стольких записей журнал сжимается в новый снимок
+COMPACT_EVERY = 5000
+# изменения фигур копятся и уходят в журнал не чаще раза в FLUSH_MS
+FLUSH_MS = 500
+
+
+def default_directory() -> str:
+    return os.path.join(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppLocalDataLocation),
+                        "autosave")
+
+
+# --- чтение и воспроизведение (без Qt, годится для фонового потока) ---
+def _apply(order: list, items: dict, records):
+    """Применить записи журнала к состоянию (order — id по z-порядку, items — id -> элемент)."""
+    for rec in records:
+        op = rec["op"]
+        if op == "add":
+            order.insert(rec["row"], rec["id"])
+            items[rec["id"]] = rec["item"]
+        elif op == "del":
+            fid, row = rec["id"], rec["row"]
+            if not (0 <= row < len(order) and order[row] == fid):
+                row = order.index(fid)
+            del order[row]
+            del items[fid]
+        elif op == "set":
+            if rec["id"] in items:
+                items[rec["id"]] = rec["item"]
+
+
+def _read_journal(path: Path) -> tuple[dict, list]:
+    """Заголовок и записи журнала. Недописанная последняя строка (сбой посреди записи) отбрасывается."""
+    with open(path, encoding="utf-8") as fp:
+        header = json.loads(fp.readline())
+        records = []
+        for line in fp:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return header, records
+
+
+def _load_state(directory: Path, header: dict, records) -> tuple[list, dict]:
+    snapshot = directory / SNAPSHOT.format(header["generation"])
+    order = list(header["ids"])
+    items = dict(zip(order, binary_format.decode(snapshot.read_bytes())))
+    if len(items) != len(order):
+        raise RuntimeError(f"Autosave snapshot {snapshot.name} does not match the journal")
+    _apply(order, items, (r for r in records if r["op"] != "cmd"))
+    return order, items
+
+
+def has_recovery(directory: str) -> bool:
+    """В каталоге остались несохранённые изменения (прошлый сеанс не закрылся штатно)."""
+    path = Path(directory) / JOURNAL
+    try:
+        with open(path, encoding="utf-8") as fp:
+            header = json.loads(fp.readline())
+            return bool(header["ids"]) or bool(fp.readline().strip())
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def recover(directory: str) -> list:
+    """Фигуры из снимка и журнала (только дорисованные)."""
+    directory = Path(directory)
+    header, records = _read_journal(directory / JOURNAL)
+    order, items = _load_state(directory, header, records)
+    figures = [factory._from_item(items[fid]) for fid in order]
+    return [f for f in figures if getattr(f, "finished", True) is not False]
+
+
+# --- запись ---
+class _Writer(threading.Thread):
+    """Фоновый поток: дозапись журнала и сжатие. Команды приходят через очередь."""
+    def __init__(self, directory: Path):
+        super().__init__(name="autosave", daemon=True)
+        self.directory = directory
+        self.queue: queue.Queue = queue.Queue()
+        self.failed = False
+        self._fp = None
+        self._generation = 0
+        self._ids: list = []
+        # записи после последнего снимка — для сжатия
+        self._pending: list = []
+        # номер ленивого документа -> binary_format.Document поверх своего mmap
+        self._sources: dict = {}
+
+    def run(self):
+        while True:
+            msg = self.queue.get()
+            if msg[0] == "close":
+                self._close(msg[1])
+                return
+            if self.failed:
+                continue
+            try:
+                if msg[0] == "start":
+                    self._snapshot(msg[1], [self._resolve(item) for item in msg[2]])
+                elif msg[0] == "source":
+                    self._open_source(msg[1], msg[2])
+                elif msg[0] == "drop":
+                    self._drop_source(msg[1])
+                else:
+                    for r in msg[1]:
+                        if "item" in r:
+                            r["item"] = self._resolve(r["item"])
+                    self._append(msg[1])
+            except Exception as e:
+                # автосохранение не должно ронять редактор: сообщаем и выключаемся
+                self.failed = True
+                print(f"Autosave disabled: {e}")
+
+    def _open_source(self, key: int, fp):
+        # файл открыт в потоке GUI (тот же, что у LazyDocument); здесь только отображение
+        with fp:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._sources[key] = binary_format.Document(data), data
+
+    def _drop_source(self, key: int):
+        doc, data = self._sources.pop(key)
+        doc.release()
+        data.close()
+
+    def _resolve(self, item):
+        """Ссылка на строку ленивого документа ("source", строка) -> элемент v1; готовый элемент как есть."""
+        if isinstance(item, tuple):
+            key, row = item
+            item = self._sources[key][0].item(row)
+        return item
+
+    def _snapshot(self, order: list, items: list):
+        """Новый снимок поколения g+1 и пустой журнал к нему; старый снимок удаляется последним."""
+        d = self.directory
+        d.mkdir(parents=True, exist_ok=True)
+        self._generation += 1
+        factory._write(str(d / SNAPSHOT.format(self._generation)), binary_format.encode(items))
+        if self._fp is not None:
+            self._fp.close()
+        # до подмены журнала действует старая пара снимок + журнал
+        header = json.dumps({"generation": self._generation, "ids": order}, separators=(",", ":"))
+        factory._write(str(d / JOURNAL), (header + "\n").encode("utf-8"))
+        self._fp = open(d / JOURNAL, "a", encoding="utf-8")
+        self._ids, self._pending = order, []
+        for p in d.glob(SNAPSHOT.format("*")):
+            if p.name != SNAPSHOT.format(self._generation):
+                p.unlink(missing_ok=True)
+
+    def _append(self, records: list):
+        self._fp.write("".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records))
+        self._fp.flush()
+        self._pending.extend(r for r in records if r["op"] != "cmd")
+        if len(self._pending) >= COMPACT_EVERY:
+            order, items = _load_state(self.directory, {"generation": self._generation, "ids": self._ids},
+                                       self._pending)
+            self._snapshot(order, [items[fid] for fid in order])
+
+    def _close(self, discard: bool):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        for key in list(self._sources):
+            self._drop_source(key)
+        if discard:
+            (self.directory / JOURNAL).unlink(missing_ok=True)
+            for p in self.directory.glob(SNAPSHOT.format("*")):
+                p.unlink(missing_ok=True)
+
+
+class Journal(QObject):
+    """
+    Журнал автосохранения хранилища. Пишет изменения из FigureStorage.changed —
+    так в журнал попадает всё, в том числе правки мимо CommandManager (рисование, стили, буфер обмена);
+    команды CommandManager отмечаются записями "cmd".
+    """
+    def __init__(self, storage, cmd_manager=None, directory: str | None = None, parent=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.cmd_manager = cmd_manager
+        self.directory = Path(directory or default_directory())
+        self._writer: _Writer | None = None
+        # фигура -> постоянный номер в журнале
+        self._ids: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._next_id = 0
+        self._records: list = []
+        # изменённые фигуры (в порядке изменения); их состояние пишется при сбросе
+        self._dirty: dict = {}
+        # ленивый документ -> номер его копии в фоновом потоке (None — файл на диске уже другой)
+        self._sources: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._next_source = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(FLUSH_MS)
+        self._timer.timeout.connect(self.flush)
+
+    def _id(self, figure) -> int:
+        fid = self._ids.get(figure)
+        if fid is None:
+            fid = self._ids[figure] = self._next_id
+            self._next_id += 1
+        return fid
+
+    def start(self):
+        """Снимок текущего документа (поколение 1) и подписка на изменения."""
+        if self._writer is not None:
+            return
+        figures = self.storage.get_all()
+        order = [self._id(f) for f in figures]
+        self._writer = _Writer(self.directory)
+        self._writer.start()
+        items = [self._item(f) for f in figures]
+        self._writer.queue.put(("start", order, items))
+        self.storage.changed.connect(self._on_changes)
+        if self.cmd_manager is not None:
+            self.cmd_manager.applied.connect(self._on_command)
+
+    def _source(self, document: lazy_document.LazyDocument) -> int | None:
+        """Номер копии документа в фоновом потоке; при первом обращении файл открывается заново."""
+        if document in self._sources:
+            return self._sources[document]
+        key = None
+        try:
+            fp = open(document.path, "rb")
+        except OSError:
+            fp = None
+        if fp is not None:
+            if lazy_document._identity(os.fstat(fp.fileno())) == document.identity:
+                key = self._next_source
+                self._next_source += 1
+                self._writer.queue.put(("source", key, fp))
+                weakref.finalize(document, self._drop, key)
+            else:
+                fp.close()
+        self._sources[document] = key
+        return key
+
+    def _drop(self, key: int):
+        if self._writer is not None:
+            self._writer.queue.put(("drop", key))
+
+    def _item(self, figure):
+        """Элемент v1 фигуры или ссылка на него для фонового потока (заглушка ленивого документа)."""
+        if isinstance(figure, LazyFigure):
+            key = self._source(figure.document)
+            if key is not None:
+                return key, figure.row
+        return factory._item(figure)
+
+    def _on_changes(self, cs: ChangeSet):
+        for c in cs.changes:
+            if c.kind == ChangeSet.ADDED:
+                self._records.append({"op": "add", "id": self._id(c.figure), "row": c.row,
+                                      "item": self._item(c.figure)})
+                self._dirty.pop(c.figure, None)
+            elif c.kind == ChangeSet.REMOVED:
+                fid = self._ids.get(c.figure)
+                if fid is not None:
+                    self._records.append({"op": "del", "id": fid, "row": c.row})
+                self._dirty.pop(c.figure, None)
+            elif c.kind == ChangeSet.REPLACED:
+                # заглушка стала настоящей фигурой: номер тот же, содержимое не изменилось
+                fid = self._ids.pop(c.replaced, None)
+                if fid is not None:
+                    self._ids[c.figure] = fid
+            elif c.kind in (ChangeSet.MOVED, ChangeSet.RESTYLED, ChangeSet.REORDERED):
+                self._dirty[c.figure] = None
+        self._schedule()
+
+    def _on_command(self, kind: str, cmd):
+        self._records.append({"op": "cmd", "kind": kind, "name": type(cmd).__name__})
+        self._schedule()
+
+    def _schedule(self):
+        if (self._records or self._dirty) and not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Отдать накопленное фоновому потоку."""
+        self._timer.stop()
+        for f in self._dirty:
+            fid = self._ids.get(f)
+            # дети групп и уже удалённые фигуры отдельно не пишутся
+            if fid is not None and self.storage.index_of(f) is not None:
+                self._records.append({"op": "set", "id": fid, "item": factory._item(f)})
+        self._dirty = {}
+        records, self._records = self._records, []
+        if records and self._writer is not None and not self._writer.failed:
+            self._writer.queue.put(("records", records))
+
+    def close(self, discard: bool = True):
+        """
+        Остановить журнал. discard=True — штатный выход, автосохранение больше не нужно;
+        discard=False — дописать всё и оставить файлы для восстановления.
+        """
+        if self._writer is None:
+            return
+        self.storage.changed.disconnect(self._on_changes)
+        if self.cmd_manager is not None:
+            self.cmd_manager.applied.disconnect(self._on_command)
+        if not discard:
+            self.flush()
+        self._writer.queue.put(("close", discard))
+        self._writer.join()
+        self._writer = None
@@ -0,0 +1,295 @@
+"""
+Двоичный формат документа (.figb) — компактная замена JSON для больших рисунков.
+
+Все числа little-endian:
+    заголовок   magic "FIGB", u16 версия, u16 флаги, u32 стилей, u32 типов, u32 фигур верхнего уровня
+    стили       по 16 байт: pen rgba (4 x u8), brush rgba (4 x u8), i32 pen_width, i32 radius
+    типы        u8 вид записи, имя класса и имена полей (u8/u16 длина + utf-8)
+    записи      u16 тип, u32 стиль, дальше по виду:
+                  FIXED — i32 на каждое поле типа (фиксированная ширина, без имён),
+                  GROUP — u32 число детей, за ним записи детей,
+                  JSON  — u32 длина + элемент целиком в JSON (всё, что не укладывается в i32)
+    индекс      (флаг INDEXED, с версии 2) в конце файла, выровнен на 8 байт:
+                i64 смещение записи каждой фигуры верхнего уровня, затем её bounds — 4 x i32 (x, y, w, h).
+                По нему фигуры можно читать по одной и искать по области, не разбирая весь файл.
+Кодек работает с элементами factory.to_json (v1: "_type", "ess", поля, "figures" у групп),
+так что формат подходит любому зарегистрированному классу.
+"""
+from __future__ import annotations
+import json
+import struct
+import sys
+
+MAGIC = b"FIGB"
+VERSION = 2
+# версии, которые умеем читать (1 — без индекса)
+READ_VERSIONS = (1, 2)
+SUFFIX = ".figb"
+
+# флаги заголовка
+INDEXED = 1
+
+FIXED, GROUP, JSON = range(3)
+NO_STYLE = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<4sHHIII")
+_STYLE = struct.Struct("<8Bii")
+_RECORD = struct.Struct("<HI")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_INDEX_ITEM = 8 + 4 * 4
+HEADER_SIZE = _HEADER.size
+
+_I32_MIN, _I32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def is_binary(head: bytes) -> bool:
+    """Начало файла похоже на .figb."""
+    return head[:len(MAGIC)] == MAGIC
+
+
+def is_indexed(head: bytes) -> bool:
+    """По заголовку: в файле есть индекс (можно открыть лениво)."""
+    if not is_binary(head) or len(head) < _HEADER.size:
+        return False
+    _, version, flags, *_ = _HEADER.unpack_from(head)
+    return version >= 2 and bool(flags & INDEXED)
+
+
+def item_count(head: bytes) -> int:
+    """По заголовку: число фигур верхнего уровня."""
+    return _HEADER.unpack_from(head)[5]
+
+
+def _fits_i32(v) -> bool:
+    return type(v) is int and _I32_MIN <= v <= _I32_MAX
+
+
+class _Encoder:
+    def __init__(self):
+        self.styles: list[tuple] = []
+        self._style_ids: dict[tuple, int] = {}
+        # (вид, имя, поля) -> (номер типа, struct записи)
+        self._types: dict[tuple, tuple[int, struct.Struct]] = {}
+        self.out = bytearray()
+
+    def _style(self, ess: dict | None) -> int:
+        if ess is None:
+            return NO_STYLE
+        key = (*ess["pen_color"], *ess["brush_color"], int(ess["pen_width"]), int(ess["radius"]))
+        sid = self._style_ids.get(key)
+        if sid is None:
+            sid = self._style_ids[key] = len(self.styles)
+            self.styles.append(key)
+        return sid
+
+    def _type(self, kind: int, name: str, fields: tuple) -> tuple[int, struct.Struct]:
+        key = (kind, name, fields)
+        t = self._types.get(key)
+        if t is None:
+            fmt = "<HI" + "i" * len(fields) if kind == FIXED else "<HI"
+            t = self._types[key] = (len(self._types), struct.Struct(fmt))
+        return t
+
+    def item(self, item: dict):
+        name = item["_type"]
+        fields = tuple(k for k in item if k not in ("_type", "ess"))
+        ess = item.get("ess")
+        if fields == ("figures",) and isinstance(item["figures"], list):
+            tid, rec = self._type(GROUP, name, ())
+            self.out += rec.pack(tid, self._style(ess))
+            self.out += _U32.pack(len(item["figures"]))
+            for child in item["figures"]:
+                self.item(child)
+        elif all(_fits_i32(item[k]) for k in fields):
+            tid, rec = self._type(FIXED, name, fields)
+            self.out += rec.pack(tid, self._style(ess), *(item[k] for k in fields))
+        else:
+            tid, rec = self._type(JSON, name, ())
+            data = json.dumps({k: v for k, v in item.items() if k != "_type"}, ensure_ascii=False).encode("utf-8")
+            self.out += rec.pack(tid, NO_STYLE) + _U32.pack(len(data)) + data
+
+    def document(self, n_items: int, offsets: list[int] | None = None, bounds: list | None = None) -> bytes:
+        flags = INDEXED if offsets is not None else 0
+        head = bytearray(_HEADER.pack(MAGIC, VERSION, flags, len(self.styles), len(self._types), n_items))
+        for key in self.styles:
+            head += _STYLE.pack(*key)
+        for kind, name, fields in self._types:
+            head += _U8.pack(kind) + _str16(name) + _U8.pack(len(fields))
+            for f in fields:
+                head += _str8(f)
+        data = head + self.out
+        if offsets is not None:
+            data += bytes(-len(data) % 8)
+            data += struct.pack(f"<{n_items}q", *(len(head) + o for o in offsets))
+            data += struct.pack(f"<{4 * n_items}i", *(v for rect in bounds for v in rect))
+        return bytes(data)
+
+
+def _str8(s: str) -> bytes:
+    b = s.encode("utf-8")
+    return _U8.pack(len(b)) + b
+
+
+def _str16(s: str) -> bytes:
+    b = s.encode("utf-8")
+    return _U16.pack(len(b)) + b
+
+
+def encode(items: list[dict], bounds: list | None = None) -> bytes:
+    """
+    Элементы v1 -> байты документа.
+    bounds — (x, y, w, h) каждого элемента: с ними в файл пишется индекс для ленивого чтения.
+    """
+    if bounds is not None and len(bounds) != len(items):
+        raise ValueError("bounds must have one rect per item")
+    enc = _Encoder()
+    offsets = [] if bounds is not None else None
+    for item in items:
+        if offsets is not None:
+            offsets.append(len(enc.out))
+        enc.item(item)
+    return enc.document(len(items), offsets, bounds)
+
+
+class _Decoder:
+    def __init__(self, data):
+        self.buf = memoryview(data)
+        magic, version, self.flags, n_styles, n_types, self.count = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise RuntimeError("Not a binary figure document")
+        if version not in READ_VERSIONS:
+            raise RuntimeError(f"Unsupported binary document version: {version!r}")
+        if version == 1:
+            self.flags = 0
+        # записи кончаются там, где начинается индекс (если он есть)
+        self.end = len(self.buf) - (self.count * _INDEX_ITEM if self.flags & INDEXED else 0)
+        pos = _HEADER.size
+        # словари стилей общие для всех фигур со стилем: from_dict их только читает
+        self.styles = []
+        for _ in range(n_styles):
+            v = _STYLE.unpack_from(self.buf, pos)
+            pos += _STYLE.size
+            self.styles.append({"pen_color": v[0:4], "brush_color": v[4:8], "pen_width": v[8], "radius": v[9]})
+        self.types = []
+        for _ in range(n_types):
+            kind = self.buf[pos]
+            name, pos = self._str(pos + 1, _U16)
+            n_fields = self.buf[pos]
+            pos += 1
+            fields = []
+            for _ in range(n_fields):
+                f, pos = self._str(pos, _U8)
+                fields.append(f)
+            fmt = "<HI" + "i" * len(fields) if kind == FIXED else "<HI"
+            self.types.append((kind, name, tuple(fields), struct.Struct(fmt)))
+        self.pos = pos
+
+    def _str(self, pos: int, length: struct.Struct) -> tuple[str, int]:
+        (n,) = length.unpack_from(self.buf, pos)
+        pos += length.size
+        return bytes(self.buf[pos:pos + n]).decode("utf-8"), pos + n
+
+    def item(self) -> dict:
+        buf, pos = self.buf, self.pos
+        tid, sid = _RECORD.unpack_from(buf, pos)
+        kind, name, fields, rec = self.types[tid]
+        if kind == FIXED:
+            values = rec.unpack_from(buf, pos)
+            self.pos = pos + rec.size
+            item = dict(zip(fields, values[2:]))
+        elif kind == GROUP:
+            (n,) = _U32.unpack_from(buf, pos + rec.size)
+            self.pos = pos + rec.size + _U32.size
+            item = {"figures": [self.item() for _ in range(n)]}
+        else:
+            (n,) = _U32.unpack_from(buf, pos + rec.size)
+            start = pos + rec.size + _U32.size
+            self.pos = start + n
+            return {"_type": name, **json.loads(bytes(buf[start:start + n]))}
+        item["_type"] = name
+        item["ess"] = None if sid == NO_STYLE else self.styles[sid]
+        return item
+
+
+def iter_items(data):
+    """Элементы v1 верхнего уровня по одному (для потоковой загрузки)."""
+    try:
+        dec = _Decoder(data)
+    except (struct.error, UnicodeDecodeError) as e:
+        raise RuntimeError(f"Malformed binary document: {e}") from e
+    for _ in range(dec.count):
+        try:
+            item = dec.item()
+        except (struct.error, IndexError, ValueError) as e:
+            raise RuntimeError(f"Malformed binary document: {e}") from e
+        yield item
+    if dec.flags & INDEXED and dec.end % 8:
+        raise RuntimeError("Malformed binary document: bad index position")
+    if not 0 <= dec.end - dec.pos < (8 if dec.flags & INDEXED else 1):
+        raise RuntimeError("Malformed binary document: data after the last record")
+
+
+def decode(data) -> list[dict]:
+    """Байты документа -> элементы v1."""
+    return list(iter_items(data))
+
+
+class Document:
+    """
+    Документ с индексом поверх буфера (bytes или mmap): заголовок разбирается сразу,
+    фигуры — по номеру, по требованию. Таблицы индекса — представления буфера, без копирования.
+    """
+    def __init__(self, data):
+        try:
+            self._dec = _Decoder(data)
+        except (struct.error, UnicodeDecodeError) as e:
+            raise RuntimeError(f"Malformed binary document: {e}") from e
+        if not self._dec.flags & INDEXED:
+            raise RuntimeError("Binary document has no index")
+        n, buf = self._dec.count, self._dec.buf
+        start = self._dec.end
+        if start < self._dec.pos or start % 8:
+            raise RuntimeError("Malformed binary document: bad index position")
+        offsets, rects = buf[start:start + 8 * n], buf[start + 8 * n:]
+        if sys.byteorder == "little":
+            self.offsets = offsets.cast("q")
+            self.rects = rects.cast("i")
+        else:
+            self.offsets = struct.unpack(f"<{n}q", offsets)
+            self.rects = struct.unpack(f"<{4 * n}i", rects)
+
+    def __len__(self) -> int:
+        return self._dec.count
+
+    def bounds(self, i: int) -> tuple[int, int, int, int]:
+        r = self.rects
+        return r[4 * i], r[4 * i + 1], r[4 * i + 2], r[4 * i + 3]
+
+    def type_name(self, i: int) -> str:
+        (tid,) = _U16.unpack_from(self._dec.buf, self.offsets[i])
+        return self._dec.types[tid][1]
+
+    def style_id(self, i: int) -> int | None:
+        """Номер стиля фигуры i в палитре файла (None — без стиля)."""
+        tid, sid = _RECORD.unpack_from(self._dec.buf, self.offsets[i])
+        return None if sid == NO_STYLE else sid
+
+    def style(self, sid: int | None) -> dict | None:
+        return None if sid is None else self._dec.styles[sid]
+
+    def item(self, i: int) -> dict:
+        """Элемент v1 фигуры номер i."""
+        self._dec.pos = self.offsets[i]
+        try:
+            return self._dec.item()
+        except (struct.error, IndexError, ValueError) as e:
+            raise RuntimeError(f"Malformed binary document: {e}") from e
+
+    def release(self):
+        """Отпустить представления буфера (иначе mmap нельзя закрыть)."""
+        for view in (self.offsets, self.rects):
+            if isinstance(view, memoryview):
+                view.release()
+        self._dec.buf.release()
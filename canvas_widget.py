@@ -1,12 +1,17 @@
-from PyQt6.QtCore import QRect, Qt, QEvent, QSize, QPoint
-from PyQt6.QtGui import QPainter
+from PyQt6.QtCore import QRect, Qt, QEvent, QSize, QPoint, QTimer
+from PyQt6.QtGui import QPainter, QPixmap
 from PyQt6.QtWidgets import QWidget, QMessageBox, QApplication
 from settings import DrawSettings
 from storage import FigureStorage
+from figures import Figure
 import factory
+import renderer
 from commands import AddCommand, DeleteCommand, MoveCommand  # <- потребуется импорт
 
 class Canvas(QWidget):
+    # перетаскивание применяется не чаще одного раза за кадр (~60 Гц)
+    FRAME_INTERVAL_MS = 16
+
     def __init__(self, settings: DrawSettings, storage: FigureStorage, parent=None):
         super().__init__(parent)
         self.setStyleSheet("background-color: white;")
@@ -19,10 +24,22 @@ class Canvas(QWidget):
         self.storage = storage
         self._last_mouse_pos = None
         self._last_mouse_drag = None
-        self.storage.canvas_updated.connect(self.update)
+        # режим перетаскивания: неподвижные фигуры растеризованы один раз в _static_layer,
+        # на каждом кадре рисуются поверх только _moving (выделенные + их наблюдатели)
+        self._static_layer: QPixmap | None = None
+        self._moving: set = set()
+        # сдвиг, накопленный между кадрами; применяется одним storage.move по таймеру
+        self._pending_dx = 0
+        self._pending_dy = 0
+        self._drag_timer = QTimer(self)
+        self._drag_timer.setInterval(self.FRAME_INTERVAL_MS)
+        self._drag_timer.timeout.connect(self._flush_drag)
+        self.storage.changed.connect(self._on_changes)
 
     # Клавиатура
     def keyPressEvent(self, event):
+        # клавиши меняют сцену — статический слой перестаёт быть актуальным
+        self._end_drag_layer()
         key = event.key()
         if key in (Qt.Key.Key_Delete, Qt.Key.Key_Backspace):
             self.storage.cmd_manager.do(DeleteCommand(self.storage, self.storage.get_selected()))
@@ -64,11 +81,14 @@ class Canvas(QWidget):
             dy = pos.y() - self._last_mouse_pos.y()
             self._last_mouse_pos = pos
 
-            figs = self.storage.get_selected()
-            self.storage.move(figs, dx, dy, bounds=QRect(0, 0, self.settings.csize.width(), self.settings.csize.height()))
+            # не двигаем сразу: копим до следующего кадра
+            self._pending_dx += dx
+            self._pending_dy += dy
+            if not self._drag_timer.isActive():
+                self._drag_timer.start()
         else:
             # только для отображения курсора (нет функциональности)
-            if any(fig.hit_test(pos.x(), pos.y()) for fig in self.storage.get_all()):
+            if self.storage.figure_at(pos.x(), pos.y()) is not None:
                 self.setCursor(Qt.CursorShape.PointingHandCursor)
             else:
                 self.setCursor(Qt.CursorShape.ArrowCursor)
@@ -83,17 +103,18 @@ class Canvas(QWidget):
         self.setFocus(Qt.FocusReason.MouseFocusReason)
 
         mods = event.modifiers()
-        # выбор
-        for fig in reversed(self.storage.get_all()):
-            if fig.hit_test(pos.x(), pos.y()):
-                if mods & Qt.KeyboardModifier.ControlModifier:
-                    self.storage.select_figure(fig)
-                else:
-                    # only selected figure
-                    self.storage.deselect_all()
-                    self.storage.select_figure(fig, state=True)
-                self.update()
-                return
+        # выбор: верхняя фигура под курсором (через пространственный индекс хранилища)
+        fig = self.storage.figure_at(pos.x(), pos.y())
+        if fig is not None:
+            if mods & Qt.KeyboardModifier.ControlModifier:
+                self.storage.select_figure(fig)
+            else:
+                # only selected figure
+                self.storage.deselect_all()
+                self.storage.select_figure(fig, state=True)
+            if self.storage.is_selected(fig):
+                self._begin_drag_layer()
+            return
         if not (mods & Qt.KeyboardModifier.ControlModifier):
             self.storage.deselect_all()
 
@@ -115,6 +136,10 @@ class Canvas(QWidget):
         # Фиксируем завершение перетаскивания: если был сдвиг — создаём команду MoveCommand
         if event.button() != Qt.MouseButton.LeftButton:
             return
+        # довести накопленный сдвиг до конца, иначе MoveCommand разойдётся с фигурами
+        self._flush_drag()
+        self._drag_timer.stop()
+        self._end_drag_layer()
         if self._last_mouse_drag is None:
             return
         
@@ -131,14 +156,73 @@ class Canvas(QWidget):
         self._last_mouse_pos = None
 
 
+    def _flush_drag(self):
+        """Применить сдвиг, накопленный за кадр: один move, одно обновление хранилища."""
+        dx, dy = self._pending_dx, self._pending_dy
+        if dx == 0 and dy == 0:
+            # мышь стоит — таймер больше не нужен до следующего движения
+            self._drag_timer.stop()
+            return
+        self._pending_dx = self._pending_dy = 0
+        figs = self.storage.get_selected()
+        self.storage.move(figs, dx, dy, bounds=QRect(0, 0, self.settings.csize.width(), self.settings.csize.height()))
+
     # Отрисовка
-    def paintEvent(self, _):
+    def _on_changes(self, cs):
+        # при перетаскивании фон валиден, пока меняются только движущиеся фигуры и выделение
+        if self._static_layer is not None and (cs.full or any(
+                c.figure not in self._moving for c in cs.of(cs.ADDED, cs.REMOVED, cs.RESTYLED, cs.REORDERED, cs.MOVED))):
+            self._end_drag_layer()
+        if cs.full:
+            self.update()
+        elif not cs.damage.isNull():
+            self.update(cs.damage)
+
+    def _begin_drag_layer(self):
+        """Растеризовать всё, что не двигается при перетаскивании выделения, в один pixmap."""
+        self._moving = set(self.storage.linked_figures(self.storage.get_selected()))
+        if not self._moving:
+            return
+        dpr = self.devicePixelRatioF()
+        layer = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        layer.setDevicePixelRatio(dpr)
+        layer.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(layer)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # за пределы холста pixmap всё равно не дотянется — берём только видимые фигуры
+        renderer.paint_figures(painter, [f for f in self.storage.figures_in(self.rect()) if f not in self._moving])
+        self.storage.paint_arrows(painter, moving=self._moving, dynamic=False)
+        painter.end()
+        self._static_layer = layer
+
+    def _end_drag_layer(self):
+        if self._static_layer is None:
+            return
+        self._static_layer = None
+        # вернуть честный z-порядок: движущиеся фигуры рисовались поверх всех, остальное в слое верно
+        damage = QRect()
+        for f in self._moving:
+            damage = damage.united(f.bounds())
+        self._moving = set()
+        if not damage.isNull():
+            m = self.storage.DAMAGE_MARGIN
+            self.update(damage.adjusted(-m, -m, m, m))
+
+    def paintEvent(self, event):
         painter = QPainter(self)
-        #отрисовка фигур
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        print(f'{__name__} - paintEvent: всего фигур: {len(self.storage.get_all())}')
-        for fig in self.storage.get_all():
-            fig.draw(painter)
+        if self._static_layer is not None:
+            # перетаскивание: готовый фон + только движущиеся фигуры и их стрелки
+            painter.drawPixmap(0, 0, self._static_layer)
+            moving = [f for f in self.storage.figures_in(event.rect()) if f in self._moving]
+            renderer.paint_figures(painter, moving)
+            self.storage.paint_arrows(painter, moving=self._moving, dynamic=True)
+            painter.end()
+            return
+
+        #отрисовка фигур: только те, что пересекают перерисовываемую область
+        visible = self.storage.figures_in(event.rect())
+        renderer.paint_figures(painter, visible)
         #отрисовка стрелок
         self.storage.paint_arrows(painter)
 
@@ -146,15 +230,12 @@ class Canvas(QWidget):
 
     # ресайз: запрет уменьшения, если не помещаются
     def resizeEvent(self, event):
+        self._end_drag_layer()
         new_size: QSize = event.size()
         w, h = new_size.width(), new_size.height()
-        fits = True
-        for fig in self.storage.get_all():
-            if getattr(fig, "finished", True) is False:
-                continue
-            if not fig.is_fit_in_bounds(QRect(fig.bounds()), QRect(0, 0, w, h)):
-                fits = False
-                break
+        # все фигуры помещаются ⇔ помещается их общий охват (хранилище ведёт его инкрементально)
+        scene = self.storage.scene_rect()
+        fits = scene.isNull() or Figure.is_fit_in_bounds(scene, QRect(0, 0, w, h))
         if not fits:
             # откатываем размер
             self.resize(event.oldSize())
@@ -181,7 +262,6 @@ class Canvas(QWidget):
             # позиционируем фигуру по указанным координатам
             figure.change_position(dx, dy, bounds)
             self.storage.add(figure)
-            self.update()
 
             print("Pasted from clipboard:", data)
         except Exception as e:
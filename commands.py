@@ -18,6 +18,8 @@ class CommandManager(QObject):
     
     undo_count_changed = pyqtSignal(int)
     redo_count_changed = pyqtSignal(int)
+    # ("do" | "undo" | "redo", команда) — после выполнения; на него подписан журнал автосохранения
+    applied = pyqtSignal(str, object)
 
     def do(self, cmd: Command, execute: bool = True):
         if execute:
@@ -34,6 +36,7 @@ class CommandManager(QObject):
         if len(self._undo) > self._limit:
             self._undo.pop(0)
 
+        self.applied.emit("do", cmd)
         self.undo_count_changed.emit(self.undo_count())
         self.redo_count_changed.emit(self.redo_count())
 
@@ -43,6 +46,7 @@ class CommandManager(QObject):
         cmd = self._undo.pop()
         cmd.undo()
         self._redo.append(cmd)
+        self.applied.emit("undo", cmd)
 
         self.undo_count_changed.emit(self.undo_count())
         self.redo_count_changed.emit(self.redo_count())
@@ -53,6 +57,7 @@ class CommandManager(QObject):
         cmd = self._redo.pop()
         cmd.execute()
         self._undo.append(cmd)
+        self.applied.emit("redo", cmd)
 
         self.undo_count_changed.emit(self.undo_count())
         self.redo_count_changed.emit(self.redo_count())
@@ -97,34 +102,26 @@ class DeleteCommand(Command):
         # save original indices for undo
         self.indices = []
         for f in self.figures:
-            try:
-                self.indices.append(self.storage.get_all().index(f))
-            except ValueError:
-                self.indices.append(None)
+            self.indices.append(self.storage.index_of(f))
 
     def execute(self):
         print(f'выполняется команда {self.__class__.__name__}')
-        for f in list(self.figures):
-            try:
-                self.storage.delete(f)
-            except Exception:
-                pass
+        # сверху вниз — так хранилищу не нужно пересчитывать позиции остальных фигур
+        with self.storage.batch():
+            for f in sorted(self.figures, key=lambda f: -(self.storage.index_of(f) or 0)):
+                try:
+                    self.storage.delete(f)
+                except Exception:
+                    pass
 
     def undo(self):
         print(f'отменяется команда {self.__class__.__name__}')
         # вставляем обратно в сохранённые позиции (если возможно), иначе в конец
-        figs = self.storage.get_all()
-        for idx, f in sorted(zip(self.indices, self.figures), key=lambda x: (x[0] is None, x[0] if x[0] is not None else 0)):
-            if f is None:
-                continue
-            if idx is None or idx > len(figs):
-                figs.append(f)
-            else:
-                figs.insert(idx, f)
-        try:
-            self.storage.canvas_updated.emit()
-        except Exception:
-            pass
+        with self.storage.batch():
+            for idx, f in sorted(zip(self.indices, self.figures), key=lambda x: (x[0] is None, x[0] if x[0] is not None else 0)):
+                if f is None:
+                    continue
+                self.storage.insert(idx, f)
 
 class MoveCommand(Command):
     def __init__(self, storage, moves: List[Tuple[Any, int, int]], bounds=None):
@@ -134,13 +131,15 @@ class MoveCommand(Command):
 
     def execute(self):
         print(f'выполняется команда {self.__class__.__name__}')
-        for fig, dx, dy in self.moves:
-            self.storage.move([fig], dx, dy, self.bounds)
+        with self.storage.batch():
+            for fig, dx, dy in self.moves:
+                self.storage.move([fig], dx, dy, self.bounds)
         
     def undo(self):
         print(f'отменяется команда {self.__class__.__name__}')
-        for fig, dx, dy in self.moves:
-            self.storage.move([fig], -dx, -dy, self.bounds)
+        with self.storage.batch():
+            for fig, dx, dy in self.moves:
+                self.storage.move([fig], -dx, -dy, self.bounds)
 
     # def merge(self, other: "MoveCommand"):
     #     # суммируем dx/dy по тем же фигурам
@@ -153,88 +152,64 @@ class MoveCommand(Command):
 
 class GroupCommand(Command):
     def __init__(self, storage, figures: list, ess):
-        if len(figures) < 2:
+        # группируются только фигуры хранилища: у остальных нет позиции, куда вернуть их при undo
+        placed = [(storage.index_of(f), f) for f in figures]
+        placed = [(idx, f) for idx, f in placed if idx is not None]
+        if len(placed) < 2:
             raise ValueError("Нельзя группировать менее двух фигур")
         self.storage = storage
-        self.figures = list(figures)
+        self.figures = [f for _, f in placed]
         self.ess = ess
         self.group = None
         # сохранить индексы порядка
-        self.indices = [self.storage.get_all().index(f) for f in self.figures]
+        self.indices = [idx for idx, _ in placed]
 
     def execute(self):
         print(f'выполняется команда {self.__class__.__name__}')
         from figures import FigureGroup
         # удаляем фигуры и добавляем группу
-        for f in self.figures:
-            try:
-                # удаляем наблюдателей, чтобы не было утечек
-                observers = f.get_observers()
-                for obs in observers:
-                    f.remove_observer(obs)
-                self.storage.get_all().remove(f)
-            except ValueError:
-                pass
-        self.group = FigureGroup(figures=self.figures, ess=self.ess)
-        self.storage.get_all().append(self.group)
-        try:
-            self.storage.canvas_updated.emit()
-        except Exception:
-            pass
+        with self.storage.batch():
+            for f in self.figures:
+                try:
+                    # удаляем наблюдателей, чтобы не было утечек; через хранилище — и из его обратных связей
+                    for obs in list(f.get_observers()):
+                        self.storage._unlink(f, obs)
+                    self.storage.take(f)
+                except ValueError:
+                    pass
+            self.group = FigureGroup(figures=self.figures, ess=self.ess)
+            self.storage.insert(None, self.group)
 
     def undo(self):
         print(f'отменяется команда {self.__class__.__name__}')
-        if self.group and self.group in self.storage.get_all():
-            self.storage.get_all().remove(self.group)
-        # вставляем детей обратно в прежние позиции (ориентируемся на saved indices)
-        figs = self.storage.get_all()
-        for idx, f in sorted(zip(self.indices, self.figures), key=lambda x: x[0]):
-            if idx is None or idx > len(figs):
-                figs.append(f)
-            else:
-                figs.insert(idx, f)
-        try:
-            self.storage.canvas_updated.emit()
-        except Exception:
-            pass
+        with self.storage.batch():
+            if self.group:
+                self.storage.take(self.group)
+            # вставляем детей обратно в прежние позиции (ориентируемся на saved indices)
+            for idx, f in sorted(zip(self.indices, self.figures), key=lambda x: x[0]):
+                self.storage.insert(idx, f)
 
 class UngroupCommand(Command):
     def __init__(self, storage, group):
         self.storage = storage
         self.group = group
         self.children = list(group.figures) if hasattr(group, "figures") else []
-        try:
-            self.index = self.storage.get_all().index(group)
-        except ValueError:
-            self.index = None
+        self.index = self.storage.index_of(group)
 
     def execute(self):
         print(f'выполняется команда {self.__class__.__name__}')
-        if self.group in self.storage.get_all():
-            self.storage.get_all().remove(self.group)
-            # вставляем детей на место группы
-            base_idx = self.index if self.index is not None else len(self.storage.get_all())
-            for i, c in enumerate(self.children):
-                self.storage.get_all().insert(base_idx + i, c)
-        try:
-            self.storage.canvas_updated.emit()
-        except Exception:
-            pass
+        with self.storage.batch():
+            if self.storage.take(self.group):
+                # вставляем детей на место группы
+                base_idx = self.index if self.index is not None else len(self.storage.get_all())
+                for i, c in enumerate(self.children):
+                    self.storage.insert(base_idx + i, c)
 
     def undo(self):
         print(f'отменяется команда {self.__class__.__name__}')
         # убрать детей и вернуть группу
-        for c in self.children:
-            try:
-                self.storage.get_all().remove(c)
-            except ValueError:
-                pass
-        if self.index is None:
-            self.storage.get_all().append(self.group)
-        else:
-            self.storage.get_all().insert(self.index, self.group)
-        try:
-            self.storage.canvas_updated.emit()
-        except Exception:
-            pass
+        with self.storage.batch():
+            for c in self.children:
+                self.storage.take(c)
+            self.storage.insert(self.index, self.group)
 
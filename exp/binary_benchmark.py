@@ -0,0 +1,107 @@
+"""
+JSON против двоичного формата (.figb): проверка совпадения при круговом преобразовании,
+размер файла, время записи и чтения.
+
+    python exp/binary_benchmark.py [число фигур]
+"""
+import os
+import sys
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtGui import QGuiApplication, QColor
+import factory
+import binary_format
+from figures import FigureGroup
+from settings import DrawEssentials
+
+KINDS = ("line", "rectangle", "square", "circle", "ellipse", "triangle", "point")
+
+
+def make_scene(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    styles = [DrawEssentials(pen_color=QColor(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)),
+                             brush_color=QColor(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256), 100),
+                             pen_width=rnd.choice((1, 2, 3)))
+              for _ in range(16)]
+
+    def one():
+        kind, ess = rnd.choice(KINDS), rnd.choice(styles)
+        c = [rnd.randint(-5000, 5000) for _ in range(6)]
+        if kind == "point":
+            return factory.create(kind, c[0], c[1], ess=ess)
+        if kind == "triangle":
+            return factory.create(kind, *c, ess=ess)
+        return factory.create(kind, *c[:4], ess=ess)
+
+    figs = []
+    while len(figs) < n:
+        if rnd.random() < 0.01:
+            # вложенные группы тоже должны переживать круговое преобразование
+            figs.append(FigureGroup([one(), FigureGroup([one(), one()]), one()], ess=rnd.choice(styles)))
+        else:
+            figs.append(one())
+    return figs[:n]
+
+
+def _plain(data):
+    return json.loads(json.dumps(data))
+
+
+def check_roundtrip(figs):
+    """Двоичный формат даёт те же элементы и те же фигуры, что и JSON."""
+    items = factory._document_items(json.loads(factory.to_json(figs)))
+    # цвета JSON читает списками, двоичный формат — кортежами; сравниваем после нормализации
+    assert _plain(binary_format.decode(factory.to_binary(figs))) == items, "элементы не совпали"
+    via_json = [f.to_dict() for f in factory.from_json(factory.to_json(figs))]
+    via_bin = [f.to_dict() for f in factory.from_binary(factory.to_binary(figs))]
+    assert _plain(via_bin) == _plain(via_json), "фигуры не совпали"
+    # то, что не укладывается в i32, уходит в запись JSON и тоже читается обратно
+    odd = [{"_type": "Line", "ess": None, "x1": 2 ** 40, "y1": 1.5, "x2": None, "y2": "текст"}]
+    assert _plain(binary_format.decode(binary_format.encode(odd))) == odd
+    assert binary_format.decode(binary_format.encode([])) == []
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    app = QGuiApplication([])
+    check_roundtrip(make_scene(2_000, seed=2))
+    print("круговое преобразование: ok")
+
+    t_make, figs = timed(lambda: make_scene(n))
+    print(f"{n} фигур (создание {t_make:.1f} с)")
+    with tempfile.TemporaryDirectory() as tmp:
+        p_json, p_bin = os.path.join(tmp, "doc.json"), os.path.join(tmp, "doc" + binary_format.SUFFIX)
+        t_sj, _ = timed(lambda: factory.save(figs, p_json))
+        t_sb, _ = timed(lambda: factory.save_binary(figs, p_bin))
+        s_json, s_bin = os.path.getsize(p_json), os.path.getsize(p_bin)
+        del figs
+        print(f"размер     : JSON {s_json / 1e6:8.1f} МБ   binary {s_bin / 1e6:8.1f} МБ  (x{s_json / s_bin:.1f})")
+        print(f"запись     : JSON {t_sj:8.2f} с    binary {t_sb:8.2f} с   (x{t_sj / t_sb:.1f})")
+
+        t_pj, items = timed(lambda: factory._document_items(json.loads(Path(p_json).read_text(encoding="utf-8"))))
+        del items
+        t_pb, items = timed(lambda: binary_format.decode(Path(p_bin).read_bytes()))
+        del items
+        print(f"разбор     : JSON {t_pj:8.2f} с    binary {t_pb:8.2f} с   (x{t_pj / t_pb:.1f})")
+
+        t_lj, figs = timed(lambda: factory.load(p_json))
+        del figs
+        t_lb, figs = timed(lambda: factory.load(p_bin))
+        print(f"load()     : JSON {t_lj:8.2f} с    binary {t_lb:8.2f} с   (x{t_lj / t_lb:.1f})")
+
+
+if __name__ == "__main__":
+    main()
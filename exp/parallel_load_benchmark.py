@@ -0,0 +1,80 @@
+"""
+Загрузка большого документа: factory.load (один поток) против parallel_load.load
+(разбор в пуле процессов) для JSON и .figb без индекса, плюс проверка совпадения фигур.
+
+    python exp/parallel_load_benchmark.py [число фигур] [процессов через запятую]
+"""
+import os
+import sys
+import json
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtGui import QGuiApplication
+import factory
+import binary_format
+import parallel_load
+from binary_benchmark import make_scene
+
+
+def _dump(figs) -> str:
+    return json.dumps([factory._item(f) for f in figs], sort_keys=True)
+
+
+def check_same(tmp: str):
+    """Параллельная загрузка даёт те же фигуры, что и обычная, во всех форматах."""
+    figs = make_scene(5_000, seed=3)
+    paths = {
+        "json": os.path.join(tmp, "check.json"),
+        "figb": os.path.join(tmp, "check" + binary_format.SUFFIX),
+        "figb v1": os.path.join(tmp, "check-v1" + binary_format.SUFFIX),
+    }
+    factory.save(figs, paths["json"])
+    factory.save_binary(figs, paths["figb"])
+    Path(paths["figb v1"]).write_bytes(binary_format.encode(factory._items(figs)))
+    expected = _dump(figs)
+    for name, path in paths.items():
+        got = parallel_load.load(path, workers=2)
+        assert _dump(got) == expected, f"{name}: фигуры не совпали"
+        # стиль по-прежнему общий: одинаковые стили — один объект
+        assert len({id(f.ess) for f in got}) == len({f.ess for f in got}), f"{name}: стили не интернированы"
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    cpus = os.cpu_count() or 1
+    counts = [int(v) for v in sys.argv[2].split(",")] if len(sys.argv) > 2 else sorted({1, 2, 4, cpus})
+    app = QGuiApplication([])
+    with tempfile.TemporaryDirectory() as tmp:
+        check_same(tmp)
+        print("совпадение с factory.load: ok")
+
+        figs = make_scene(n)
+        p_json = os.path.join(tmp, "doc.json")
+        p_bin = os.path.join(tmp, "doc" + binary_format.SUFFIX)
+        factory.save(figs, p_json)
+        factory.save_binary(figs, p_bin)
+        del figs
+        print(f"{n} фигур, {cpus} ядер")
+        for name, path in (("JSON", p_json), ("figb", p_bin)):
+            t_seq, figs = timed(lambda: factory.load(path))
+            del figs
+            print(f"{name:5} factory.load         : {t_seq:7.2f} с")
+            for workers in counts:
+                t_par, figs = timed(lambda: parallel_load.load(path, workers))
+                del figs
+                print(f"{name:5} parallel_load x{workers:<3}    : {t_par:7.2f} с  (x{t_seq / t_par:.2f})")
+
+
+if __name__ == "__main__":
+    main()
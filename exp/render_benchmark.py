@@ -0,0 +1,110 @@
+"""
+Замер кадра на большой сцене: поштучная отрисовка (Figure.draw / Figure.paint)
+против серийной (renderer.paint_figures), плюс кэш QPicture по видам фигур и для групп —
+по нему выбраны классы с render_cache (figures.Defaults).
+
+    python exp/render_benchmark.py [число фигур] [число стилей]
+"""
+import os
+import sys
+import random
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QImage, QPainter, QColor
+import factory
+import renderer
+from figures import Defaults, FigureGroup
+from settings import DrawEssentials
+
+W, H = 1920, 1080
+KINDS = ("line", "rectangle", "square", "circle", "ellipse", "triangle", "point")
+
+
+def make_scene(n: int, n_styles: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    styles = [DrawEssentials(pen_color=QColor(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)),
+                             brush_color=QColor(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256), 100),
+                             pen_width=rnd.choice((1, 2, 3)))
+              for _ in range(n_styles)]
+    figs = []
+    # фигуры идут сериями: в реальных документах соседние по z фигуры обычно нарисованы одним инструментом
+    while len(figs) < n:
+        kind, ess = rnd.choice(KINDS), rnd.choice(styles)
+        for _ in range(rnd.randint(1, 40)):
+            x, y = rnd.randrange(W), rnd.randrange(H)
+            if kind == "point":
+                f = factory.create(kind, x, y, ess=ess)
+            elif kind == "triangle":
+                f = factory.create(kind, x, y, x + rnd.randint(-30, 30), y + rnd.randint(-30, 30),
+                                   x + rnd.randint(-30, 30), y + rnd.randint(-30, 30), ess=ess)
+            else:
+                f = factory.create(kind, x, y, x + rnd.randint(-30, 30), y + rnd.randint(-30, 30), ess=ess)
+            figs.append(f)
+    return figs[:n]
+
+
+def frame(figs, draw) -> tuple[float, QImage]:
+    img = QImage(W, H, QImage.Format.Format_ARGB32_Premultiplied)
+    img.fill(0xffffffff)
+    painter = QPainter(img)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    t = time.perf_counter()
+    draw(painter, figs)
+    painter.end()
+    return time.perf_counter() - t, img
+
+
+def best_of(figs, draw, repeat: int = 3) -> tuple[float, QImage]:
+    runs = [frame(figs, draw) for _ in range(repeat)]
+    return min(r[0] for r in runs), runs[-1][1]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_styles = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    app = QApplication([])
+    figs = make_scene(n, n_styles)
+    print(f"{n} фигур, {n_styles} стилей, кадр {W}x{H}")
+
+    def per_figure_draw(p, fs):
+        for f in fs:
+            f.draw(p)
+
+    def per_figure_paint(p, fs):
+        for f in fs:
+            f.paint(p)
+
+    t_draw, img_draw = best_of(figs, per_figure_draw)
+    # кэш QPicture по умолчанию выключен; для замера включаем
+    Defaults.RENDER_CACHE = True
+    t_paint, _ = best_of(figs, per_figure_paint)
+    Defaults.RENDER_CACHE = False
+    t_batch, img_batch = best_of(figs, renderer.paint_figures)
+    print(f"Figure.draw        : {t_draw * 1000:8.1f} мс")
+    print(f"Figure.paint (кэш) : {t_paint * 1000:8.1f} мс")
+    print(f"paint_figures      : {t_batch * 1000:8.1f} мс  (x{t_draw / t_batch:.2f} к draw)")
+    print("картинка совпадает с поштучной:", img_draw == img_batch)
+
+    # кэш QPicture отдельно по видам: draw() против повторного paint() с уже записанной картинкой
+    Defaults.RENDER_CACHE = True
+    by_kind = {}
+    for f in figs:
+        by_kind.setdefault(type(f).__name__, []).append(f)
+    groups = {size: [FigureGroup(figs[i:i + size]) for i in range(0, min(len(figs), 50 * size), size)]
+              for size in (2, 10, 50)}
+    cases = list(by_kind.items()) + [(f"группы по {size}", gs) for size, gs in groups.items()]
+    for name, fs in cases:
+        t_draw, _ = best_of(fs, per_figure_draw)
+        best_of(fs, per_figure_paint, repeat=1)
+        t_paint, _ = best_of(fs, per_figure_paint)
+        print(f"  {name:14s}: draw {t_draw * 1000:7.1f} мс, кэш {t_paint * 1000:7.1f} мс (x{t_draw / t_paint:.2f})")
+    Defaults.RENDER_CACHE = False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Память и массовые операции: список обычных фигур против SceneStore (колонки array + общие Style).
+Память меряется приростом RSS в отдельном процессе на каждый вариант — QObject живут в C++,
+tracemalloc их не видит.
+
+    python exp/scene_store_benchmark.py [число фигур]
+"""
+import os
+import sys
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QGuiApplication
+import factory
+from figures import FigureGroup
+from scene_store import SceneStore
+from binary_benchmark import make_scene
+
+
+def _rss() -> int:
+    # текущий RSS (Linux); где /proc нет — пиковый из getrusage
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _primitives(n: int) -> list:
+    # SceneStore хранит только примитивы
+    return [f for f in make_scene(n) if not isinstance(f, FigureGroup)]
+
+
+def measure(variant: str, path: str) -> int:
+    """Прирост RSS от документа path, загруженного как variant ("figures" или "store")."""
+    app = QGuiApplication([])
+    before = _rss()
+    if variant == "figures":
+        keep = factory.load(path)
+    else:
+        # элементы читаются порциями (как в factory.iter_load) и сразу ложатся в колонки
+        keep = SceneStore()
+        with open(path, encoding="utf-8") as fp:
+            for item in factory._iter_document_items(fp):
+                keep.add_dict(item)
+    return _rss() - before
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t, result
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--measure":
+        print(measure(sys.argv[2], sys.argv[3]))
+        return
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    app = QGuiApplication([])
+    figs = _primitives(n)
+    n = len(figs)
+    mem = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scene.json")
+        factory.save(figs, path)
+        for variant in ("figures", "store"):
+            out = subprocess.run([sys.executable, __file__, "--measure", variant, path],
+                                 capture_output=True, text=True, check=True).stdout
+            mem[variant] = int(out.split()[-1])
+    print(f"{n} примитивов")
+    print(f"память, фигуры     : {mem['figures'] / n:8.0f} байт/фигуру")
+    print(f"память, SceneStore : {mem['store'] / n:8.0f} байт/фигуру  (x{mem['figures'] / max(1, mem['store']):.1f})")
+
+    store = SceneStore.from_figures(figs)
+    print(f"колонки SceneStore : {store.nbytes() / len(store):8.0f} байт/строку, стилей {len(store.styles)}")
+    area = QRect(-100_000, -100_000, 200_000, 200_000)
+    t_fig, _ = timed(lambda: [f.change_position(3, 4, area) for f in figs])
+    t_store, _ = timed(lambda: store.translate(3, 4))
+    print(f"сдвиг всех        : фигуры {t_fig * 1000:8.1f} мс, SceneStore.translate {t_store * 1000:8.1f} мс")
+    # точка вне сцены: перебору приходится проверить все фигуры
+    t_fig, _ = timed(lambda: next((f for f in reversed(figs) if f.hit_test(10 ** 6, 10 ** 6)), None))
+    t_store, _ = timed(lambda: store.topmost_at(10 ** 6, 10 ** 6))
+    print(f"hit-test точки    : перебор {t_fig * 1000:8.1f} мс, SceneStore.topmost_at {t_store * 1000:8.1f} мс")
+    # поштучное чтение через ShapeHandle — по колонкам, без фигуры на строку
+    t_fig, _ = timed(lambda: [f.bounds() for f in figs])
+    t_store, _ = timed(lambda: [h.bounds() for h in store])
+    print(f"bounds по одной   : фигуры {t_fig * 1000:8.1f} мс, ShapeHandle.bounds {t_store * 1000:8.1f} мс")
+    t_store, _ = timed(lambda: [h.to_dict() for h in store])
+    print(f"to_dict по одной  : ShapeHandle.to_dict {t_store * 1000:8.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
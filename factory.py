@@ -1,12 +1,52 @@
 import json
+import os
+import re
 import importlib
 from importlib import util, machinery
 from pathlib import Path
 from typing import Any
 import enum
+import binary_format
 
 # Не импортируем figures на уровне модуля — чтобы избежать цикличного импорта.
 _registry: dict[str, type] | None = None
+# обратный индекс: имя класса ("_type" в документе) -> класс; перестраивается при изменении реестра
+_classes: dict[str, type] = {}
+
+# Формат документа:
+#   v1 — список фигур, у каждой полный словарь "ess";
+#   v2 — {"version": 2, "styles": [...], "figures": [...]}, у фигур "style" — индекс в палитре.
+FORMAT_VERSION = 2
+
+# потоковая загрузка: сколько фигур отдавать за раз и по сколько символов читать файл
+LOAD_CHUNK = 1000
+_READ_SIZE = 1 << 16
+
+
+class Cancelled(Exception):
+    """Фоновое сохранение/загрузка отменены (см. file_tasks)."""
+
+
+class _Tracked(list):
+    """
+    Список элементов, который при обходе сообщает прогресс и проверяет отмену.
+    Его обходят сами json и binary_format, так что прогресс идёт по мере сериализации.
+    """
+    def __init__(self, items, progress=None, cancelled=None, step: int = LOAD_CHUNK):
+        super().__init__(items)
+        self._progress, self._cancelled, self._step = progress, cancelled, step
+
+    def __iter__(self):
+        total = len(self)
+        for i, item in enumerate(super().__iter__()):
+            if i % self._step == 0:
+                if self._cancelled is not None and self._cancelled():
+                    raise Cancelled()
+                if self._progress is not None:
+                    self._progress(i, total)
+            yield item
+        if self._progress is not None:
+            self._progress(total, total)
 
 def _ensure_registry():
     """Инициализация реестра при первом обращении (ленивая загрузка figures)."""
@@ -25,6 +65,13 @@ def _ensure_registry():
             'FigureGroup': figures.FigureGroup,
         }
         _registry = dict(TOOLS)
+        _reindex()
+
+def _reindex():
+    # при совпадении имён побеждает первый зарегистрированный класс — как при прежнем поиске перебором
+    _classes.clear()
+    for cls in _registry.values():
+        _classes.setdefault(cls.__name__, cls)
 
 def create(tool_name: str, x: int = None, y: int = None, *args: Any, ess=None, **kwargs: Any):
     _ensure_registry()
@@ -36,76 +83,322 @@ def create(tool_name: str, x: int = None, y: int = None, *args: Any, ess=None, *
 def register(name: str, cls: type):
     _ensure_registry()
     _registry[name] = cls
+    _reindex()
 
 def unregister(name: str):
     _ensure_registry()
-    _registry.pop(name, None)
+    if _registry.pop(name, None) is not None:
+        _reindex()
 
 def list_tools():
     _ensure_registry()
     return list(_registry.keys())
 
 def to_json(figures_list: list) -> json:
+    return json.dumps(_pack_document(_items(figures_list)), indent=4, ensure_ascii=False)
+
+def to_binary(figures_list: list) -> bytes:
+    """Документ в двоичном формате binary_format (.figb) с индексом bounds для ленивого открытия."""
+    return binary_format.encode(*snapshot(figures_list, binary=True))
+
+def _items(figures_list: list) -> list:
+    """Фигуры -> элементы v1 ({**to_dict(), "_type": имя класса})."""
     _ensure_registry()
-    data = []
-    for f in figures_list:
-        # пропускаем незаконченные фигуры
-        if getattr(f, "finished", True) is False:
-            continue
+    # пропускаем незаконченные фигуры
+    return [_item(f) for f in figures_list if getattr(f, "finished", True) is not False]
 
-        ser = getattr(f, "to_dict", None)
-        if not callable(ser):
-            raise RuntimeError(f"Figure {f!r} must implement to_dict()")
+def _item(f) -> dict:
+    """Фигура -> элемент v1."""
+    ser = getattr(f, "to_dict", None)
+    if not callable(ser):
+        raise RuntimeError(f"Figure {f!r} must implement to_dict()")
+    # у строк ленивого документа (lazy_document.LazyFigure) имя настоящего класса в type_name
+    return {**ser(), "_type": getattr(f, "type_name", f.__class__.__name__)}
 
-        item = {**ser(), "_type": f.__class__.__name__}
-        data.append(item)
 
-    return json.dumps(data, indent=4, ensure_ascii=False)
+def _pack_document(items: list) -> dict:
+    """v1-элементы -> документ v2: одинаковые "ess" выносятся в общую палитру styles."""
+    styles: list = []
+    index: dict = {}
+
+    def pack(item: dict) -> dict:
+        item = dict(item)
+        if "ess" in item:
+            ess = item.pop("ess")
+            key = json.dumps(ess, sort_keys=True)
+            if key not in index:
+                index[key] = len(styles)
+                styles.append(ess)
+            item["style"] = index[key]
+        if isinstance(item.get("figures"), list):
+            item["figures"] = [pack(child) for child in item["figures"]]
+        return item
+
+    figures = [pack(item) for item in items]
+    return {"version": FORMAT_VERSION, "styles": styles, "figures": figures}
+
+def _document_items(data) -> list:
+    """Разобранный JSON любого поддерживаемого формата -> список элементов v1 (с "ess")."""
+    if isinstance(data, list):
+        return data
+    version = data.get("version") if isinstance(data, dict) else None
+    if version != FORMAT_VERSION:
+        raise RuntimeError(f"Unsupported document version: {version!r}")
+    styles = data.get("styles", [])
+    return [_unpack_item(item, styles) for item in data.get("figures", [])]
+
+def _unpack_item(item: dict, styles: list) -> dict:
+    """Элемент v2 -> v1: индекс "style" заменяется словарём из палитры (рекурсивно для групп)."""
+    if "style" in item:
+        item["ess"] = styles[item.pop("style")]
+    if isinstance(item.get("figures"), list):
+        item["figures"] = [_unpack_item(child, styles) for child in item["figures"]]
+    return item
+
+def _from_item(item: dict):
+    """Элемент v1 -> фигура."""
+    t = item.pop("_type", None)
+    if t is None:
+        raise RuntimeError("Missing _type in serialized item")
+
+    cls = _find_class_by_name(t)
+    if cls is None:
+        raise RuntimeError(f"No registered class for type {t}")
+
+    cls_func = getattr(cls, "from_dict", None)
+    if not callable(cls_func):
+        raise RuntimeError(f"{cls} must implement from_dict(dict) -> instance")
+    return cls.from_dict(item)
 
 def from_json(json_string: str) -> list:
     _ensure_registry()
-    data = json.loads(json_string)
-    result = []
-    for item in data:
-        t = item.pop("_type", None)
-        if t is None:
-            raise RuntimeError("Missing _type in serialized item")
-
-        cls = _find_class_by_name(t)
-        if cls is None:
-            raise RuntimeError(f"No registered class for type {t}")
-
-        cls_func = getattr(cls, "from_dict", None)
-        if not callable(cls_func):
-            raise RuntimeError(f"{cls} must implement from_dict(dict) -> instance")
-        inst = cls.from_dict(item)
-        result.append(inst)
-    return result
+    return [_from_item(item) for item in _document_items(json.loads(json_string))]
+
+def from_binary(data: bytes) -> list:
+    _ensure_registry()
+    return [_from_item(item) for item in binary_format.iter_items(data)]
+
+
+class _JsonStream:
+    """
+    Последовательное чтение JSON из файла: в памяти только текущий кусок текста.
+    Значения разбираются json.JSONDecoder.raw_decode, сами массивы/объекты верхнего уровня — вручную.
+    """
+    _WS = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.buf = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        # читаем не меньше, чем уже в буфере: длинный элемент дочитывается за O(log n) попыток
+        chunk = self.fp.read(max(_READ_SIZE, len(self.buf) - self.pos))
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Следующий значимый символ ("" в конце файла), позиция встаёт на него."""
+        while True:
+            self.pos = self._WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, ch: str):
+        got = self.peek()
+        if got != ch:
+            raise RuntimeError(f"Malformed document: expected {ch!r}, got {got or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # число на границе буфера могло оборваться — дочитываем и разбираем заново
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def end(self):
+        if self.peek():
+            raise RuntimeError("Malformed document: data after the end")
+
+    def array(self):
+        """Элементы массива по одному."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            sep = self.peek()
+            self.pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise RuntimeError(f"Malformed document: expected ',' or ']', got {sep or 'end of file'!r}")
+
+    def members(self):
+        """Ключи объекта по одному; значение читает вызывающий (value() или array())."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            sep = self.peek()
+            self.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise RuntimeError(f"Malformed document: expected ',' or '}}', got {sep or 'end of file'!r}")
+
+def _iter_document_items(fp):
+    """Потоковый аналог _document_items: элементы v1 по одному, не разбирая файл целиком."""
+    stream = _JsonStream(fp)
+    if stream.peek() == "[":
+        yield from stream.array()
+        stream.end()
+        return
+    doc = {}
+    for key in stream.members():
+        if key == "figures" and doc.get("version") == FORMAT_VERSION and "styles" in doc:
+            # to_json пишет version и styles раньше figures — фигуры можно отдавать сразу
+            for item in stream.array():
+                yield _unpack_item(item, doc["styles"])
+            doc["figures"] = []
+        else:
+            doc[key] = stream.value()
+    stream.end()
+    # чужой порядок ключей: оставшиеся фигуры проверяем и отдаём после разбора всего объекта
+    yield from _document_items(doc)
+
+def iter_load(path: str, chunk_size: int = LOAD_CHUNK, lazy: bool = False, progress=None):
+    """
+    Потоковая загрузка: фигуры отдаются списками до chunk_size штук по мере чтения файла,
+    так что весь текст и весь разобранный JSON в памяти одновременно не держатся.
+    Формат (JSON или двоичный) определяется по началу файла.
+    lazy=True — для двоичного файла с индексом отдаются строки индекса LazyFigure (см. open_lazy).
+    progress(done, total) вызывается перед выдачей каждой порции (единицы — фигуры или байты файла).
+    """
+    _ensure_registry()
+    report = progress or (lambda done, total: None)
+    with open(path, "rb") as fp:
+        head = fp.read(binary_format.HEADER_SIZE)
+    binary = binary_format.is_binary(head)
+    if binary and lazy and binary_format.is_indexed(head):
+        doc = open_lazy(path)
+        for start in range(0, len(doc), chunk_size):
+            stop = min(start + chunk_size, len(doc))
+            chunk = doc.proxies(start, stop)
+            report(stop, len(doc))
+            yield chunk
+        return
+    if binary:
+        items = binary_format.iter_items(Path(path).read_bytes())
+        done, total = 0, binary_format.item_count(head)
+        for chunk in _chunks(items, chunk_size):
+            done += len(chunk)
+            report(done, total)
+            yield chunk
+        return
+    with open(path, encoding="utf-8") as fp:
+        total = os.fstat(fp.fileno()).st_size
+        for chunk in _chunks(_iter_document_items(fp), chunk_size):
+            # сколько байт уже прочитано из файла (с точностью до буфера)
+            report(fp.buffer.tell(), total)
+            yield chunk
+
+def _chunks(items, chunk_size: int):
+    chunk = []
+    for item in items:
+        chunk.append(_from_item(item))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 def save(figures_list: list, path: str) -> None:
+    write_snapshot(*snapshot(figures_list), path)
+
+def save_binary(figures_list: list, path: str) -> None:
+    write_snapshot(*snapshot(figures_list, binary=True), path, binary=True)
+
+def snapshot(figures_list: list, binary: bool = False) -> tuple[list, list | None]:
+    """
+    Данные документа без ссылок на фигуры: элементы v1 и (для двоичного формата) bounds.
+    Снимается в потоке GUI; write_snapshot потом можно выполнить в любом потоке.
+    """
     _ensure_registry()
-    data = to_json(figures_list)
+    figs = [f for f in figures_list if getattr(f, "finished", True) is not False]
+    bounds = [(b.x(), b.y(), b.width(), b.height()) for b in (f.bounds() for f in figs)] if binary else None
+    return _items(figs), bounds
+
+def write_snapshot(items: list, bounds: list | None, path: str, binary: bool = False,
+                   progress=None, cancelled=None) -> None:
+    """
+    Записать снимок (см. snapshot) в path: JSON v2 или двоичный формат.
+    progress(done, total) — по фигурам; cancelled() -> True прерывает запись исключением Cancelled,
+    старый файл при этом не трогается.
+    """
+    if binary:
+        _write(path, binary_format.encode(_Tracked(items, progress, cancelled), bounds))
+        return
+    doc = _pack_document(items)
+    doc["figures"] = _Tracked(doc["figures"], progress, cancelled)
+    # с indent json кодирует на Python и обходит список сам — текст пишется кусками по ходу обхода
+    _write_text(path, json.JSONEncoder(indent=4, ensure_ascii=False).iterencode(doc))
 
+def _write(path: str, data: bytes) -> None:
+    # пишем во временный файл и подменяем — при сбое старый документ остаётся целым
     tmp = Path(path + ".tmp")
     if tmp.parent and not tmp.parent.exists():
         tmp.parent.mkdir(parents=True, exist_ok=True)
-    tmp.write_text(data, encoding="utf-8")
+    tmp.write_bytes(data)
+    tmp.replace(Path(path))
+
+def _write_text(path: str, chunks) -> None:
+    # как _write, но текст приходит кусками; при ошибке/отмене недописанный файл удаляется
+    tmp = Path(path + ".tmp")
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(tmp, "w", encoding="utf-8") as fp:
+            fp.writelines(chunks)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
     tmp.replace(Path(path))
 
 def load(path: str) -> list:
+    """Загрузить документ; JSON (v1/v2) и двоичный формат различаются автоматически."""
+    return [f for chunk in iter_load(path) for f in chunk]
+
+def load_binary(path: str) -> list:
+    return from_binary(Path(path).read_bytes())
+
+def open_lazy(path: str):
+    """Открыть .figb с индексом через mmap; фигуры — doc.proxies() (строятся по требованию)."""
     _ensure_registry()
-    text = Path(path).read_text(encoding="utf-8")
-    figures = from_json(text)
-    
-    return figures
+    import lazy_document  # локальный импорт — lazy_document сам импортирует factory и figures
+    return lazy_document.LazyDocument(path)
 
 def _find_class_by_name(name: str):
     _ensure_registry()
-    # ищем по имени класса в реестре
-    for cls in _registry.values():
-        if cls.__name__ == name:
-            return cls
-    return None
+    # O(1): на загрузке вызывается для каждой фигуры
+    return _classes.get(name) if isinstance(name, str) else None
 
 
 # def load_plugins(folder: str):
@@ -1,98 +1,158 @@
 from __future__ import annotations
-from math import hypot, atan2, sin, cos, pi
+import weakref
+from math import hypot, atan2, sin, cos, pi, ceil
 from typing import Any
 from PyQt6.QtCore import QRect, QPoint
-from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPolygon
+from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPolygon, QPicture
 from PyQt6.QtCore import QObject, Qt
 from settings import DrawEssentials, ArrowTools
 from factory import _find_class_by_name
 from observer import Object, Observer, Event
+from styles import Style, STYLES, dash_pen
+from schema import Schema, attr, coords, _ess_to_dict, _ess_from_dict
 
 class Defaults:
     ARROW_WIDTH = 2
     ARROW_COLOR = QColor(255, 151, 0)
+    # кэшировать отрисовку в QPicture (Figure.paint) у всех фигур; False — только у классов с render_cache.
+    # Примитивам кэш не выгоден: воспроизведение QPicture медленнее прямого draw() (в 1.1–2 раза),
+    # группам из 10+ фигур — выгоден на 15–25%: один drawPicture вместо draw() каждого ребёнка (exp/render_benchmark)
+    RENDER_CACHE = False
 
-def _ess_to_dict(ess: DrawEssentials | None) -> dict[str, any] | None:
-    if not isinstance(ess, DrawEssentials):
-        return None
-    pc = ess.pen_color
-    bc = ess.brush_color
-    return {
-        "pen_color": (pc.red(), pc.green(), pc.blue(), pc.alpha()),
-        "brush_color": (bc.red(), bc.green(), bc.blue(), bc.alpha()),
-        "pen_width": ess.pen_width,
-        "radius": ess.radius
-    }
-
-def _ess_from_dict(d) -> DrawEssentials:
-    if not d:
-        return DrawEssentials()
-    pc = d.get("pen_color", (0,0,0,255))
-    bc = d.get("brush_color", (255,255,255,100))
-    ess = DrawEssentials()
-    ess.pen_color = QColor(pc[0], pc[1], pc[2], pc[3])
-    ess.brush_color = QColor(bc[0], bc[1], bc[2], bc[3])
-    ess.pen_width = int(d.get("pen_width", ess.pen_width))
-    ess.radius = int(d.get("radius", ess.radius))
-    return ess
+    _arrow_key = None
+    _arrow_pen: QPen | None = None
+    _arrow_brush: QBrush | None = None
+
+    @classmethod
+    def arrow_tools(cls) -> tuple[QPen, QBrush]:
+        """Перо и кисть стрелок; пересоздаются, только если поменяли ARROW_COLOR/ARROW_WIDTH."""
+        key = (cls.ARROW_COLOR.rgba(), cls.ARROW_WIDTH)
+        if key != cls._arrow_key:
+            pen = QPen(cls.ARROW_COLOR, cls.ARROW_WIDTH)
+            pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+            cls._arrow_pen, cls._arrow_brush, cls._arrow_key = pen, QBrush(cls.ARROW_COLOR), key
+        return cls._arrow_pen, cls._arrow_brush
 
 class Figure(QObject, Object, Observer):
     tolerance = 5
+    # отрисовка через QPicture (см. paint и Defaults.RENDER_CACHE)
+    render_cache = False
 
     def __init__(self, ess: DrawEssentials | None = None):
         super().__init__()
-        base = ess if isinstance(ess, DrawEssentials) else DrawEssentials()
-        # (8) без deepcopy(QColor): создаём новые QColor
-        self._ess = DrawEssentials(
-            pen_color=QColor(base.pen_color),
-            brush_color=QColor(base.brush_color),
-            pen_width=base.pen_width,
-            radius=base.radius
-        )
+        # стиль интернирован: фигуры с одинаковым стилем делят один неизменяемый Style
+        self._ess: Style = STYLES.intern(ess if isinstance(ess, (Style, DrawEssentials)) else None)
         self._selected = False
         
         self._move_master = None   # type: Figure | None
 
+        # кэш bounds(): считается _compute_bounds() и живёт до invalidate_bounds()
+        self._bounds: QRect | None = None
+        # группы, в которые входит фигура (заводится при группировке): им тоже сбрасываем bounds
+        self._parents: weakref.WeakSet | None = None
+
+        # кэш отрисовки: записанный draw() и bounds() на момент записи
+        self._picture: QPicture | None = None
+        self._picture_rect: QRect | None = None
+
     @property
-    def ess(self) -> DrawEssentials:
+    def ess(self) -> Style:
+        # только чтение: Style общий для многих фигур, менять через сеттеры/restyle()
         return self._ess
     @ess.setter
-    def ess(self, value: DrawEssentials):
-        if isinstance(value, DrawEssentials):
-            self._ess = DrawEssentials(
-                pen_color=QColor(value.pen_color),
-                brush_color=QColor(value.brush_color),
-                pen_width=value.pen_width,
-                radius=value.radius
-            )
+    def ess(self, value: Style | DrawEssentials):
+        if isinstance(value, (Style, DrawEssentials)):
+            self._ess = STYLES.intern(value)
+            self.invalidate_shape()
+
+    def restyle(self, **changes):
+        """Сменить поля стиля (pen_color, brush_color, pen_width, radius) — copy-on-write."""
+        self._ess = STYLES.derive(self._ess, **changes)
+        self.invalidate_shape()
+
     @property
     def pen_color(self) -> QColor:
         return self._ess.pen_color
     @pen_color.setter
     def pen_color(self, value: QColor):
-        self._ess.pen_color = QColor(value)
+        self.restyle(pen_color=value)
     @property
     def brush_color(self) -> QColor:
         return self._ess.brush_color
     @brush_color.setter
     def brush_color(self, value: QColor):
-        self._ess.brush_color = QColor(value)
+        self.restyle(brush_color=value)
     @property
     def pen_width(self) -> int:
         return self._ess.pen_width
     @pen_width.setter
     def pen_width(self, value: int):
-        self._ess.pen_width = int(value)
+        self.restyle(pen_width=value)
     @property
     def radius(self) -> int:
         return self._ess.radius
     @radius.setter
     def radius(self, value: int):
-        self._ess.radius = int(value)
+        self.restyle(radius=value)
     
 
     def draw(self, painter: QPainter): raise NotImplementedError
-    def bounds(self) -> QRect: raise NotImplementedError
+    def _compute_bounds(self) -> QRect: raise NotImplementedError
+
+    def _reach(self) -> int:
+        # запас вокруг геометрии: дальше него не заходят ни штрих пера, ни допуск hit_test.
+        # bounds() обязан его покрывать — по bounds() хранилище ищет кандидатов и считает damage
+        pw = self._ess.pen_width
+        return max(pw, ceil(pw / 2 + self.tolerance))
+
+    def bounds(self) -> QRect:
+        if self._bounds is None:
+            self._bounds = self._compute_bounds()
+        # копия: QRect изменяемый, а кэш общий
+        return QRect(self._bounds)
+
+    def invalidate_bounds(self):
+        """Геометрия изменилась: сбросить bounds() у фигуры и у всех групп над ней."""
+        if self._bounds is None:
+            # уже сброшено — и у родителей тоже (их bounds() пересчитал бы и наш)
+            return
+        self._bounds = None
+        if self._parents:
+            for group in list(self._parents):
+                group.invalidate_bounds()
+
+    def invalidate_cache(self):
+        """Сбросить записанную отрисовку (меняется форма или стиль, а не только положение)."""
+        self._picture = None
+        self._picture_rect = None
+        # картинка группы содержит и эту фигуру
+        if self._parents:
+            for group in list(self._parents):
+                group.invalidate_cache()
+
+    def invalidate_shape(self):
+        """Поменялись форма или стиль: сбросить и отрисовку, и bounds()."""
+        self.invalidate_cache()
+        self.invalidate_bounds()
+
+    def paint(self, painter: QPainter):
+        """
+        Отрисовка через кэш: draw() записывается в QPicture один раз и дальше только воспроизводится.
+        Сдвиг фигуры (bounds() того же размера) не требует перезаписи — картинка просто смещается.
+        """
+        if not (self.render_cache or Defaults.RENDER_CACHE):
+            self.draw(painter)
+            return
+        b = self.bounds()
+        if self._picture is None or self._picture_rect.size() != b.size():
+            pic = QPicture()
+            rec = QPainter(pic)
+            rec.setRenderHints(painter.renderHints())
+            self.draw(rec)
+            rec.end()
+            self._picture = pic
+            self._picture_rect = QRect(b)
+        painter.drawPicture(b.topLeft() - self._picture_rect.topLeft(), self._picture)
 
     def get_center(self) -> QPoint | None:
         b = self.bounds()
@@ -105,8 +165,8 @@ class Figure(QObject, Object, Observer):
             return True
         return False
 
-    def draw_arrows(self, painter: QPainter):
-        for obs in self.get_observers():
+    def draw_arrows(self, painter: QPainter, observers: list | None = None):
+        for obs in (self.get_observers() if observers is None else observers):
             if isinstance(obs, Figure):
                 p1 = self.get_center()
                 p2 = obs.get_center()
@@ -118,10 +178,9 @@ class Figure(QObject, Object, Observer):
                     continue
 
                 painter.save()
-                pen = QPen(Defaults.ARROW_COLOR, Defaults.ARROW_WIDTH)
-                pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+                pen, brush = Defaults.arrow_tools()
                 painter.setPen(pen)
-                painter.setBrush(QBrush(Defaults.ARROW_COLOR))
+                painter.setBrush(brush)
 
                 # основная линия между центрами
                 painter.drawLine(QPoint(x1, y1), QPoint(x2, y2))
@@ -149,7 +208,12 @@ class Figure(QObject, Object, Observer):
     @property
     def selected(self) -> bool: return self._selected
     @selected.setter
-    def selected(self, v: bool): self._selected = bool(v)
+    def selected(self, v: bool):
+        v = bool(v)
+        if v != self._selected:
+            # рамка выделения входит в записанную картинку
+            self.invalidate_cache()
+        self._selected = v
 
     @staticmethod
     def is_fit_in_bounds(rect1: QRect, rect2: QRect) -> bool:
@@ -170,23 +234,29 @@ class Figure(QObject, Object, Observer):
     def _draw_selection_overlay(self, painter: QPainter, color: QColor = QColor(Qt.GlobalColor.red)):
         if not self._selected:
             return
-        pen = QPen(color, max(1, self._ess.pen_width // 2))
-        pen.setStyle(Qt.PenStyle.DashLine)
         painter.save()
-        painter.setPen(pen)
+        # pen_width, а не _ess.pen_width: у Point толщина своя
+        width = max(1, self.pen_width // 2)
+        painter.setPen(dash_pen(color, width))
         painter.setBrush(Qt.BrushStyle.NoBrush)
-        painter.drawRect(self.bounds())
+        # рамка внутри bounds(): всё, что рисует фигура, в него укладывается (см. _reach)
+        h = width // 2
+        painter.drawRect(self.bounds().adjusted(h, h, -h, -h))
         painter.restore()
 
+    # схема сериализации (schema.Schema); to_dict/from_dict строятся по ней
+    schema: Schema | None = None
+
     def to_dict(self) -> dict:
-        # Требуем явной реализации в подклассах — если вызвали базовый метод,
-        # это означает, что подкласс не реализовал сериализацию.
-        raise NotImplementedError(f"{self.__class__.__name__}.to_dict() must be implemented in subclass")
-    
+        if self.schema is None:
+            raise NotImplementedError(f"{self.__class__.__name__} has no schema; define schema or override to_dict()")
+        return self.schema.encode(self)
+
     @classmethod
     def from_dict(cls, data: dict) -> Figure:
-        """Базовая сигнатура: подкласс должен вернуть новый экземпляр"""
-        raise NotImplementedError(f"{cls.__name__}.from_dict(dict) must be implemented in subclass")
+        if cls.schema is None:
+            raise NotImplementedError(f"{cls.__name__} has no schema; define schema or override from_dict()")
+        return cls.schema.decode(cls, data)
 
     def notify_move(self, dx: int, dy: int, event: Event | None = None, bounds: QRect | None = None) -> None:
         # сохраняем историю visited из входящего события, если оно есть,
@@ -211,6 +281,7 @@ class Figure(QObject, Object, Observer):
           1) проверить bounds и изменить координаты,
           2) вызвать super().change_position(dx, dy, bounds, event) чтобы уведомить наблюдателей.
         """
+        self.invalidate_bounds()
         # уведомляем о перемещении (подкласс уже применил изменения)
         self.notify_move(dx, dy, event, bounds)
 
@@ -246,6 +317,9 @@ class Figure(QObject, Object, Observer):
 
 
 class FigureGroup(Figure):
+    # группа рисует всех детей — записанная картинка окупается (Defaults.RENDER_CACHE)
+    render_cache = True
+
     def __init__(self, figures: list[Figure] | None = None, ess: DrawEssentials | None = None):
         super().__init__(ess)
         # Группа может содержать разные типы фигур — это и есть смысл list[Figure]
@@ -255,6 +329,9 @@ class FigureGroup(Figure):
         # Не даём детям рисовать свои красные рамки — выделение будет на уровне группы
         for f in self._figure_group:
             f.selected = False
+            if f._parents is None:
+                f._parents = weakref.WeakSet()
+            f._parents.add(self)
 
     @property
     def figures(self) -> list[Figure]:
@@ -267,7 +344,7 @@ class FigureGroup(Figure):
         # 2) Если выделена группа — один общий оверлей по её bbox
         self._draw_selection_overlay(painter, color=QColor(Qt.GlobalColor.green))
 
-    def bounds(self) -> QRect:
+    def _compute_bounds(self) -> QRect:
         # Корректная обработка пустой группы
         if not self._figure_group:
             return QRect()
@@ -338,13 +415,25 @@ class FigureGroup(Figure):
 
 
 class Point(Figure):
+    schema = Schema(attr("x"), attr("y"))
+
     def __init__(self, x: int, y: int, ess: DrawEssentials | None = None):
         super().__init__(ess)
         self.__x = x
         self.__y = y
-    radius = 1
+        self.__radius = 1
+    # своя толщина пера; размер точки задаёт radius, а не стиль
     pen_width = 2
 
+    @property
+    def radius(self) -> int:
+        return self.__radius
+    @radius.setter
+    def radius(self, value: int):
+        self.__radius = int(value)
+        # от радиуса зависят и картинка, и bounds()
+        self.invalidate_shape()
+
     @property
     def x(self): return self.__x
     @property
@@ -352,15 +441,14 @@ class Point(Figure):
 
     def draw(self, painter: QPainter):
         painter.save()
-        pen = QPen(self._ess.pen_color, self.pen_width)
-        painter.setPen(pen)
-        painter.setBrush(QBrush())
+        painter.setPen(self._ess.pen(self.pen_width))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
         painter.drawEllipse(QPoint(self.__x, self.__y), self.radius, self.radius)
         painter.restore()
         self._draw_selection_overlay(painter)
 
-    def bounds(self) -> QRect:
-        r = max(1, self.pen_width, self.tolerance)
+    def _compute_bounds(self) -> QRect:
+        r = max(1, self.radius + self.pen_width, self.tolerance)
         return QRect(self.__x - r, self.__y - r, r * 2 + 1, r * 2 + 1)
 
     def change_position(self, dx: int, dy: int, bounds: QRect = None, event: Event | None = None):
@@ -372,25 +460,10 @@ class Point(Figure):
             self.__y += dy
         super().change_position(dx, dy, bounds, event)
 
-    def to_dict(self):
-        ess = _ess_to_dict(self.ess)
-        return {
-            'ess': ess,
-            "x": self.__x,
-            "y": self.__y
-        }
-    
-    @classmethod
-    def from_dict(cls, data: dict) -> Point:
-        ess_data = data.get("ess", None)
-
-        ess = _ess_from_dict(ess_data)
-        x = int(data.get("x", 0))
-        y = int(data.get("y", 0))
-        return cls(x, y, ess=ess)
-
 
 class Line(Figure):
+    schema = Schema(*coords("x1", "y1", "x2", "y2"))
+
     def __init__(self, x1: int, y1: int, x2: int = None, y2: int = None, ess: DrawEssentials | None = None):
         super().__init__(ess)
         self.points = [[x1, y1], [x2, y2]]
@@ -403,7 +476,7 @@ class Line(Figure):
         if not self.finished:
             return
         painter.save()
-        painter.setPen(QPen(self._ess.pen_color, self._ess.pen_width))
+        painter.setPen(self._ess.pen())
         painter.setBrush(Qt.BrushStyle.NoBrush)
         painter.drawLine(QPoint(*self.points[0]), QPoint(*self.points[1]))
         painter.restore()
@@ -413,18 +486,19 @@ class Line(Figure):
         if self.points[1][0] is None or self.points[1][1] is None:
             self.points[1] = [x, y]
             self.finished = True
+            self.invalidate_shape()
 
-    def bounds(self) -> QRect:
+    def _compute_bounds(self) -> QRect:
         x1, y1 = self.points[0]
         x2, y2 = self.points[1]
         if x1 is None or y1 is None:
             return QRect()
         if x2 is None or y2 is None:
-            r = max(self._ess.pen_width, self.tolerance)
+            r = self._reach()
             return QRect(x1 - r, y1 - r, r * 2 + 1, r * 2 + 1)
         left, top = min(x1, x2), min(y1, y2)
         right, bottom = max(x1, x2), max(y1, y2)
-        r = max(self._ess.pen_width, self.tolerance)
+        r = self._reach()
         return QRect(left - r, top - r, (right - left) + 2 * r + 1, (bottom - top) + 2 * r + 1)
 
     # (5) Точный hit-test: расстояние до отрезка
@@ -458,31 +532,10 @@ class Line(Figure):
             self.points[1] = [nx2, ny2]
         super().change_position(dx, dy, bounds, event)
 
-    def to_dict(self):
-        ess = _ess_to_dict(self.ess)
-        pts = self.get_points()
-        return {
-            'ess': ess,
-            'x1': pts[0][0],
-            'y1': pts[0][1],
-            'x2': pts[1][0],
-            'y2': pts[1][1],
-        }
-    
-    @classmethod
-    def from_dict(cls, data: dict) -> Line:
-        ess_data = data.get("ess", None)
-
-        ess = _ess_from_dict(ess_data)
-        x1 = int(data.get("x1", 0))
-        y1 = int(data.get("y1", 0))
-        x2 = data.get("x2")
-        y2 = data.get("y2")
-
-        return cls(x1, y1, x2, y2, ess=ess)
-
 class Rectangle(Figure):
     # (3) Две точки: p1 (anchor), p2 (opposite corner)
+    schema = Schema(*coords("x1", "y1", "x2", "y2"))
+
     def __init__(self, x1: int, y1: int, x2: int = None, y2: int = None, ess: DrawEssentials | None = None):
         super().__init__(ess)
         self.points = [[x1, y1], [x2, y2]]
@@ -491,19 +544,19 @@ class Rectangle(Figure):
     def get_points(self) -> list[list[int]]:
         return self.points
 
+    @staticmethod
+    def _corners(x1: int, y1: int, x2: int, y2: int) -> tuple[int, int, int, int]:
+        """Нарисованный прямоугольник (left, top, right, bottom) по двум точкам построения."""
+        return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
     def draw(self, painter: QPainter):
         if not self.finished:
             return
         painter.save()
-        pen = QPen(self._ess.pen_color, self._ess.pen_width)
-        brush = QBrush(self._ess.brush_color)
-        painter.setPen(pen)
-        painter.setBrush(brush)
-        x1, y1 = self.points[0]
-        x2, y2 = self.points[1]
-        left, top = min(x1, x2), min(y1, y2)
-        width, height = abs(x2 - x1), abs(y2 - y1)
-        painter.drawRect(left, top, width, height)
+        painter.setPen(self._ess.pen())
+        painter.setBrush(self._ess.brush())
+        left, top, right, bottom = self._corners(*self.points[0], *self.points[1])
+        painter.drawRect(left, top, right - left, bottom - top)
         painter.restore()
         self._draw_selection_overlay(painter)
 
@@ -511,30 +564,25 @@ class Rectangle(Figure):
         if self.points[1][0] is None or self.points[1][1] is None:
             self.points[1] = [x, y]
             self.finished = True
+            self.invalidate_shape()
 
-    def bounds(self) -> QRect:
+    def _compute_bounds(self) -> QRect:
         p = [pt for pt in self.points if pt[0] is not None and pt[1] is not None]
         if len(p) < 1:
             return QRect()
         if len(p) == 1:
             x1, y1 = p[0]
-            t = max(self._ess.pen_width, self.tolerance)
+            t = self._reach()
             return QRect(x1 - t, y1 - t, 2 * t + 1, 2 * t + 1)
-        x1, y1 = self.points[0]
-        x2, y2 = self.points[1]
-        left, top = min(x1, x2), min(y1, y2)
-        right, bottom = max(x1, x2), max(y1, y2)
-        t = max(self._ess.pen_width, self.tolerance)
+        left, top, right, bottom = self._corners(*self.points[0], *self.points[1])
+        t = self._reach()
         return QRect(left - t, top - t, (right - left) + 2 * t + 1, (bottom - top) + 2 * t + 1)
 
     # (5) hit-test: точка внутри прямоугольника с допуском t
     def hit_test(self, x: int, y: int) -> bool:
         if not self.finished:
             return False
-        x1, y1 = self.points[0]
-        x2, y2 = self.points[1]
-        left, top = min(x1, x2), min(y1, y2)
-        right, bottom = max(x1, x2), max(y1, y2)
+        left, top, right, bottom = self._corners(*self.points[0], *self.points[1])
         t = max(self._ess.pen_width / 2, self.tolerance)
         rect = QRect(int(left - t), int(top - t), int((right - left) + 2 * t), int((bottom - top) + 2 * t))
         return rect.contains(x, y)
@@ -543,8 +591,7 @@ class Rectangle(Figure):
         x1, y1 = self.points[0]
         x2, y2 = self.points[1] if self.points[1][0] is not None else (x1, y1)
         nx1, ny1, nx2, ny2 = x1 + dx, y1 + dy, x2 + dx, y2 + dy
-        left, top = min(nx1, nx2), min(ny1, ny2)
-        right, bottom = max(nx1, nx2), max(ny1, ny2)
+        left, top, right, bottom = self._corners(nx1, ny1, nx2, ny2)
         new_rect = QRect(left - self.tolerance, top - self.tolerance,
                          (right - left) + 2 * self.tolerance + 1,
                          (bottom - top) + 2 * self.tolerance + 1)
@@ -553,76 +600,23 @@ class Rectangle(Figure):
             self.points[1] = [nx2, ny2]
         super().change_position(dx, dy, bounds, event)
 
-    def to_dict(self):
-        ess = _ess_to_dict(self.ess)
-        pts = self.get_points()
-        return {
-            'ess': ess,
-            'x1': pts[0][0],
-            'y1': pts[0][1],
-            'x2': pts[1][0],
-            'y2': pts[1][1],
-        }
-    
-    @classmethod
-    def from_dict(cls, data: dict) -> Rectangle:
-        ess_data = data.get("ess", None)
-
-        ess = _ess_from_dict(ess_data)
-        x1 = int(data.get("x1", 0))
-        y1 = int(data.get("y1", 0))
-        x2 = data.get("x2")
-        y2 = data.get("y2")
-
-        return cls(x1, y1, x2, y2, ess=ess)
-
 class Square(Rectangle):
     def __init__(self, x1: int, y1: int, x2: int = None, y2: int = None, ess: DrawEssentials | None = None):
         super().__init__(x1, y1, x2, y2, ess)
 
 
-    # поведение построения такое же (2 точки), рисуем как квадрат по наибольшей стороне
-    def draw(self, painter: QPainter):
-        if not self.finished:
-            return
-        painter.save()
-        pen = QPen(self._ess.pen_color, self._ess.pen_width)
-        brush = QBrush(self._ess.brush_color)
-        painter.setPen(pen)
-        painter.setBrush(brush)
-        x1, y1 = self.points[0]
-        x2, y2 = self.points[1]
+    # поведение построения такое же (2 точки), рисуем как квадрат по наибольшей стороне от p1;
+    # draw, bounds() и hit_test у Rectangle идут через _corners — все трое видят один квадрат
+    @staticmethod
+    def _corners(x1: int, y1: int, x2: int, y2: int) -> tuple[int, int, int, int]:
         size = max(abs(x2 - x1), abs(y2 - y1))
         left = x1 if x2 >= x1 else x1 - size
-        top  = y1 if y2 >= y1 else y1 - size
-        painter.drawRect(left, top, size, size)
-        painter.restore()
-        self._draw_selection_overlay(painter)
-
-    def to_dict(self):
-        ess = _ess_to_dict(self.ess)
-        pts = self.get_points()
-        return {
-            'ess': ess,
-            'x1': pts[0][0],
-            'y1': pts[0][1],
-            'x2': pts[1][0],
-            'y2': pts[1][1],
-        }
-    
-    @classmethod
-    def from_dict(cls, data: dict) -> Square:
-        ess_data = data.get("ess", None)
-
-        ess = _ess_from_dict(ess_data)
-        x1 = int(data.get("x1", 0))
-        y1 = int(data.get("y1", 0))
-        x2 = data.get("x2")
-        y2 = data.get("y2")
-
-        return cls(x1, y1, x2, y2, ess=ess)
+        top = y1 if y2 >= y1 else y1 - size
+        return left, top, left + size, top + size
 
 class Circle(Figure):
+    schema = Schema(*coords("x", "y", "rx", "ry"))
+
     def __init__(self, x: int, y: int, rx: int = None, ry: int = None, ess: DrawEssentials | None = None):
         super().__init__(ess)
         self.points = [[x, y], [rx, ry]]
@@ -635,10 +629,8 @@ class Circle(Figure):
         if not self.finished:
             return
         painter.save()
-        pen = QPen(self._ess.pen_color, self._ess.pen_width)
-        brush = QBrush(self._ess.brush_color)
-        painter.setPen(pen)
-        painter.setBrush(brush)
+        painter.setPen(self._ess.pen())
+        painter.setBrush(self._ess.brush())
         cx, cy = self.points[0]
         px, py = self.points[1]
         r = max(abs(px - cx), abs(py - cy))
@@ -650,15 +642,15 @@ class Circle(Figure):
         if self.points[1][0] is None or self.points[1][1] is None:
             self.points[1] = [x, y]
             self.finished = True
+            self.invalidate_shape()
 
-    def bounds(self) -> QRect:
+    def _compute_bounds(self) -> QRect:
         cx, cy = self.points[0]
         px, py = self.points[1]
         if px is None or py is None:
-            t = max(self._ess.pen_width, self.tolerance)
+            t = self._reach()
             return QRect(cx - t, cy - t, 2 * t + 1, 2 * t + 1)
-        r0 = max(abs(px - cx), abs(py - cy))
-        t = max(r0, self._ess.pen_width, self.tolerance)
+        t = max(abs(px - cx), abs(py - cy)) + self._reach()
         return QRect(cx - t, cy - t, 2 * t + 1, 2 * t + 1)
 
     # (5) hit-test круга по уравнению
@@ -686,17 +678,6 @@ class Circle(Figure):
                 self.points[1] = [npx, npy]
         super().change_position(dx, dy, bounds, event)
 
-    def to_dict(self):
-        ess = _ess_to_dict(self.ess)
-        pts = self.get_points()
-        return {
-            'ess': ess,
-            'x': pts[0][0],
-            'y': pts[0][1],
-            'rx': pts[1][0],
-            'ry': pts[1][1],
-        }
-    
     @property
     def radius(self) -> int:
         # читаем из базового Figure.radius (там self._ess.radius)
@@ -714,21 +695,12 @@ class Circle(Figure):
             cx, cy = self.points[0]
             # делаем окружность с центром (cx, cy) и радиусом new_r
             self.points[1] = [cx + new_r, cy + new_r]
-    
-    @classmethod
-    def from_dict(cls, data: dict) -> Circle:
-        ess_data = data.get("ess", None)
-
-        ess = _ess_from_dict(ess_data)
-        x = int(data.get("x", 0))
-        y = int(data.get("y", 0))
-        rx = data.get("rx")
-        ry = data.get("ry")
-
-        return cls(x, y, rx, ry, ess=ess)
+            self.invalidate_shape()
 
 # (1) Ellipse — отдельный класс, не наследуется от Circle
 class Ellipse(Figure):
+    schema = Schema(*coords("x", "y", "rx", "ry"))
+
     def __init__(self, x: int, y: int, rx: int = None, ry: int = None, ess: DrawEssentials | None = None):
         super().__init__(ess)
         self.points = [[x, y], [rx, ry]]
@@ -741,10 +713,8 @@ class Ellipse(Figure):
         if not self.finished:
             return
         painter.save()
-        pen = QPen(self._ess.pen_color, self._ess.pen_width)
-        brush = QBrush(self._ess.brush_color)
-        painter.setPen(pen)
-        painter.setBrush(brush)
+        painter.setPen(self._ess.pen())
+        painter.setBrush(self._ess.brush())
         cx, cy = self.points[0]
         px, py = self.points[1]
         rx, ry = abs(px - cx), abs(py - cy)
@@ -756,15 +726,16 @@ class Ellipse(Figure):
         if self.points[1][0] is None or self.points[1][1] is None:
             self.points[1] = [x, y]
             self.finished = True
+            self.invalidate_shape()
 
-    def bounds(self) -> QRect:
+    def _compute_bounds(self) -> QRect:
         cx, cy = self.points[0]
         px, py = self.points[1]
         if px is None or py is None:
-            t = max(self._ess.pen_width, self.tolerance)
+            t = self._reach()
             return QRect(cx - t, cy - t, 2 * t + 1, 2 * t + 1)
         rx, ry = abs(px - cx), abs(py - cy)
-        t = max(self._ess.pen_width, self.tolerance)
+        t = self._reach()
         return QRect(cx - rx - t, cy - ry - t, 2 * rx + 2 * t + 1, 2 * ry + 2 * t + 1)
 
     # (5) hit-test эллипса по уравнению
@@ -801,29 +772,6 @@ class Ellipse(Figure):
                 self.points[1] = [npx, npy]
         super().change_position(dx, dy, bounds, event)
 
-    def to_dict(self):
-        ess = _ess_to_dict(self.ess)
-        pts = self.get_points()
-        return {
-            'ess': ess,
-            'x': pts[0][0],
-            'y': pts[0][1],
-            'rx': pts[1][0],
-            'ry': pts[1][1],
-        }
-    
-    @classmethod
-    def from_dict(cls, data: dict) -> Ellipse:
-        ess_data = data.get("ess", None)
-
-        ess = _ess_from_dict(ess_data)
-        x = int(data.get("x", 0))
-        y = int(data.get("y", 0))
-        rx = data.get("rx")
-        ry = data.get("ry")
-
-        return cls(x, y, rx, ry, ess=ess)
-    
     @property
     def radius(self) -> int:
         # читаем логическое "радиус-масштаб" из базового ess
@@ -849,6 +797,7 @@ class Ellipse(Figure):
         # если эллипс вырожден в точку — просто задаём круг
         if rx0 == 0 and ry0 == 0:
             self.points[1] = [cx + new_r, cy + new_r]
+            self.invalidate_shape()
             return
 
         # берём текущий "радиус" как max полуосей и считаем коэффициент масштабирования
@@ -862,8 +811,11 @@ class Ellipse(Figure):
         sign_x = 1 if px >= cx else -1
         sign_y = 1 if py >= cy else -1
         self.points[1] = [cx + sign_x * rx, cy + sign_y * ry]
+        self.invalidate_shape()
 
 class Triangle(Figure):
+    schema = Schema(*coords("x1", "y1", "x2", "y2", "x3", "y3"))
+
     def __init__(self, x1: int, y1: int, x2: int = None, y2: int = None, x3: int = None, y3: int = None, ess: DrawEssentials | None = None):
         super().__init__(ess)
         self.points = [[x1, y1], [x2, y2], [x3, y3]]
@@ -876,10 +828,8 @@ class Triangle(Figure):
         if not self.finished:
             return
         painter.save()
-        pen = QPen(self._ess.pen_color, self._ess.pen_width)
-        brush = QBrush(self._ess.brush_color)
-        painter.setPen(pen)
-        painter.setBrush(brush)
+        painter.setPen(self._ess.pen())
+        painter.setBrush(self._ess.brush())
         p1 = QPoint(*self.points[0])
         p2 = QPoint(*self.points[1])
         p3 = QPoint(*self.points[2])
@@ -894,16 +844,17 @@ class Triangle(Figure):
                 self.points[i] = [x, y]
                 if i == 2:
                     self.finished = True
+                self.invalidate_shape()
                 break
 
-    def bounds(self) -> QRect:
+    def _compute_bounds(self) -> QRect:
         pts = [pt for pt in self.points if pt[0] is not None and pt[1] is not None]
         if not pts:
             return QRect()
         xs = [p[0] for p in pts]
         ys = [p[1] for p in pts]
         left, top, right, bottom = min(xs), min(ys), max(xs), max(ys)
-        t = max(self._ess.pen_width, self.tolerance)
+        t = self._reach()
         return QRect(left - t, top - t, (right - left) + 2 * t + 1, (bottom - top) + 2 * t + 1)
 
     # (5) hit-test: barycentric внутри треугольника (с лёгкой надувкой bbox)
@@ -919,7 +870,9 @@ class Triangle(Figure):
         a = ((y2 - y3)*(x - x3) + (x3 - x2)*(y - y3)) / denom
         b = ((y3 - y1)*(x - x3) + (x1 - x3)*(y - y3)) / denom
         c = 1 - a - b
-        if (a >= -0.02 and b >= -0.02 and c >= -0.02):
+        # надувка на 2% не выходит за bounds(): иначе у длинных треугольников попадание было бы
+        # вне прямоугольника, по которому хранилище ищет кандидатов
+        if (a >= -0.02 and b >= -0.02 and c >= -0.02) and self.bounds().contains(x, y):
             return True
         return False
 
@@ -945,33 +898,6 @@ class Triangle(Figure):
                     self.points[i][1] = y
         super().change_position(dx, dy, bounds, event)
     
-    def to_dict(self):
-        ess = _ess_to_dict(self.ess)
-        pts = self.get_points()
-        return {
-            'ess': ess,
-            'x1': pts[0][0],
-            'y1': pts[0][1],
-            'x2': pts[1][0],
-            'y2': pts[1][1],
-            'x3': pts[2][0],
-            'y3': pts[2][1],
-        }
-    
-    @classmethod
-    def from_dict(cls, data: dict) -> Triangle:
-        ess_data = data.get("ess", None)
-
-        ess = _ess_from_dict(ess_data)
-        x1 = int(data.get("x1", 0))
-        y1 = int(data.get("y1", 0))
-        x2 = data.get("x2")
-        y2 = data.get("y2")
-        x3 = data.get("x3")
-        y3 = data.get("y3")
-
-        return cls(x1, y1, x2, y2, x3, y3, ess=ess)
-    
 class Hand(Figure):
     # заглушка для инструмента "рука" (перемещение)
     def __init__(self):
@@ -980,5 +906,5 @@ class Hand(Figure):
     def draw(self, painter: QPainter):
         pass
 
-    def bounds(self) -> QRect:
+    def _compute_bounds(self) -> QRect:
         return QRect()
@@ -0,0 +1,136 @@
+"""
+Сохранение и загрузка документов в фоне: чтение, разбор и запись идут в пуле потоков,
+окно остаётся отзывчивым, прогресс приходит сигналом, задачу можно отменить.
+
+Сохранение: данные фигур снимаются в потоке GUI (factory.snapshot), фоновый поток с живыми
+фигурами не работает. Загрузка: фигуры строятся в фоне и передаются потоку GUI (moveToThread),
+в хранилище их кладёт вызывающий — одним batch().
+"""
+from __future__ import annotations
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QCoreApplication, pyqtSignal
+import binary_format
+import factory
+import parallel_load
+from figures import FigureGroup
+
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="file-io")
+
+
+class FileTask(QObject):
+    """
+    Фоновая задача: fn(*args, progress=..., cancelled=...) в пуле потоков.
+    Сигналы приходят в поток, где создан FileTask (очередью из фонового потока).
+    Создаётся незапущенной: сначала подключить сигналы, потом start() — иначе быстрая
+    задача может закончиться раньше, чем кто-то услышит done.
+    """
+    progress = pyqtSignal(int)       # проценты
+    done = pyqtSignal(object)        # результат fn
+    failed = pyqtSignal(object)      # исключение
+    cancelled = pyqtSignal()
+
+    def __init__(self, fn, *args, parent=None):
+        super().__init__(parent)
+        self._fn, self._args = fn, args
+        self._cancel = threading.Event()
+        self._future = None
+        self._percent = -1
+
+    def start(self) -> FileTask:
+        self._future = _pool.submit(self._run)
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def wait(self):
+        """Дождаться окончания (сигналы при этом всё равно придут через цикл событий)."""
+        if self._future is not None:
+            self._future.result()
+
+    def _report(self, done: int, total: int):
+        percent = min(100, 100 * done // total) if total else 0
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
+
+    def _run(self):
+        try:
+            result = self._fn(*self._args, progress=self._report, cancelled=self._cancel.is_set)
+        except factory.Cancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(e)
+        else:
+            self.done.emit(result)
+
+
+def save(figures: list, path: str, parent=None) -> FileTask:
+    """
+    Снять данные фигур (здесь, в потоке GUI) и вернуть задачу записи документа; формат — по расширению.
+    Запись начнётся по start().
+    """
+    binary = path.endswith(binary_format.SUFFIX)
+    items, bounds = factory.snapshot(figures, binary)
+    return FileTask(_save, items, bounds, path, binary, parent=parent)
+
+
+class LoadTask(FileTask):
+    """Чтение документа: порции фигур приходят сигналом chunk, уже в потоке GUI и в порядке файла."""
+    chunk = pyqtSignal(object)       # список фигур
+
+    def __init__(self, path: str, lazy: bool, parent=None):
+        super().__init__(_load, path, lazy, parent=parent)
+        self._args += (self.chunk.emit,)
+
+
+def load(path: str, lazy: bool = True, parent=None) -> LoadTask:
+    """
+    Задача чтения документа (запуск — start()); chunk — порции фигур по мере чтения,
+    done получит список всех фигур (см. factory.iter_load). Порции приходят раньше done/failed/cancelled.
+    """
+    return LoadTask(path, lazy, parent=parent)
+
+
+def _save(items, bounds, path, binary, progress, cancelled) -> str:
+    factory.write_snapshot(items, bounds, path, binary, progress, cancelled)
+    return path
+
+
+def _load(path, lazy, emit, progress, cancelled) -> list:
+    main = QCoreApplication.instance().thread()
+    figures = []
+    chunks = _chunks(path, lazy, progress)
+    try:
+        for chunk in chunks:
+            if cancelled():
+                raise factory.Cancelled()
+            _move_to_thread(chunk, main)
+            figures.extend(chunk)
+            emit(chunk)
+    finally:
+        chunks.close()
+    return figures
+
+
+def _chunks(path, lazy, progress):
+    # большой документ, который не открыть лениво, разбирается в пуле процессов (если есть лишние ядра)
+    with open(path, "rb") as fp:
+        head = fp.read(binary_format.HEADER_SIZE)
+    if (not (lazy and binary_format.is_indexed(head)) and (os.cpu_count() or 1) > 1
+            and os.path.getsize(path) >= parallel_load.MIN_SIZE):
+        return parallel_load.iter_load(path, progress=progress)
+    return factory.iter_load(path, lazy=lazy, progress=progress)
+
+
+def _move_to_thread(figures, thread):
+    # фигуры — QObject и принадлежат создавшему их потоку; отдаём их потоку GUI
+    for f in figures:
+        f.moveToThread(thread)
+        if isinstance(f, FigureGroup):
+            _move_to_thread(f.figures, thread)
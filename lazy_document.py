@@ -0,0 +1,173 @@
+"""
+Ленивое открытие больших .figb: файл отображается в память (mmap), вместо фигур в хранилище
+и дереве стоят строки индекса LazyFigure — (документ, номер строки), без QObject и стиля.
+Строки не попадают в сетку хранилища — запросы по области для них идут по таблице bounds
+из индекса файла (LazyDocument.rows_in). Настоящая фигура строится, только когда хранилище
+отдаёт строку наружу (видимая область, hit-test, выделение) — см. FigureStorage._materialize.
+Когда в хранилище не остаётся ни одной строки документа, хранилище его закрывает.
+"""
+from __future__ import annotations
+import mmap
+import os
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QPainter
+import binary_format
+import factory
+from figures import Figure
+
+try:
+    import numpy as np
+except ImportError:  # без numpy запросы по таблице bounds идут перебором строк
+    np = None
+
+
+def _identity(st: os.stat_result) -> tuple:
+    # тот же файл на диске: сохранение подменяет файл целиком (factory._write), и номер inode меняется
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class LazyDocument:
+    """Открытый через mmap документ с индексом; фигуры читаются по номеру."""
+    def __init__(self, path: str):
+        with open(path, "rb") as fp:
+            # отображение живёт и после закрытия файла
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self.identity = _identity(os.fstat(fp.fileno()))
+        try:
+            self._doc = binary_format.Document(self._map)
+        except Exception:
+            self._map.close()
+            raise
+        self.path = path
+        n = len(self._doc)
+        # таблица bounds прямо поверх mmap: строки (x, y, w, h)
+        self._rects = np.asarray(self._doc.rects, dtype=np.int32).reshape(n, 4) if np is not None else None
+        self._proxies: list = [None] * n
+        # строки, чьи заглушки сейчас стоят в хранилище (ещё не заменены и не удалены)
+        self._live = np.zeros(n, dtype=bool) if np is not None else bytearray(n)
+        self._n_live = 0
+        self._extent: QRect | None = None
+
+    def __len__(self) -> int:
+        return len(self._doc)
+
+    def item(self, i: int) -> dict:
+        return self._doc.item(i)
+
+    def figure(self, i: int) -> Figure:
+        """Построить настоящую фигуру номер i (каждый вызов — новый объект)."""
+        return factory._from_item(self._doc.item(i))
+
+    def proxies(self, start: int = 0, stop: int | None = None) -> list[LazyFigure]:
+        stop = len(self) if stop is None else stop
+        result = []
+        for i in range(start, stop):
+            p = self._proxies[i]
+            if p is None:
+                p = self._proxies[i] = LazyFigure(self, i)
+            result.append(p)
+        return result
+
+    def proxy(self, i: int) -> LazyFigure:
+        return self._proxies[i]
+
+    # --- учёт живых заглушек (ведёт хранилище) ---
+    def set_live(self, i: int, state: bool):
+        if bool(self._live[i]) == state:
+            return
+        self._live[i] = state
+        self._n_live += 1 if state else -1
+        self._extent = None
+
+    def has_live(self) -> bool:
+        return self._n_live > 0
+
+    # --- запросы по таблице bounds ---
+    def rows_in(self, rect: QRect):
+        """Живые строки, чей bounds пересекает rect (края включительно, как у QRect)."""
+        if not self._n_live or rect.isNull() or not rect.isValid():
+            return []
+        ql, qt, qr, qb = rect.left(), rect.top(), rect.right(), rect.bottom()
+        if self._rects is not None:
+            x, y, w, h = self._rects.T
+            mask = self._live & (x <= qr) & (y <= qb) & (x + w - 1 >= ql) & (y + h - 1 >= qt)
+            return np.flatnonzero(mask).tolist()
+        r = self._doc.rects
+        return [i for i in range(len(self)) if self._live[i]
+                and r[4 * i] <= qr and r[4 * i + 1] <= qb
+                and r[4 * i] + r[4 * i + 2] - 1 >= ql and r[4 * i + 1] + r[4 * i + 3] - 1 >= qt]
+
+    def rows_at(self, x: int, y: int):
+        return self.rows_in(QRect(x, y, 1, 1))
+
+    def extent(self) -> QRect:
+        """Общий bounds живых строк (пустой QRect, если их нет)."""
+        if self._extent is None:
+            if not self._n_live:
+                self._extent = QRect()
+            elif self._rects is not None:
+                live = self._rects[self._live]
+                l, t = int(live[:, 0].min()), int(live[:, 1].min())
+                r, b = int((live[:, 0] + live[:, 2]).max()), int((live[:, 1] + live[:, 3]).max())
+                self._extent = QRect(l, t, r - l, b - t)
+            else:
+                rect = QRect()
+                for i in range(len(self)):
+                    if self._live[i]:
+                        b = QRect(*self._doc.bounds(i))
+                        rect = b if rect.isNull() else rect.united(b)
+                self._extent = rect
+        return QRect(self._extent)
+
+    @property
+    def closed(self) -> bool:
+        return self._map.closed
+
+    def close(self):
+        # строки после этого ни bounds, ни materialize() уже не смогут
+        if self.closed:
+            return
+        self._rects = None
+        self._doc.release()
+        self._map.close()
+
+
+class LazyFigure:
+    """
+    Строка LazyDocument в хранилище и дереве: только документ и номер строки.
+    Не Figure и не QObject — bounds, тип и элемент читаются из индекса файла при обращении.
+    Хранилище подменяет строку настоящей фигурой при первом обращении; сама строка не меняется.
+    """
+    __slots__ = ("document", "row", "__weakref__")
+    # хранилище и дерево читают эти флаги у всех своих фигур
+    finished = True
+    selected = False
+
+    def __init__(self, document: LazyDocument, row: int):
+        self.document = document
+        self.row = row
+
+    @property
+    def type_name(self) -> str:
+        """Имя класса настоящей фигуры (для сохранения и дерева)."""
+        return self.document._doc.type_name(self.row)
+
+    def materialize(self) -> Figure:
+        return self.document.figure(self.row)
+
+    def bounds(self) -> QRect:
+        return QRect(*self.document._doc.bounds(self.row))
+
+    def draw(self, painter: QPainter):
+        self.materialize().draw(painter)
+
+    def hit_test(self, x: int, y: int) -> bool:
+        return self.materialize().hit_test(x, y)
+
+    def change_position(self, dx: int, dy: int, bounds: QRect = None, event=None):
+        raise TypeError("LazyFigure is read-only; materialize it first")
+
+    def to_dict(self) -> dict:
+        item = self.document.item(self.row)
+        item.pop("_type", None)
+        return item
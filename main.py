@@ -7,5 +7,7 @@ faulthandler.enable()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    # имя приложения задаёт каталог данных (автосохранение)
+    app.setApplicationName("Paint")
     window = Main()
     sys.exit(app.exec())
@@ -9,6 +9,9 @@ from settings import DrawSettings
 from storage import FigureStorage
 from canvas_widget import Canvas
 import factory
+import binary_format
+import autosave
+import file_tasks
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
 from tree_view import TreeView
 from commands import CommandManager, GroupCommand, UngroupCommand
@@ -50,7 +53,7 @@ class Main(QMainWindow):
         self.spinBox_radius.valueChanged.connect(lambda v: setattr(self.settings, "radius", v))
         # group/ungroup
         self.Group_pushButton.clicked.connect(lambda: self.cmd_manager.do(GroupCommand(self.storage, self.storage.get_selected(), self.settings.ess)))
-        self.UnGroup_pushButton.clicked.connect(lambda: self.cmd_manager.do(UngroupCommand(self.storage, self.storage.get_selected()[0])) if (len(self.storage.get_selected()) == 1 and isinstance(self.storage.get_selected()[0], FigureGroup)) else None)
+        self.UnGroup_pushButton.clicked.connect(self._on_ungroup)
         # tool buttons
         for name in factory.list_tools():
             btn = getattr(self, name, None)
@@ -111,30 +114,148 @@ class Main(QMainWindow):
         # == старт отрисовки ==
         self.show()
 
+        # ---- автосохранение: предложить восстановление после сбоя, затем вести журнал ----
+        self.journal = autosave.Journal(self.storage, self.cmd_manager, autosave.default_directory(), parent=self)
+        self._offer_recovery()
+        self.journal.start()
+        # текущее фоновое сохранение/загрузка (file_tasks.FileTask); загрузку при выходе можно бросить
+        self._task = None
+        self._task_is_load = False
+
     
+    def _on_ungroup(self):
+        if self.storage.selected_count() != 1:
+            return
+        group = self.storage.selection_order()[0]
+        if isinstance(group, FigureGroup):
+            self.cmd_manager.do(UngroupCommand(self.storage, group))
+
     # --- диалоги сохранения/загрузки ---
     def _on_save(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Сохранить", filter="JSON Files (*.json);;All Files (*)")
-        if not path:
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить", filter=f"JSON Files (*.json);;Binary Files (*{binary_format.SUFFIX});;All Files (*)")
+        if not path or self._busy():
             return
         try:
-            factory.save(self.storage.get_all(), path)
-            QMessageBox.information(self, "Сохранено", f"Фигуры сохранены в {path}")
+            # данные фигур снимаются сейчас, сериализация и запись — в фоне
+            task = file_tasks.save(self.storage.get_all(), path, parent=self)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить: {e}")
+            return
+        self._run_task(task, False, "Сохранение…", "Не удалось сохранить",
+                       lambda _: QMessageBox.information(self, "Сохранено", f"Фигуры сохранены в {path}"))
 
     def _on_load(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Загрузить", filter="JSON Files (*.json);;All Files (*)")
-        if not path:
+        path, _ = QFileDialog.getOpenFileName(self, "Загрузить", filter=f"Documents (*.json *{binary_format.SUFFIX});;All Files (*)")
+        if not path or self._busy():
             return
-        try:
-            figs = factory.load(path)
-            self.storage.clear_all()
-            for f in figs:
-                self.storage.add(f)
+
+        task = file_tasks.load(path, lazy=True, parent=self)
+        # фигуры попадают в хранилище порциями, по мере чтения файла (по одному ChangeSet на порцию);
+        # старый документ убирается с первой порцией, а при отмене или ошибке возвращается целиком.
+        # .figb с индексом открывается лениво: в хранилище строки индекса, фигуры строятся по мере показа.
+        old = None
+
+        def apply(chunk):
+            nonlocal old
+            # insert, а не add: в файле только дорисованные фигуры, а add на каждую ищет недорисованную
+            with self.storage.batch():
+                if old is None:
+                    old = list(self.storage.get_all())
+                    # до конца загрузки ленивые документы старых строк не закрываются — их ещё можно вернуть
+                    self.storage.keep_documents(True)
+                    self.storage.clear_all()
+                for f in chunk:
+                    self.storage.insert(None, f)
+
+        def done(_):
+            apply([])  # пустой документ тоже заменяет текущий
+            self.storage.keep_documents(False)
             QMessageBox.information(self, "Загружено", f"Фигуры загружены из {path}")
+
+        def stop():
+            if old is not None:
+                with self.storage.batch():
+                    self.storage.clear_all()
+                    for f in old:
+                        self.storage.insert(None, f)
+            self.storage.keep_documents(False)
+
+        task.chunk.connect(apply)
+        self._run_task(task, True, "Загрузка…", "Не удалось загрузить", done, on_stop=stop)
+
+    def _busy(self) -> bool:
+        return self._task is not None and self._task.running()
+
+    def _run_task(self, task, is_load: bool, label: str, error: str, on_done, on_stop=None):
+        """
+        Окно прогресса с отменой для фоновой задачи; on_done(результат) — в потоке GUI,
+        on_stop() — при отмене или ошибке.
+        """
+        self._task, self._task_is_load = task, is_load
+        dialog = QProgressDialog(label, "Отмена", 0, 100, self)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+        dialog.canceled.connect(task.cancel)
+        task.progress.connect(dialog.setValue)
+
+        def finish():
+            dialog.canceled.disconnect(task.cancel)
+            dialog.close()
+            dialog.deleteLater()
+            task.deleteLater()
+            if self._task is task:
+                self._task = None
+
+        def done(result):
+            finish()
+            try:
+                on_done(result)
+            except Exception as e:
+                QMessageBox.critical(self, "Ошибка", f"{error}: {e}")
+
+        def stopped():
+            finish()
+            if on_stop is not None:
+                on_stop()
+
+        def failed(e):
+            stopped()
+            QMessageBox.critical(self, "Ошибка", f"{error}: {e}")
+
+        task.done.connect(done)
+        task.failed.connect(failed)
+        task.cancelled.connect(stopped)
+        # запуск только после подключения: иначе быстрый done уйдёт в никуда
+        task.start()
+
+    def _offer_recovery(self):
+        directory = autosave.default_directory()
+        if not autosave.has_recovery(directory):
+            return
+        answer = QMessageBox.question(self, "Восстановление",
+                                      "Прошлый сеанс завершился некорректно. Восстановить несохранённый рисунок?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            figures = autosave.recover(directory)
+            with self.storage.batch():
+                for f in figures:
+                    self.storage.insert(None, f)
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить: {e}")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось восстановить: {e}")
+
+    def closeEvent(self, event):
+        # незаконченную загрузку бросаем, сохранение дописываем
+        if self._busy():
+            if self._task_is_load:
+                self._task.cancel()
+            try:
+                self._task.wait()
+            except Exception:
+                pass
+        # штатный выход — журнал больше не нужен
+        self.journal.close(discard=True)
+        super().closeEvent(event)
 
     # def open_settings(self):
     #     command_history = CommandHistory(self.cmd_manager)
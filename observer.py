@@ -16,16 +16,20 @@ class Observer:
 
 class Object:
     def __init__(self):
-        self._observers: weakref.WeakSet = weakref.WeakSet()
+        # WeakSet заводится при первом наблюдателе: у большинства фигур их нет, а загрузка создаёт миллионы
+        self._observers: weakref.WeakSet | None = None
 
     def get_observers(self) -> list[Observer]:
-        return list(self._observers)
+        return list(self._observers) if self._observers else []
 
     def add_observer(self, obs: Observer) -> None:
+        if self._observers is None:
+            self._observers = weakref.WeakSet()
         self._observers.add(obs)
 
     def remove_observer(self, obs: Observer) -> None:
-        self._observers.discard(obs)
+        if self._observers is not None:
+            self._observers.discard(obs)
 
     def notify(self, event: Event) -> None:
         visited_ids = set(event.visited or ())
@@ -45,5 +49,5 @@ class Object:
             visited=tuple(visited_ids),
         )
 
-        for obs in list(self._observers):
+        for obs in self.get_observers():
             obs.update(self, new_event)
@@ -0,0 +1,168 @@
+"""
+Параллельная загрузка больших документов. Список фигур верхнего уровня режется на порции,
+порции разбираются и проверяются в пуле процессов в простые записи без Qt-объектов:
+    (имя класса, ключ стиля или None, поля)   — у групп в полях "figures" записи детей.
+Фигуры (QObject) строятся только в вызывающем потоке, стиль — один Style на ключ.
+
+    figures = parallel_load.load("big.json", workers=8)
+
+.figb с индексом процессы читают сами (каждый — свой диапазон строк через mmap);
+JSON и .figb без индекса читает вызывающий поток, процессам уходят готовые элементы.
+"""
+from __future__ import annotations
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+import binary_format
+import factory
+from styles import Style, STYLES
+
+PARALLEL_CHUNK = 20000
+# файлы меньше этого выгоднее грузить обычным factory.iter_load: запуск процессов дороже разбора
+MIN_SIZE = 8 << 20
+
+
+# --- в процессах пула ---
+def _style_key(ess) -> tuple | None:
+    if ess is None:
+        return None
+    if not isinstance(ess, dict):
+        raise RuntimeError(f"Malformed document: bad style {ess!r}")
+    s = Style.from_dict(ess)
+    for rgba in (s.pen_rgba, s.brush_rgba):
+        if len(rgba) != 4 or not all(type(v) is int and 0 <= v <= 255 for v in rgba):
+            raise RuntimeError(f"Malformed document: bad color {rgba!r}")
+    return s.pen_rgba, s.brush_rgba, s.pen_width, s.radius
+
+
+def _record(item) -> tuple:
+    """Элемент v1 -> запись; заодно проверка типа фигуры и полей."""
+    if not isinstance(item, dict):
+        raise RuntimeError(f"Malformed document: bad item {item!r}")
+    name = item.get("_type")
+    if factory._find_class_by_name(name) is None:
+        raise RuntimeError(f"No registered class for type {name}")
+    fields = {}
+    for k, v in item.items():
+        if k in ("_type", "ess"):
+            continue
+        if k == "figures" and isinstance(v, list):
+            fields[k] = [_record(child) for child in v]
+        elif v is None or type(v) in (int, float):
+            fields[k] = v
+        else:
+            raise RuntimeError(f"Malformed document: {name}.{k} = {v!r}")
+    return name, _style_key(item.get("ess")), fields
+
+
+def _decode_items(items: list) -> list:
+    factory._ensure_registry()
+    return [_record(item) for item in items]
+
+
+def _decode_rows(path: str, start: int, stop: int) -> list:
+    factory._ensure_registry()
+    with open(path, "rb") as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        doc = binary_format.Document(data)
+        try:
+            return [_record(doc.item(i)) for i in range(start, stop)]
+        finally:
+            doc.release()
+
+
+# --- в вызывающем потоке ---
+def _jobs(path: str, head: bytes, chunk_size: int):
+    """(функция, аргументы, (сделано, всего)) на каждую порцию."""
+    if binary_format.is_indexed(head):
+        n = binary_format.item_count(head)
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            yield _decode_rows, (path, start, stop), (stop, n)
+        return
+    if binary_format.is_binary(head):
+        n = binary_format.item_count(head)
+        items, done = binary_format.iter_items(Path(path).read_bytes()), 0
+        for chunk in _split(items, chunk_size):
+            done += len(chunk)
+            yield _decode_items, (chunk,), (done, n)
+        return
+    with open(path, encoding="utf-8") as fp:
+        total = os.fstat(fp.fileno()).st_size
+        for chunk in _split(factory._iter_document_items(fp), chunk_size):
+            yield _decode_items, (chunk,), (fp.buffer.tell(), total)
+
+
+def _split(items, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _item(record: tuple, styles: dict) -> dict:
+    """Запись -> элемент v1 с готовым Style в "ess" (from_dict берёт его как есть)."""
+    name, key, fields = record
+    style = None
+    if key is not None:
+        style = styles.get(key)
+        if style is None:
+            style = styles[key] = STYLES.intern(Style(*key))
+    item = {**fields, "_type": name, "ess": style}
+    if "figures" in fields:
+        item["figures"] = [_item(child, styles) for child in fields["figures"]]
+    return item
+
+
+def _build(record: tuple, styles: dict, classes: dict):
+    """Запись -> фигура; класс ищется один раз на имя."""
+    cls = classes.get(record[0])
+    if cls is None:
+        cls = classes[record[0]] = factory._find_class_by_name(record[0])
+    item = _item(record, styles)
+    del item["_type"]
+    return cls.from_dict(item)
+
+
+def iter_load(path: str, workers: int | None = None, chunk_size: int = PARALLEL_CHUNK, progress=None):
+    """
+    Как factory.iter_load, но разбор идёт в workers процессах (по умолчанию — по числу ядер).
+    Порции приходят в порядке документа; progress(done, total) — после каждой.
+    """
+    factory._ensure_registry()
+    workers = workers or os.cpu_count() or 1
+    with open(path, "rb") as fp:
+        head = fp.read(binary_format.HEADER_SIZE)
+    # spawn: дочерние процессы не наследуют Qt-состояние родителя
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    try:
+        styles: dict = {}
+        classes: dict = {}
+        pending = deque()
+        jobs = _jobs(path, head, chunk_size)
+        while True:
+            # в работе не больше двух порций на процесс: файл не читается в память целиком
+            for fn, args, position in jobs:
+                pending.append((pool.submit(fn, *args), position))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            future, position = pending.popleft()
+            records = future.result()
+            if progress is not None:
+                progress(*position)
+            yield [_build(r, styles, classes) for r in records]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def load(path: str, workers: int | None = None) -> list:
+    """Загрузить документ целиком (см. iter_load)."""
+    return [f for chunk in iter_load(path, workers) for f in chunk]
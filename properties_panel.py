@@ -22,10 +22,57 @@ class PropertiesPanel(QWidget):
         self.layout.addLayout(self.form)
 
         self._editors = {}
-        # обновляем при изменении canvas / selection
-        self.storage.canvas_updated.connect(self.rebuild)
+        # объект, чьи свойства сейчас показаны
+        self._obj = None
+        # обновляем только при смене выделения или изменении показанного объекта
+        self.storage.changed.connect(self._on_changes)
         self.rebuild()
 
+    def _on_changes(self, cs):
+        if cs.full or cs.has(cs.SELECTION):
+            self.rebuild()
+            return
+        if self._obj is None or self._obj not in cs.figures():
+            return
+        # сдвиг меняет только значения (координаты): редакторы те же, обновляем их на месте
+        if self._obj in cs.figures(cs.ADDED, cs.REMOVED, cs.RESTYLED, cs.REORDERED, cs.REPLACED) \
+                or not self.refresh_values():
+            self.rebuild()
+
+    def refresh_values(self) -> bool:
+        """Показать текущие значения показанного объекта в уже созданных редакторах; False — нужен rebuild()."""
+        for name, editor in self._editors.items():
+            try:
+                value = getattr(self._obj, name)
+            except Exception:
+                return False
+            if not self._show_value(editor, value):
+                return False
+        return True
+
+    @staticmethod
+    def _show_value(editor, value) -> bool:
+        # без сигналов: это не правка пользователя, _apply вызываться не должен
+        editor.blockSignals(True)
+        try:
+            if isinstance(editor, QCheckBox) and isinstance(value, bool):
+                editor.setChecked(value)
+            elif isinstance(editor, QSpinBox) and isinstance(value, int) and not isinstance(value, bool):
+                editor.setValue(value)
+            elif isinstance(editor, QLineEdit) and isinstance(value, str):
+                if not editor.hasFocus():
+                    editor.setText(value)
+            elif isinstance(editor, QPushButton) and isinstance(value, QColor):
+                editor.setStyleSheet(f"background-color: {value.name()}")
+            elif isinstance(editor, QLabel):
+                editor.setText(str(value) if isinstance(value, (list, tuple)) else repr(value))
+            else:
+                # тип значения сменился — редактор другого вида
+                return False
+        finally:
+            editor.blockSignals(False)
+        return True
+
     def clear_form(self):
         # удалить виджеты из form и очистить хранилище редакторов
         while self.form.rowCount() > 0:
@@ -34,15 +81,17 @@ class PropertiesPanel(QWidget):
 
     def rebuild(self):
         self.clear_form()
-        selected = self.storage.get_selected()
-        if not selected:
+        self._obj = None
+        count = self.storage.selected_count()
+        if count == 0:
             self.info_label.setText("Нет выбранных объектов")
             return
-        if len(selected) > 1:
+        if count > 1:
             self.info_label.setText("Выбрано несколько объектов — свойства недоступны")
             return
         # получение объекта и установка заголовка
-        obj = selected[0]
+        obj = self.storage.selection_order()[0]
+        self._obj = obj
         self.info_label.setText(f"{obj.__class__.__name__}")
 
 
@@ -105,7 +154,8 @@ class PropertiesPanel(QWidget):
             cb = QCheckBox()
             cb.setChecked(value)
             if editable:
-                cb.stateChanged.connect(lambda st, o=obj, n=name: self._apply(o, n, bool(st == Qt.CheckState.Checked)))
+                # toggled, а не stateChanged: в PyQt6 int из stateChanged не равен Qt.CheckState.Checked
+                cb.toggled.connect(lambda checked, o=obj, n=name: self._apply(o, n, checked))
             else:
                 cb.setEnabled(False)
             return cb
@@ -163,12 +213,16 @@ class PropertiesPanel(QWidget):
         return lbl
 
     def _apply(self, obj, name, value):
+        if name == "selected":
+            # выделение хранит хранилище (get_selected, удаление, сдвиг) — флаг фигуры только отражает его
+            self.storage.select_figure(obj, value)
+            return
         try:
             setattr(obj, name, value)
         except Exception as e:
             print(f"_apply error for {name}: {e}")
             return
         try:
-            self.storage.canvas_updated.emit()
+            self.storage.refresh(obj)
         except Exception:
             pass
@@ -0,0 +1,190 @@
+"""
+Рендер сохранённых документов без окна (offscreen Qt): PNG/JPG, SVG или PDF.
+
+    python -m render doc.json -o doc.png
+    python -m render docs/ -o thumbs/ --format png --width 256 --height 256 --jobs 8
+"""
+from __future__ import annotations
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from PyQt6.QtCore import QRect, QRectF, QSize, QSizeF, QMarginsF, Qt
+from PyQt6.QtGui import QGuiApplication, QImage, QPainter, QColor, QPdfWriter, QPageSize, QPageLayout
+from PyQt6.QtSvg import QSvgGenerator
+import factory
+import binary_format
+import renderer
+
+FORMATS = ("png", "jpg", "svg", "pdf")
+DEFAULT_MARGIN = 10
+
+_app = None
+
+
+def _ensure_app():
+    # QPdfWriter/QSvgGenerator и шрифты требуют QGuiApplication; по одному на процесс
+    global _app
+    if QGuiApplication.instance() is None:
+        _app = QGuiApplication([])
+
+
+def scene_rect(figures, margin: int = DEFAULT_MARGIN) -> QRect:
+    """Охват дорисованных фигур с полями; пустая сцена — 1x1."""
+    rect = QRect()
+    for f in figures:
+        if getattr(f, "finished", True) is False:
+            continue
+        b = f.bounds()
+        if not b.isNull():
+            rect = b if rect.isNull() else rect.united(b)
+    if rect.isNull():
+        return QRect(0, 0, 1, 1)
+    return rect.adjusted(-margin, -margin, margin, margin)
+
+
+def _paint(painter: QPainter, figures, source: QRect, target: QRectF, background: QColor | None):
+    """Вписать source (координаты сцены) в target с сохранением пропорций."""
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    if background is not None:
+        painter.fillRect(target, background)
+    k = min(target.width() / source.width(), target.height() / source.height())
+    painter.translate(target.x() + (target.width() - source.width() * k) / 2,
+                      target.y() + (target.height() - source.height() * k) / 2)
+    painter.scale(k, k)
+    painter.translate(-source.x(), -source.y())
+    renderer.paint_figures(painter, [f for f in figures if getattr(f, "finished", True) is not False])
+
+
+def render_figures(figures, dst: str, fmt: str | None = None, width: int | None = None, height: int | None = None,
+                   margin: int = DEFAULT_MARGIN, background: QColor | None = QColor(Qt.GlobalColor.white)) -> None:
+    """
+    Отрисовать фигуры в файл dst. Формат — по fmt или расширению.
+    width/height — наибольший размер результата (миниатюра); без них масштаб 1:1.
+    """
+    _ensure_app()
+    fmt = (fmt or Path(dst).suffix.lstrip(".")).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt!r} (expected one of {', '.join(FORMATS)})")
+    source = scene_rect(figures, margin)
+    k = 1.0
+    if width or height:
+        k = min(width / source.width() if width else float("inf"),
+                height / source.height() if height else float("inf"))
+    size = QSize(max(1, round(source.width() * k)), max(1, round(source.height() * k)))
+    target = QRectF(0, 0, size.width(), size.height())
+
+    if fmt in ("png", "jpg"):
+        img = QImage(size, QImage.Format.Format_ARGB32_Premultiplied)
+        img.fill(background if background is not None else QColor(Qt.GlobalColor.transparent))
+        painter = QPainter(img)
+        _paint(painter, figures, source, target, None)
+        painter.end()
+        if not img.save(dst):
+            raise OSError(f"Cannot write {dst}")
+    elif fmt == "svg":
+        gen = QSvgGenerator()
+        gen.setFileName(dst)
+        gen.setSize(size)
+        gen.setViewBox(target)
+        painter = QPainter(gen)
+        _paint(painter, figures, source, target, background)
+        painter.end()
+    else:
+        writer = QPdfWriter(dst)
+        writer.setResolution(72)
+        # 1 пункт PDF = 1 пиксель сцены
+        writer.setPageSize(QPageSize(QSizeF(size), QPageSize.Unit.Point))
+        writer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Unit.Point)
+        painter = QPainter(writer)
+        _paint(painter, figures, source, QRectF(painter.viewport()), background)
+        painter.end()
+
+
+def render_file(src: str, dst: str, fmt: str | None = None, width: int | None = None, height: int | None = None,
+                margin: int = DEFAULT_MARGIN) -> str:
+    """Загрузить документ через factory.load и отрисовать в dst. Возвращает dst."""
+    render_figures(factory.load(src), dst, fmt, width, height, margin)
+    return dst
+
+
+def _collect(inputs) -> list[Path]:
+    files = []
+    for name in inputs:
+        p = Path(name)
+        if p.is_dir():
+            files.extend(sorted(f for f in p.rglob("*") if f.suffix in (".json", binary_format.SUFFIX)))
+        else:
+            files.append(p)
+    return files
+
+
+def _jobs(files: list[Path], inputs, out: str | None, fmt: str) -> list[tuple[str, str]]:
+    # один входной файл и -o с расширением — пишем ровно туда
+    if len(files) == 1 and out and Path(out).suffix and not Path(out).is_dir():
+        return [(str(files[0]), out)]
+    out_dir = Path(out) if out else None
+    roots = [Path(name) for name in inputs if Path(name).is_dir()]
+    jobs = []
+    for f in files:
+        if out_dir is None:
+            dst = f.with_suffix("." + fmt)
+        else:
+            # сохраняем структуру подкаталогов относительно входного каталога
+            root = next((r for r in roots if r in f.parents), f.parent)
+            dst = out_dir / f.relative_to(root).with_suffix("." + fmt)
+        jobs.append((str(f), str(dst)))
+    return jobs
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m render", description="Рендер документов без окна")
+    parser.add_argument("inputs", nargs="+", help="документы (.json, .figb) или каталоги с ними")
+    parser.add_argument("-o", "--output", help="файл (для одного документа) или каталог результатов")
+    parser.add_argument("-f", "--format", choices=FORMATS, help="формат (по умолчанию по расширению -o или png)")
+    parser.add_argument("--width", type=int, help="наибольшая ширина результата")
+    parser.add_argument("--height", type=int, help="наибольшая высота результата")
+    parser.add_argument("--margin", type=int, default=DEFAULT_MARGIN, help="поля вокруг сцены, px")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="число процессов")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        suffix = Path(args.output).suffix.lstrip(".").lower() if args.output else ""
+        fmt = suffix if suffix in FORMATS else "png"
+    files = _collect(args.inputs)
+    jobs = _jobs(files, args.inputs, args.output, fmt)
+    for _, dst in jobs:
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+
+    failed = 0
+    opts = (fmt, args.width, args.height, args.margin)
+    if args.jobs <= 1 or len(jobs) <= 1:
+        for src, dst in jobs:
+            try:
+                render_file(src, dst, *opts)
+                print(f"{src} -> {dst}")
+            except Exception as e:
+                failed += 1
+                print(f"{src}: {e}", file=sys.stderr)
+    else:
+        # spawn: дочерние процессы не наследуют Qt-состояние родителя
+        with ProcessPoolExecutor(max_workers=args.jobs, mp_context=get_context("spawn")) as pool:
+            futures = {pool.submit(render_file, src, dst, *opts): src for src, dst in jobs}
+            for fut in as_completed(futures):
+                src = futures[fut]
+                try:
+                    print(f"{src} -> {fut.result()}")
+                except Exception as e:
+                    failed += 1
+                    print(f"{src}: {e}", file=sys.stderr)
+    print(f"готово: {len(jobs) - failed} из {len(jobs)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
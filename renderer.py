@@ -0,0 +1,118 @@
+from __future__ import annotations
+from PyQt6.QtCore import QRect, QPoint, QLine, Qt
+from PyQt6.QtGui import QPainter, QPolygon
+from figures import Figure, Point, Line, Rectangle, Square, Circle, Ellipse, Triangle
+
+# False — рисовать каждую фигуру отдельно через Figure.paint (для сравнения/отладки)
+BATCHING = True
+
+# семейства примитивов, которые рисуются одним набором вызовов; только точные классы —
+# у подклассов может быть свой draw()
+_FAMILY = {
+    Line: "line",
+    Rectangle: "rect",
+    Square: "rect",
+    Circle: "ellipse",
+    Ellipse: "ellipse",
+    Triangle: "polygon",
+    Point: "point",
+}
+
+
+def _class_of(fig) -> type:
+    # строки scene_store (ShapeHandle) рисуются как фигуры своего класса
+    return type(fig) if isinstance(fig, Figure) else getattr(fig, "figure_class", type(fig))
+
+
+def _batch_key(fig: Figure):
+    """Ключ серии: (семейство, стиль). None — фигуру рисуем сама по себе."""
+    family = _FAMILY.get(_class_of(fig))
+    if family is None or fig.selected or getattr(fig, "finished", True) is False:
+        # рамка выделения должна лечь сразу поверх своей фигуры — такие не группируем
+        return None
+    return family, fig.ess
+
+
+def _rect_of(fig) -> QRect:
+    # Rectangle и Square: тот же прямоугольник, что у fig.draw()
+    left, top, right, bottom = fig._corners(*fig.points[0], *fig.points[1])
+    return QRect(left, top, right - left, bottom - top)
+
+
+def _draw_rects(painter: QPainter, figs, pen_width: int):
+    # drawRects сначала заливает все прямоугольники, потом обводит — для пересекающихся
+    # это меняет картинку, поэтому режем серию на куски без пересечений
+    grow = pen_width + 2
+    chunk: list[QRect] = []
+    area = QRect()
+    for f in figs:
+        r = _rect_of(f)
+        reach = r.adjusted(-grow, -grow, grow, grow)
+        if chunk and area.intersects(reach):
+            painter.drawRects(chunk)
+            chunk, area = [], QRect()
+        chunk.append(r)
+        area = reach if area.isNull() else area.united(reach)
+    if chunk:
+        painter.drawRects(chunk)
+
+
+def _draw_run(painter: QPainter, key, figs: list):
+    family, style = key
+    painter.save()
+    if family == "line":
+        painter.setPen(style.pen())
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawLines([QLine(QPoint(*f.points[0]), QPoint(*f.points[1])) for f in figs])
+    elif family == "point":
+        painter.setPen(style.pen(Point.pen_width))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for f in figs:
+            painter.drawEllipse(QPoint(f.x, f.y), f.radius, f.radius)
+    else:
+        painter.setPen(style.pen())
+        painter.setBrush(style.brush())
+        if family == "rect":
+            _draw_rects(painter, figs, style.pen_width)
+        elif family == "ellipse":
+            for f in figs:
+                (cx, cy), (px, py) = f.points
+                if _class_of(f) is Circle:
+                    r = max(abs(px - cx), abs(py - cy))
+                    painter.drawEllipse(QPoint(cx, cy), r, r)
+                else:
+                    rx, ry = abs(px - cx), abs(py - cy)
+                    painter.drawEllipse(QRect(cx - rx, cy - ry, 2 * rx, 2 * ry))
+        else:
+            for f in figs:
+                painter.drawPolygon(QPolygon([QPoint(*p) for p in f.points]))
+    painter.restore()
+
+
+def paint_figures(painter: QPainter, figures):
+    """
+    Нарисовать фигуры в заданном (z-)порядке.
+    Подряд идущие фигуры одного вида и одного стиля рисуются серией: перо/кисть ставятся один раз,
+    линии и непересекающиеся прямоугольники уходят одним drawLines/drawRects.
+    Остальные (группы, выделенные, недорисованные, сторонние классы) — обычным Figure.paint.
+    """
+    if not BATCHING:
+        for fig in figures:
+            fig.paint(painter)
+        return
+    run: list = []
+    key = None
+    for fig in figures:
+        k = _batch_key(fig)
+        if k is not None and k == key:
+            run.append(fig)
+            continue
+        if run:
+            _draw_run(painter, key, run)
+        if k is None:
+            fig.paint(painter)
+            run, key = [], None
+        else:
+            run, key = [fig], k
+    if run:
+        _draw_run(painter, key, run)
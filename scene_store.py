@@ -0,0 +1,641 @@
+from __future__ import annotations
+import json
+from array import array
+from functools import cache
+from math import ceil, hypot
+from PyQt6.QtCore import QRect, QPoint
+from PyQt6.QtGui import QPainter
+from settings import DrawEssentials
+from styles import Style, STYLES
+import figures
+from figures import Figure, _ess_from_dict
+import factory
+import renderer
+from schema import VERSION_KEY
+
+try:
+    import numpy as np
+except ImportError:  # numpy не обязателен: массовые операции идут циклом по array
+    np = None
+
+# Поддерживаемые примитивы: код вида = позиция в KINDS
+KINDS = ("Point", "Line", "Rectangle", "Square", "Circle", "Ellipse", "Triangle")
+POINT, LINE, RECTANGLE, SQUARE, CIRCLE, ELLIPSE, TRIANGLE = range(len(KINDS))
+_KIND_OF = {name: code for code, name in enumerate(KINDS)}
+_CLASSES = tuple(getattr(figures, name) for name in KINDS)
+_NPOINTS = {POINT: 1, TRIANGLE: 3}
+
+# Ключи координат в to_dict()/from_dict() каждого вида — из схем классов (schema.Schema)
+_KEYS = {code: cls.schema.names for code, cls in enumerate(_CLASSES)}
+
+# биты колонки flags
+SELECTED = 1
+
+
+def _span(start: int, size: int) -> tuple[int, int]:
+    # концы отрезка так, как их сравнивает QRect.intersects
+    # (отрицательный размер отражается влево от start, как в QRect.normalized())
+    return (start + size, start - 1) if size < 0 else (start, start + size - 1)
+
+
+@cache
+def _point_shape() -> tuple[int, int]:
+    # радиус и полуразмер bounds() у Point: у точек из строк они не из стиля, а как у новой Point
+    p = figures.Point(0, 0)
+    return p.radius, -p.bounds().left()
+
+
+def _reach(pen_width: int) -> int:
+    # Figure._reach
+    return max(pen_width, ceil(pen_width / 2 + Figure.tolerance))
+
+
+class SceneStore:
+    """
+    Колоночное хранилище примитивов (Point, Line, Rectangle, Square, Circle, Ellipse, Triangle).
+    Геометрия, индекс стиля и флаги лежат в непрерывных array; стили — общие Style из STYLES,
+    по одному на строку хранится только индекс. Строка — это фигура; доступ к ней через лёгкий
+    ShapeHandle. bounds, hit-test, сериализация и отрисовка считаются прямо по колонкам
+    (row_bounds, row_hit, bounds_columns) — по тем же формулам, что в классах figures.py,
+    совпадение с ними проверяет tests/test_scene_store.py. Фигура из строки (figure(row))
+    строится только для правок, которые решает класс фигуры (сдвиг с проверкой границ, радиус).
+    Недорисованные фигуры и группы не хранятся (как и в factory.to_json).
+
+    Хранилище самостоятельное: FigureStorage, холст и дерево работают с обычными фигурами,
+    SceneStore в приложение не подключён — это формат для больших сцен и массовых операций
+    (exp/scene_store_benchmark.py), конвертация в обе стороны — from_figures/to_figures.
+    """
+    def __init__(self):
+        self.kind = array("b")
+        self.style = array("I")
+        self.flags = array("B")
+        # до трёх точек на фигуру; неиспользуемые координаты — 0
+        self.xs = (array("i"), array("i"), array("i"))
+        self.ys = (array("i"), array("i"), array("i"))
+        # таблица стилей: индекс -> Style (интернированный в STYLES)
+        self.styles: list[Style] = []
+        self._style_ids: dict[Style, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def __getitem__(self, row: int) -> ShapeHandle:
+        n = len(self.kind)
+        if row < 0:
+            row += n
+        if not 0 <= row < n:
+            raise IndexError(row)
+        return ShapeHandle(self, row)
+
+    def __iter__(self):
+        for row in range(len(self.kind)):
+            yield ShapeHandle(self, row)
+
+    # --- стили ---
+    def intern_style(self, ess: Style | DrawEssentials | None) -> int:
+        style = STYLES.intern(ess)
+        sid = self._style_ids.get(style)
+        if sid is None:
+            sid = len(self.styles)
+            self.styles.append(style)
+            self._style_ids[style] = sid
+        return sid
+
+    def style_ess(self, sid: int) -> Style:
+        return self.styles[sid]
+
+    # --- строка <-> фигура ---
+    def coords(self, row: int) -> list[int]:
+        """Координаты строки плоским списком x1, y1, x2, y2, ..."""
+        return [c for i in range(_NPOINTS.get(self.kind[row], 2)) for c in (self.xs[i][row], self.ys[i][row])]
+
+    def figure(self, row: int) -> Figure:
+        """Обычная фигура с геометрией и стилем строки (без выделения и наблюдателей)."""
+        return _CLASSES[self.kind[row]](*self.coords(row), ess=self.styles[self.style[row]])
+
+    def write(self, row: int, fig: Figure):
+        """Записать в строку геометрию и стиль фигуры того же вида."""
+        coords = (fig.x, fig.y) if self.kind[row] == POINT else [c for p in fig.get_points() for c in p]
+        for i in range(len(coords) // 2):
+            self.xs[i][row] = int(coords[2 * i])
+            self.ys[i][row] = int(coords[2 * i + 1])
+        self.style[row] = self.intern_style(fig.ess)
+
+    # --- добавление / удаление ---
+    def append(self, kind: str | int, coords, ess: Style | DrawEssentials | None = None, selected: bool = False) -> int:
+        """Добавить примитив; coords — плоский список x1, y1, x2, y2, ... Возвращает номер строки."""
+        code = _KIND_OF[kind] if isinstance(kind, str) else int(kind)
+        n = _NPOINTS.get(code, 2)
+        if len(coords) != 2 * n:
+            raise ValueError(f"{KINDS[code]} needs {2 * n} coordinates, got {len(coords)}")
+        self.kind.append(code)
+        self.style.append(self.intern_style(ess))
+        self.flags.append(SELECTED if selected else 0)
+        for i in range(3):
+            self.xs[i].append(int(coords[2 * i]) if i < n else 0)
+            self.ys[i].append(int(coords[2 * i + 1]) if i < n else 0)
+        return len(self.kind) - 1
+
+    def add_figure(self, fig: Figure) -> int | None:
+        """Скопировать обычную фигуру в хранилище. Недорисованные пропускаются (None)."""
+        code = _KIND_OF.get(fig.__class__.__name__)
+        if code is None:
+            raise TypeError(f"{fig.__class__.__name__} is not supported by SceneStore")
+        if getattr(fig, "finished", True) is False:
+            return None
+        if code == POINT:
+            coords = (fig.x, fig.y)
+        else:
+            coords = [c for p in fig.get_points() for c in p]
+        return self.append(code, coords, fig.ess, fig.selected)
+
+    def add_dict(self, item: dict) -> int | None:
+        """Строка из элемента factory.to_json ({"_type": ..., "ess": ..., координаты})."""
+        code = _KIND_OF.get(item.get("_type"))
+        if code is None:
+            raise TypeError(f"{item.get('_type')} is not supported by SceneStore")
+        keys = _KEYS[code]
+        coords = [item.get(k) for k in keys]
+        if any(c is None for c in coords):
+            return None
+        return self.append(code, coords, _ess_from_dict(item.get("ess")))
+
+    def remove(self, row: int):
+        """Удалить строку. Номера строк после неё сдвигаются — старые ShapeHandle становятся недействительны."""
+        for col in (self.kind, self.style, self.flags, *self.xs, *self.ys):
+            del col[row]
+
+    def clear(self):
+        for col in (self.kind, self.style, self.flags, *self.xs, *self.ys):
+            del col[:]
+
+    # --- конвертация ---
+    @classmethod
+    def from_figures(cls, figs) -> SceneStore:
+        store = cls()
+        for fig in figs:
+            store.add_figure(fig)
+        return store
+
+    @classmethod
+    def from_json(cls, text: str) -> SceneStore:
+        store = cls()
+        for item in factory._document_items(json.loads(text)):
+            store.add_dict(item)
+        return store
+
+    def to_figures(self) -> list[Figure]:
+        """Развернуть строки обратно в полноценные фигуры (QObject, наблюдатели и т.д.)."""
+        return [h.to_figure() for h in self]
+
+    def to_json(self) -> str:
+        items = [{**h.to_dict(), "_type": h.type_name} for h in self]
+        return json.dumps(factory._pack_document(items), indent=4, ensure_ascii=False)
+
+    def nbytes(self) -> int:
+        """Сколько байт занимают колонки (без таблицы стилей)."""
+        return sum(col.itemsize * len(col) for col in (self.kind, self.style, self.flags, *self.xs, *self.ys))
+
+    # --- массовые операции ---
+    def translate(self, dx: int, dy: int, rows=None):
+        """Сдвинуть строки rows (по умолчанию все) без проверки границ."""
+        if np is not None and rows is None:
+            for col, d in ((self.xs, dx), (self.ys, dy)):
+                if d:
+                    for c in col:
+                        np.frombuffer(c, dtype=np.int32)[:] += d
+            return
+        for row in (range(len(self.kind)) if rows is None else rows):
+            n = _NPOINTS.get(self.kind[row], 2)
+            for i in range(n):
+                self.xs[i][row] += dx
+                self.ys[i][row] += dy
+
+    def select_all(self, state: bool = True):
+        for row in range(len(self.flags)):
+            self.flags[row] = (self.flags[row] | SELECTED) if state else (self.flags[row] & ~SELECTED)
+
+    def bounds(self) -> QRect:
+        """Общий bounds() всех строк."""
+        if not len(self):
+            return QRect()
+        if np is not None:
+            l, t, r, b = (int(v) for v in (c.min() if i < 2 else c.max()
+                                             for i, c in enumerate(self.bounds_columns())))
+        else:
+            cols = list(zip(*(self.row_bounds(row) for row in range(len(self)))))
+            l, t, r, b = min(cols[0]), min(cols[1]), max(cols[2]), max(cols[3])
+        return QRect(l, t, r - l + 1, b - t + 1)
+
+    # --- одна строка по колонкам ---
+    def row_bounds(self, row: int) -> tuple[int, int, int, int]:
+        """bounds() строки как left, top, right, bottom (включительно, как у QRect)."""
+        k = self.kind[row]
+        xs, ys = self.xs, self.ys
+        x1, y1 = xs[0][row], ys[0][row]
+        if k == POINT:
+            r = _point_shape()[1]
+            return x1 - r, y1 - r, x1 + r, y1 + r
+        x2, y2 = xs[1][row], ys[1][row]
+        t = _reach(self.styles[self.style[row]].pen_width)
+        if k == CIRCLE:
+            r = max(abs(x2 - x1), abs(y2 - y1)) + t
+            return x1 - r, y1 - r, x1 + r, y1 + r
+        if k == ELLIPSE:
+            rx, ry = abs(x2 - x1) + t, abs(y2 - y1) + t
+            return x1 - rx, y1 - ry, x1 + rx, y1 + ry
+        if k == TRIANGLE:
+            x3, y3 = xs[2][row], ys[2][row]
+            l, top, r, b = min(x1, x2, x3), min(y1, y2, y3), max(x1, x2, x3), max(y1, y2, y3)
+        elif k == LINE:
+            l, top, r, b = min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+        else:
+            l, top, r, b = _CLASSES[k]._corners(x1, y1, x2, y2)
+        return l - t, top - t, r + t, b + t
+
+    def row_hit(self, row: int, x: int, y: int) -> bool:
+        """hit_test строки (формулы hit_test классов figures.py)."""
+        k = self.kind[row]
+        if k == POINT:
+            l, t, r, b = self.row_bounds(row)
+            return l <= x <= r and t <= y <= b
+        xs, ys = self.xs, self.ys
+        x1, y1, x2, y2 = xs[0][row], ys[0][row], xs[1][row], ys[1][row]
+        pw = self.styles[self.style[row]].pen_width
+        tol = Figure.tolerance
+        if k == LINE:
+            lim = pw / 2 + tol
+            if x1 == x2:
+                # как Line.hit_test: при x1 == x2 — расстояние до первой точки
+                return hypot(x - x1, y - y1) <= lim
+            vx, vy = x2 - x1, y2 - y1
+            tt = max(0.0, min(1.0, ((x - x1) * vx + (y - y1) * vy) / (vx * vx + vy * vy)))
+            return hypot(x - (x1 + tt * vx), y - (y1 + tt * vy)) <= lim
+        half = max(pw / 2, tol)
+        if k == CIRCLE:
+            return hypot(x - x1, y - y1) <= max(abs(x2 - x1), abs(y2 - y1)) + half
+        if k == ELLIPSE:
+            rx, ry = abs(x2 - x1), abs(y2 - y1)
+            if rx == 0 or ry == 0:
+                return False
+            nx, ny = (x - x1) / rx, (y - y1) / ry
+            return nx * nx + ny * ny <= 1.0 + half / max(rx, ry)
+        if k == TRIANGLE:
+            x3, y3 = xs[2][row], ys[2][row]
+            denom = (y2 - y3) * (x1 - x3) + (x3 - x2) * (y1 - y3)
+            if denom == 0:
+                return False
+            a = ((y2 - y3) * (x - x3) + (x3 - x2) * (y - y3)) / denom
+            b = ((y3 - y1) * (x - x3) + (x1 - x3) * (y - y3)) / denom
+            if not (a >= -0.02 and b >= -0.02 and 1 - a - b >= -0.02):
+                return False
+            l, t, r, bt = self.row_bounds(row)
+            return l <= x <= r and t <= y <= bt
+        # Rectangle/Square: QRect(int(...)).contains с допуском
+        left, top, right, bottom = _CLASSES[k]._corners(x1, y1, x2, y2)
+        rl, rt = int(left - half), int(top - half)
+        rw, rh = int((right - left) + 2 * half), int((bottom - top) + 2 * half)
+        return rl <= x <= rl + rw - 1 and rt <= y <= rt + rh - 1
+
+    # --- пакетный hit-test ---
+    # Один запрос проверяется сразу по всем строкам каждого вида (numpy), с тем же результатом,
+    # что и поштучный hit_test: значения у самой границы допуска перепроверяются скалярно.
+    BORDER_EPS = 1e-7
+
+    def hit_rows(self, x: int, y: int) -> list[int]:
+        """Строки, в которые попадает точка (x, y), снизу вверх."""
+        if np is None or not len(self):
+            return [h.row for h in self if h.hit_test(x, y)]
+        return np.flatnonzero(self._hit_mask(int(x), int(y))).tolist()
+
+    def topmost_at(self, x: int, y: int) -> int | None:
+        """Верхняя строка под точкой или None."""
+        if np is None or not len(self):
+            for row in range(len(self) - 1, -1, -1):
+                if ShapeHandle(self, row).hit_test(x, y):
+                    return row
+            return None
+        hits = np.flatnonzero(self._hit_mask(int(x), int(y)))
+        return int(hits[-1]) if len(hits) else None
+
+    def rows_in(self, rect: QRect, contained: bool = False) -> list[int]:
+        """
+        Строки, чей bounds() пересекает rect (как QRect.intersects), а при contained=True —
+        целиком внутри (как Figure.is_fit_in_bounds), снизу вверх. Вырожденные rect — по тем же правилам.
+        """
+        if np is None or not len(self):
+            if contained:
+                return [h.row for h in self if Figure.is_fit_in_bounds(h.bounds(), rect)]
+            return [h.row for h in self if h.bounds().intersects(rect)]
+        l, t, r, b = self.bounds_columns()
+        if contained:
+            mask = (l >= rect.left()) & (t >= rect.top()) & (r <= rect.right()) & (b <= rect.bottom())
+            return np.flatnonzero(mask).tolist()
+        if rect.isNull():
+            return []
+        # QRect.intersects: отрицательный размер разворачивает отрезок, нулевой даёт пустой (left > right),
+        # который всё же пересекает bounds, лежащий по обе стороны от него
+        ql, qr = _span(rect.left(), rect.width())
+        qt, qb = _span(rect.top(), rect.height())
+        mask = (l <= qr) & (ql <= r) & (t <= qb) & (qt <= b)
+        return np.flatnonzero(mask).tolist()
+
+    def _np_columns(self):
+        k = np.frombuffer(self.kind, dtype=np.int8)
+        xs = [np.frombuffer(c, dtype=np.int32).astype(np.int64) for c in self.xs]
+        ys = [np.frombuffer(c, dtype=np.int32).astype(np.int64) for c in self.ys]
+        widths = np.fromiter((s.pen_width for s in self.styles), dtype=np.int64, count=len(self.styles))
+        pw = widths[np.frombuffer(self.style, dtype=np.uint32)]
+        return k, xs, ys, pw
+
+    @staticmethod
+    def _corner_columns(k, x1, y1, x2, y2):
+        """Rectangle._corners по столбцам; у строк Square — квадрат по наибольшей стороне (Square._corners)."""
+        l, r = np.minimum(x1, x2), np.maximum(x1, x2)
+        top, b = np.minimum(y1, y2), np.maximum(y1, y2)
+        sq = k == SQUARE
+        if sq.any():
+            size = np.maximum(r - l, b - top)
+            sl = np.where(x2 >= x1, x1, x1 - size)[sq]
+            st = np.where(y2 >= y1, y1, y1 - size)[sq]
+            l[sq], top[sq], r[sq], b[sq] = sl, st, sl + size[sq], st + size[sq]
+        return l, top, r, b
+
+    def bounds_columns(self):
+        """bounds() всех строк как четыре массива left, top, right, bottom (включительно, как у QRect)."""
+        k, (x1, x2, x3), (y1, y2, y3), pw = self._np_columns()
+        tol = ShapeHandle.tolerance
+        # Figure._reach
+        t = np.maximum(pw, np.ceil(pw / 2 + tol).astype(np.int64))
+        l, top, r, b = self._corner_columns(k, x1, y1, x2, y2)
+        tri = k == TRIANGLE
+        l[tri] = np.minimum(l, x3)[tri]; r[tri] = np.maximum(r, x3)[tri]
+        top[tri] = np.minimum(top, y3)[tri]; b[tri] = np.maximum(b, y3)[tri]
+        l, top, r, b = l - t, top - t, r + t, b + t
+
+        pt = k == POINT
+        rp = _point_shape()[1]
+        l[pt], r[pt], top[pt], b[pt] = x1[pt] - rp, x1[pt] + rp, y1[pt] - rp, y1[pt] + rp
+        circ = k == CIRCLE
+        tc = np.maximum(np.abs(x2 - x1), np.abs(y2 - y1)) + t
+        l[circ], r[circ] = (x1 - tc)[circ], (x1 + tc)[circ]
+        top[circ], b[circ] = (y1 - tc)[circ], (y1 + tc)[circ]
+        ell = k == ELLIPSE
+        rx, ry = np.abs(x2 - x1), np.abs(y2 - y1)
+        l[ell], r[ell] = (x1 - rx - t)[ell], (x1 + rx + t)[ell]
+        top[ell], b[ell] = (y1 - ry - t)[ell], (y1 + ry + t)[ell]
+        return l, top, r, b
+
+    def _hit_mask(self, x: int, y: int):
+        k, (x1, x2, x3), (y1, y2, y3), pw = self._np_columns()
+        tol = ShapeHandle.tolerance
+        eps = self.BORDER_EPS
+        hit = np.zeros(len(k), dtype=bool)
+        # строки, где вещественное сравнение слишком близко к границе — их решает скалярный hit_test
+        unsure = np.zeros(len(k), dtype=bool)
+        half = np.maximum(pw / 2, tol)
+        bl, bt, br, bb = self.bounds_columns()
+        in_bounds = (bl <= x) & (x <= br) & (bt <= y) & (y <= bb)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Point: точка в bounds()
+            m = k == POINT
+            hit[m] = in_bounds[m]
+
+            # Line: расстояние до отрезка (при x1 == x2 — до первой точки, как в Line.hit_test)
+            m = k == LINE
+            if m.any():
+                vx, vy = (x2 - x1)[m], (y2 - y1)[m]
+                wx, wy = x - x1[m], y - y1[m]
+                seg_len2 = vx * vx + vy * vy
+                tt = np.clip((wx * vx + wy * vy) / np.where(seg_len2 == 0, 1, seg_len2), 0.0, 1.0)
+                d = np.hypot(x - (x1[m] + tt * vx), y - (y1[m] + tt * vy))
+                d = np.where(vx == 0, np.hypot(wx, wy), d)
+                lim = pw[m] / 2 + tol
+                hit[m] = d <= lim
+                unsure[m] = np.abs(d - lim) <= eps
+
+            # Rectangle/Square: QRect(int(...)).contains с допуском
+            m = (k == RECTANGLE) | (k == SQUARE)
+            if m.any():
+                h = half[m]
+                left, top, right, bottom = (c[m] for c in self._corner_columns(k, x1, y1, x2, y2))
+                rl, rt = np.trunc(left - h), np.trunc(top - h)
+                rw, rh = np.trunc((right - left) + 2 * h), np.trunc((bottom - top) + 2 * h)
+                hit[m] = (rl <= x) & (x <= rl + rw - 1) & (rt <= y) & (y <= rt + rh - 1)
+
+            # Circle
+            m = k == CIRCLE
+            if m.any():
+                r = np.maximum(np.abs(x2 - x1), np.abs(y2 - y1))[m]
+                d = np.hypot(x - x1[m], y - y1[m])
+                lim = r + half[m]
+                hit[m] = d <= lim
+                unsure[m] = np.abs(d - lim) <= eps
+
+            # Ellipse
+            m = k == ELLIPSE
+            if m.any():
+                rx, ry = np.abs(x2 - x1)[m], np.abs(y2 - y1)[m]
+                nx, ny = (x - x1[m]) / rx, (y - y1[m]) / ry
+                val = nx * nx + ny * ny
+                lim = 1.0 + half[m] / np.maximum(rx, ry)
+                ok = (rx != 0) & (ry != 0)
+                hit[m] = ok & (val <= lim)
+                unsure[m] = ok & (np.abs(val - lim) <= eps * np.maximum(1.0, lim))
+
+            # Triangle: барицентрические координаты
+            m = k == TRIANGLE
+            if m.any():
+                ax, ay, bx, by, cx, cy = x1[m], y1[m], x2[m], y2[m], x3[m], y3[m]
+                denom = (by - cy) * (ax - cx) + (cx - bx) * (ay - cy)
+                a = ((by - cy) * (x - cx) + (cx - bx) * (y - cy)) / denom
+                b = ((cy - ay) * (x - cx) + (ax - cx) * (y - cy)) / denom
+                c = 1 - a - b
+                ok = (denom != 0) & in_bounds[m]
+                hit[m] = ok & (a >= -0.02) & (b >= -0.02) & (c >= -0.02)
+                near = (np.abs(a + 0.02) <= eps) | (np.abs(b + 0.02) <= eps) | (np.abs(c + 0.02) <= eps)
+                unsure[m] = ok & near
+
+        for row in np.flatnonzero(unsure).tolist():
+            hit[row] = self.row_hit(row, x, y)
+        return hit
+
+    def paint(self, painter: QPainter, rect: QRect | None = None):
+        """
+        Нарисовать строки по порядку (только пересекающие rect, если он задан).
+        Строки уходят в renderer.paint_figures как ShapeHandle — серии рисуются прямо по колонкам,
+        с общими перьями стилей; фигура строится только для выделенных (рамка выделения).
+        """
+        rows = range(len(self)) if rect is None else self.rows_in(rect)
+        renderer.paint_figures(painter, [ShapeHandle(self, row) for row in rows])
+
+
+class ShapeHandle:
+    """
+    Лёгкое окно в строку SceneStore с API примитива: bounds, hit_test, draw, change_position,
+    ess/pen_color/..., selected, to_dict. Чтение идёт прямо из колонок (SceneStore.row_bounds/row_hit,
+    схема класса для to_dict); правки, которые решает класс фигуры, делаются на фигуре из строки
+    с записью обратно. Живёт до следующего remove().
+    """
+    __slots__ = ("_store", "_row")
+    tolerance = Figure.tolerance
+    finished = True
+
+    def __init__(self, store: SceneStore, row: int):
+        self._store = store
+        self._row = row
+
+    def __eq__(self, other):
+        return isinstance(other, ShapeHandle) and other._store is self._store and other._row == self._row
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
+    def __repr__(self):
+        return f"<{self.type_name} handle row={self._row}>"
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    @property
+    def kind(self) -> int:
+        return self._store.kind[self._row]
+
+    @property
+    def type_name(self) -> str:
+        return KINDS[self.kind]
+
+    @property
+    def figure_class(self) -> type:
+        """Класс figures.py, который рисует строку (для серий renderer)."""
+        return _CLASSES[self.kind]
+
+    def figure(self) -> Figure:
+        """Фигура из строки (см. SceneStore.figure); её правки в строку не попадают."""
+        return self._store.figure(self._row)
+
+    def _edit(self, fn):
+        fig = self.figure()
+        fn(fig)
+        self._store.write(self._row, fig)
+
+    # --- геометрия ---
+    def get_points(self) -> list[list[int]]:
+        s, r = self._store, self._row
+        return [[s.xs[i][r], s.ys[i][r]] for i in range(_NPOINTS.get(s.kind[r], 2))]
+
+    @property
+    def points(self) -> list[list[int]]:
+        # копия: запись идёт через change_position/set_points
+        return self.get_points()
+
+    def set_points(self, points):
+        s, r = self._store, self._row
+        if len(points) != _NPOINTS.get(s.kind[r], 2):
+            raise ValueError("wrong number of points")
+        for i, (x, y) in enumerate(points):
+            s.xs[i][r] = int(x)
+            s.ys[i][r] = int(y)
+
+    @property
+    def x(self) -> int:
+        return self._store.xs[0][self._row]
+
+    @property
+    def y(self) -> int:
+        return self._store.ys[0][self._row]
+
+    # --- стиль ---
+    @property
+    def style_id(self) -> int:
+        return self._store.style[self._row]
+
+    @property
+    def ess(self) -> Style:
+        return self._store.styles[self.style_id]
+
+    @ess.setter
+    def ess(self, value: Style | DrawEssentials):
+        if isinstance(value, (Style, DrawEssentials)):
+            self._store.style[self._row] = self._store.intern_style(value)
+
+    @property
+    def pen_color(self):
+        return self.ess.pen_color
+    @pen_color.setter
+    def pen_color(self, value):
+        self._edit(lambda f: setattr(f, "pen_color", value))
+
+    @property
+    def brush_color(self):
+        return self.ess.brush_color
+    @brush_color.setter
+    def brush_color(self, value):
+        self._edit(lambda f: setattr(f, "brush_color", value))
+
+    @property
+    def pen_width(self) -> int:
+        # у Point толщина своя, классовая
+        return figures.Point.pen_width if self.kind == POINT else self.ess.pen_width
+    @pen_width.setter
+    def pen_width(self, value: int):
+        self._edit(lambda f: setattr(f, "pen_width", value))
+
+    @property
+    def radius(self) -> int:
+        return _point_shape()[0] if self.kind == POINT else self.ess.radius
+    @radius.setter
+    def radius(self, value: int):
+        # у круга/эллипса радиус двигает точки — это решает класс фигуры
+        self._edit(lambda f: setattr(f, "radius", value))
+
+    @property
+    def selected(self) -> bool:
+        return bool(self._store.flags[self._row] & SELECTED)
+
+    @selected.setter
+    def selected(self, v: bool):
+        f = self._store.flags[self._row]
+        self._store.flags[self._row] = (f | SELECTED) if v else (f & ~SELECTED)
+
+    # --- поведение фигуры ---
+    def bounds(self) -> QRect:
+        l, t, r, b = self._store.row_bounds(self._row)
+        return QRect(l, t, r - l + 1, b - t + 1)
+
+    def get_center(self) -> QPoint | None:
+        return self.bounds().center()
+
+    def hit_test(self, x: int, y: int) -> bool:
+        return self._store.row_hit(self._row, x, y)
+
+    def _corners(self, x1: int, y1: int, x2: int, y2: int) -> tuple[int, int, int, int]:
+        # Rectangle/Square: прямоугольник, который рисует класс строки (для renderer)
+        return self.figure_class._corners(x1, y1, x2, y2)
+
+    def change_position(self, dx: int, dy: int, bounds: QRect = None, event=None):
+        """Сдвиг с проверкой bounds, как у фигур; наблюдателей у строк нет."""
+        self._edit(lambda f: f.change_position(dx, dy, bounds))
+
+    def draw(self, painter: QPainter):
+        self.to_figure().draw(painter)
+
+    def paint(self, painter: QPainter):
+        self.to_figure().paint(painter)
+
+    # --- сериализация ---
+    def to_dict(self) -> dict:
+        # то же, что Schema.encode у фигуры: поля схемы по порядку — это координаты строки
+        schema = self.figure_class.schema
+        item = {"ess": self.ess.to_dict(), **dict(zip(schema.names, self._store.coords(self._row)))}
+        if schema.version > 1:
+            item[VERSION_KEY] = schema.version
+        return item
+
+    def to_figure(self) -> Figure:
+        """Полноценная фигура с теми же геометрией, стилем и выделением."""
+        fig = self.figure()
+        fig.selected = self.selected
+        return fig
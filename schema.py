@@ -0,0 +1,107 @@
+"""
+Декларативные схемы сериализации фигур. Класс фигуры описывает поля элемента документа
+(имя, откуда взять значение, обязательность), а to_dict/from_dict строятся по схеме:
+
+    class Line(Figure):
+        schema = Schema(*coords("x1", "y1", "x2", "y2"))
+
+Значения полей передаются в конструктор класса по порядку, стиль — через ess=.
+Элемент — обычный словарь, так что схема годится для любого формата поверх элементов
+(JSON, binary_format, журнал автосохранения).
+
+Версии: у схемы есть version; элементы версии больше 1 несут "_v". Чтобы старые файлы
+продолжали читаться, при смене полей схема получает migrations — {старая версия: функция(элемент) ->
+элемент следующей версии}; from_dict прогоняет элемент по цепочке до текущей версии.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any, Callable
+from settings import DrawEssentials
+from styles import Style, STYLES
+
+VERSION_KEY = "_v"
+
+
+def _ess_to_dict(ess: Style | DrawEssentials | None) -> dict[str, any] | None:
+    if isinstance(ess, Style):
+        return ess.to_dict()
+    if not isinstance(ess, DrawEssentials):
+        return None
+    pc = ess.pen_color
+    bc = ess.brush_color
+    return {
+        "pen_color": (pc.red(), pc.green(), pc.blue(), pc.alpha()),
+        "brush_color": (bc.red(), bc.green(), bc.blue(), bc.alpha()),
+        "pen_width": ess.pen_width,
+        "radius": ess.radius
+    }
+
+def _ess_from_dict(d) -> Style:
+    # сразу общий стиль из таблицы — без промежуточных QColor на каждую фигуру;
+    # готовый Style (его кладёт parallel_load) берётся как есть
+    return STYLES.intern(d if isinstance(d, Style) else Style.from_dict(d))
+
+
+@dataclass(frozen=True)
+class Field:
+    """
+    Поле элемента. get(фигура) -> значение.
+    required — целое, при отсутствии 0; иначе значение как есть (None — точка ещё не задана).
+    """
+    name: str
+    get: Callable[[Any], Any]
+    required: bool = False
+
+
+def attr(name: str, required: bool = True) -> Field:
+    """Поле из одноимённого атрибута фигуры."""
+    return Field(name, attrgetter(name), required)
+
+
+def coords(*names: str, required: int = 2) -> tuple[Field, ...]:
+    """Поля из self.points: имена парами (x, y) по точкам; первые required имён обязательны."""
+    def getter(i: int, j: int):
+        return lambda fig: fig.points[i][j]
+    return tuple(Field(name, getter(k // 2, k % 2), k < required) for k, name in enumerate(names))
+
+
+class Schema:
+    def __init__(self, *fields: Field, version: int = 1, migrations: dict[int, Callable[[dict], dict]] | None = None):
+        self.fields = fields
+        self.names = tuple(f.name for f in fields)
+        self.version = version
+        self.migrations = dict(migrations or {})
+        missing = [v for v in range(1, version) if v not in self.migrations]
+        if missing:
+            raise ValueError(f"Schema version {version} has no migrations from {missing}")
+        self._getters = tuple((f.name, f.get) for f in fields)
+        self._readers = tuple((f.name, f.required) for f in fields)
+
+    def encode(self, figure) -> dict:
+        """Фигура -> элемент (без "_type")."""
+        item = {"ess": _ess_to_dict(figure.ess)}
+        for name, get in self._getters:
+            item[name] = get(figure)
+        if self.version > 1:
+            item[VERSION_KEY] = self.version
+        return item
+
+    def upgrade(self, data: dict) -> dict:
+        """Элемент любой известной версии -> элемент текущей."""
+        v = data.get(VERSION_KEY, 1)
+        if v == self.version:
+            return data
+        if not isinstance(v, int) or not 1 <= v < self.version:
+            raise RuntimeError(f"Unsupported item version {v!r} (schema version {self.version})")
+        while v < self.version:
+            data = self.migrations[v](dict(data))
+            v += 1
+        return data
+
+    def decode(self, cls, data: dict):
+        """Элемент -> новая фигура класса cls."""
+        if VERSION_KEY in data or self.version > 1:
+            data = self.upgrade(data)
+        args = [int(data.get(name, 0)) if required else data.get(name) for name, required in self._readers]
+        return cls(*args, ess=_ess_from_dict(data.get("ess")))
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import heapq
+from typing import Any, Iterable
+from PyQt6.QtCore import QRect
+
+
+class GridIndex:
+    """
+    Пространственный индекс по равномерной сетке.
+    Каждый объект лежит во всех ячейках, которые пересекает его прямоугольник,
+    поэтому запрос по точке смотрит ровно одну ячейку.
+    Очень большие объекты (больше MAX_CELLS ячеек) хранятся отдельно и проверяются всегда.
+    """
+    CELL_SIZE = 64
+    MAX_CELLS = 256
+
+    def __init__(self, cell_size: int | None = None):
+        self._cell = int(cell_size or self.CELL_SIZE)
+        self._cells: dict[tuple[int, int], set] = {}
+        # item -> (left, top, right, bottom) включительно, как у QRect
+        self._rects: dict[Any, tuple[int, int, int, int]] = {}
+        self._large: set = set()
+
+    def __len__(self) -> int:
+        return len(self._rects)
+
+    def __contains__(self, item) -> bool:
+        return item in self._rects
+
+    def _cell_range(self, l: int, t: int, r: int, b: int):
+        c = self._cell
+        return l // c, t // c, r // c, b // c
+
+    def update(self, item, rect: QRect | None) -> None:
+        """Вставить или переместить объект. Пустой/невалидный rect — убрать из индекса."""
+        if rect is None or rect.isNull() or not rect.isValid():
+            self.remove(item)
+            return
+        new = (rect.left(), rect.top(), rect.right(), rect.bottom())
+        old = self._rects.get(item)
+        if old == new:
+            return
+        if old is not None:
+            self.remove(item)
+        self._rects[item] = new
+
+        cx1, cy1, cx2, cy2 = self._cell_range(*new)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self.MAX_CELLS:
+            self._large.add(item)
+            return
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self._cells.setdefault((cx, cy), set()).add(item)
+
+    def remove(self, item) -> None:
+        old = self._rects.pop(item, None)
+        if old is None:
+            return
+        if item in self._large:
+            self._large.discard(item)
+            return
+        cx1, cy1, cx2, cy2 = self._cell_range(*old)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket is None:
+                    continue
+                bucket.discard(item)
+                if not bucket:
+                    del self._cells[(cx, cy)]
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._rects.clear()
+        self._large.clear()
+
+    def rect_of(self, item) -> QRect | None:
+        r = self._rects.get(item)
+        if r is None:
+            return None
+        l, t, rr, b = r
+        return QRect(l, t, rr - l + 1, b - t + 1)
+
+    def query_point(self, x: int, y: int) -> set:
+        """Объекты, чей прямоугольник содержит точку (x, y)."""
+        c = self._cell
+        candidates: Iterable = self._cells.get((x // c, y // c), ())
+        result = set()
+        for item in (*candidates, *self._large):
+            l, t, r, b = self._rects[item]
+            if l <= x <= r and t <= y <= b:
+                result.add(item)
+        return result
+
+    def query_rect(self, rect: QRect) -> set:
+        """Объекты, чей прямоугольник пересекает rect."""
+        if rect.isNull() or not rect.isValid():
+            return set()
+        ql, qt, qr, qb = rect.left(), rect.top(), rect.right(), rect.bottom()
+        cx1, cy1, cx2, cy2 = self._cell_range(ql, qt, qr, qb)
+
+        candidates = set(self._large)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._cells):
+            # запрос шире занятой области — дешевле пройти по непустым ячейкам
+            for (cx, cy), bucket in self._cells.items():
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2:
+                    candidates |= bucket
+        else:
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    bucket = self._cells.get((cx, cy))
+                    if bucket:
+                        candidates |= bucket
+
+        result = set()
+        for item in candidates:
+            l, t, r, b = self._rects[item]
+            if l <= qr and ql <= r and t <= qb and qt <= b:
+                result.add(item)
+        return result
+
+
+class ExtentTracker:
+    """
+    Общий охватывающий прямоугольник набора объектов с быстрыми изменениями.
+    По каждому краю — куча с ленивым удалением: устаревшие записи выбрасываются при запросе,
+    поэтому update/remove стоят O(log n), а rect() — амортизированно O(1).
+    """
+    def __init__(self):
+        # item -> (left, top, right, bottom); записи в кучах сверяются с ним по identity
+        self._rects: dict[Any, tuple[int, int, int, int]] = {}
+        # кучи: левый и верхний край — минимум, правый и нижний — максимум (храним со знаком минус)
+        self._heaps: tuple[list, list, list, list] = ([], [], [], [])
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._rects)
+
+    def update(self, item, rect: QRect | None) -> None:
+        """Задать прямоугольник объекта. Пустой/невалидный rect — убрать объект."""
+        if rect is None or rect.isNull() or not rect.isValid():
+            self.remove(item)
+            return
+        r = (rect.left(), rect.top(), rect.right(), rect.bottom())
+        if self._rects.get(item) == r:
+            return
+        self._rects[item] = r
+        self._seq += 1
+        for heap, value in zip(self._heaps, (r[0], r[1], -r[2], -r[3])):
+            heapq.heappush(heap, (value, self._seq, item, r))
+        if len(self._heaps[0]) > 2 * len(self._rects) + 64:
+            self._compact()
+
+    def remove(self, item) -> None:
+        self._rects.pop(item, None)
+        if not self._rects:
+            self.clear()
+
+    def clear(self) -> None:
+        self._rects.clear()
+        for heap in self._heaps:
+            heap.clear()
+
+    def _compact(self):
+        # устаревших записей стало больше живых — пересобрать кучи
+        for i, heap in enumerate(self._heaps):
+            sign = -1 if i >= 2 else 1
+            heap[:] = [(sign * r[i], n, item, r) for n, (item, r) in enumerate(self._rects.items())]
+            heapq.heapify(heap)
+        self._seq = len(self._rects)
+
+    def _top(self, i: int) -> int:
+        heap = self._heaps[i]
+        while heap:
+            value, _, item, r = heap[0]
+            if self._rects.get(item) is r:
+                return value
+            heapq.heappop(heap)
+        raise LookupError("empty extent")
+
+    def rect(self) -> QRect:
+        """Объединение всех прямоугольников (пустой QRect, если объектов нет)."""
+        if not self._rects:
+            return QRect()
+        l, t, r, b = self._top(0), self._top(1), -self._top(2), -self._top(3)
+        return QRect(l, t, r - l + 1, b - t + 1)
@@ -1,21 +1,112 @@
 from __future__ import annotations
-from PyQt6.QtCore import QObject, pyqtSignal
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+from PyQt6.QtCore import QObject, pyqtSignal, QRect
 from PyQt6.QtGui import QPainter
 from PyQt6.QtWidgets import QApplication
 import factory
 from settings import DrawSettings, DrawEssentials, ArrowTools
+from styles import Style
 from figures import Figure, FigureGroup, Hand
 from observer import Object, Event
+from spatial_index import GridIndex, ExtentTracker
+from lazy_document import LazyFigure
 import weakref
 
+
+@dataclass
+class Change:
+    """
+    Одно изменение в хранилище. row — позиция в z-порядке на момент изменения (для added/removed/replaced).
+    replaced — для replaced: заглушка, вместо которой теперь стоит figure.
+    """
+    kind: str
+    figure: Any
+    row: int | None = None
+    old_bounds: QRect | None = None
+    new_bounds: QRect | None = None
+    replaced: Any = None
+
+
+@dataclass
+class ChangeSet:
+    """
+    Всё, что изменила одна операция хранилища, в порядке выполнения.
+    damage — область холста для перерисовки; full=True — перерисовать всё.
+    """
+    ADDED = "added"
+    REMOVED = "removed"
+    MOVED = "moved"
+    RESTYLED = "restyled"
+    SELECTION = "selection"
+    REORDERED = "reordered"
+    # ленивая заглушка заменена настоящей фигурой на том же месте; картинка не меняется
+    REPLACED = "replaced"
+
+    changes: list[Change] = field(default_factory=list)
+    damage: QRect = field(default_factory=QRect)
+    full: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.changes) or self.full or not self.damage.isNull()
+
+    def of(self, *kinds: str) -> list[Change]:
+        return [c for c in self.changes if c.kind in kinds]
+
+    def has(self, *kinds: str) -> bool:
+        return any(c.kind in kinds for c in self.changes)
+
+    def figures(self, *kinds: str) -> list:
+        """Уникальные затронутые фигуры (в порядке первого упоминания), опционально по видам."""
+        seen = {}
+        for c in self.changes:
+            if not kinds or c.kind in kinds:
+                seen.setdefault(c.figure, None)
+        return list(seen)
+
+
 class FigureStorage(QObject, Object):
+    # набор изменений (ChangeSet) после каждой операции
+    changed = pyqtSignal(object)
+    # устаревший «что-то поменялось» без подробностей — эмитится вместе с changed
     canvas_updated = pyqtSignal()
 
+    # запас вокруг bounds() под сглаживание и наконечники стрелок; штрих пера и рамка выделения
+    # уже внутри bounds() (Figure._reach), так что от толщины пера запас не зависит
+    DAMAGE_MARGIN = 6
+
     def __init__(self, settings: DrawSettings | None = None, cmd_manager=None):
         super().__init__()
         self.__figures = []
-        # Ordered timeline of selected figures (weakrefs) — сохраняет порядок выбора
-        self.__selected_timeline: list[weakref.ref] = []
+        # пространственный индекс по bounds() верхнеуровневых фигур (для hit-test и запросов по области)
+        self.__index = GridIndex()
+        # охват дорисованных фигур (проверка «помещается ли сцена» при ресайзе холста)
+        self.__extent = ExtentTracker()
+        # figure -> позиция в __figures; ключи — ровно фигуры хранилища.
+        # Позиции < __order_valid точны, хвост после вставки/удаления досчитывается лениво,
+        # поэтому удаление с конца (delete_selected, clear_all) не пересчитывает весь список
+        self.__order: dict = {}
+        self.__order_valid = 0
+        # обратные связи: фигура -> фигуры, в чьих наблюдателях она состоит (надмножество, слабые ссылки)
+        self.__observed_in = weakref.WeakKeyDictionary()
+        # фигура -> группы хранилища, в которые она входит ребёнком
+        self.__groups_of = weakref.WeakKeyDictionary()
+        # накопленные с последнего emit_update изменения и область повреждения
+        self.__changes: list[Change] = []
+        self.__damage = QRect()
+        self.__full = False
+        # глубина вложенных batch(); пока > 0, emit_update только копит изменения
+        self.__batch_depth = 0
+        # фигуры, у которых когда-либо появлялись стрелки (обычно их единицы)
+        self.__arrow_sources = weakref.WeakSet()
+        # выделение: dict как упорядоченное множество — O(1) проверка/вставка/удаление,
+        # порядок ключей = порядок выбора
+        self.__selection: dict = {}
+        # открытые лениво документы (lazy_document), чьи заглушки сейчас в хранилище
+        self.__lazy_docs: dict = {}
+        # документы без строк, которые пока не закрываем (см. keep_documents); None — не копим
+        self.__kept_docs: dict | None = None
 
         self.settings = settings if isinstance(settings, DrawSettings) else DrawSettings()
 
@@ -28,40 +119,293 @@ class FigureStorage(QObject, Object):
         self.settings.radiusChanged.connect(self._on_radius_changed)
         self.settings.frameArrowsTriggered.connect(self._on_frame_arrows)
 
-        # при любом canvas_updated уведомляем также наблюдателей через Observer
-        # теперь передаём корректный Event — чтобы Observer.update мог читать event.type и payload
-        self.canvas_updated.connect(lambda: self.notify(Event(type="canvas_updated", payload=None)))
+    # --- пространственный индекс и области перерисовки ---
+    def _reindex(self, figures, kind: str | None = None):
+        # старая область берётся из индекса, новая — из bounds(); обе идут в damage
+        for f in figures:
+            old = self.__index.rect_of(f)
+            if old is not None:
+                self._add_damage(old)
+            new = f.bounds()
+            if isinstance(f, LazyFigure):
+                # заглушки ищутся по таблице bounds своего документа, в сетку не попадают
+                self._track_lazy(f, True)
+            else:
+                self.__index.update(f, new)
+                self.__extent.update(f, new if getattr(f, "finished", True) is not False else None)
+            self._add_damage(new)
+            if kind is not None:
+                self._record(kind, f, old_bounds=old, new_bounds=QRect(new))
+        self._mark_damaged(self._arrow_partners(figures))
+
+    def _record(self, kind: str, figure, row: int | None = None, old_bounds=None, new_bounds=None, replaced=None):
+        self.__changes.append(Change(kind, figure, row, old_bounds, new_bounds, replaced))
+
+    def _add_damage(self, rect: QRect):
+        if rect.isNull() or not rect.isValid():
+            return
+        m = self.DAMAGE_MARGIN
+        rect = rect.adjusted(-m, -m, m, m)
+        self.__damage = rect if self.__damage.isNull() else self.__damage.united(rect)
+
+    def _mark_damaged(self, figures):
+        for f in figures:
+            self._add_damage(f.bounds())
+
+    def _arrow_partners(self, figures) -> list:
+        """Фигуры на другом конце стрелок, касающихся figures (линия стрелки лежит в их общем bbox)."""
+        if not self.__arrow_sources:
+            return []
+        figs = set(figures)
+        partners = []
+        for src in list(self.__arrow_sources):
+            observers = [o for o in src.get_observers() if isinstance(o, Figure)]
+            if src in figs:
+                partners.extend(observers)
+            elif any(o in figs for o in observers):
+                partners.append(src)
+        return partners
+
+    def _restyled(self, figures):
+        # стиль меняет картинку, но не обязательно bounds()
+        for f in figures:
+            f.invalidate_cache()
+            b = f.bounds()
+            self._add_damage(b)
+            self._record(ChangeSet.RESTYLED, f, old_bounds=b, new_bounds=b)
+
+    def emit_update(self, full: bool = False):
+        """
+        Опубликовать накопленные изменения одним ChangeSet:
+        сигнал changed, Observer-событие "changes" и устаревший canvas_updated.
+        """
+        self.__full = self.__full or full
+        if self.__batch_depth > 0:
+            return
+        cs = ChangeSet(self.__changes, self.__damage, self.__full)
+        self.__changes, self.__damage, self.__full = [], QRect(), False
+        if not cs:
+            return
+        self.changed.emit(cs)
+        self.notify(Event(type="changes", payload={"changes": cs}))
+        self.canvas_updated.emit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Транзакция: промежуточные уведомления подавляются,
+        при выходе из внешнего batch() публикуется один общий ChangeSet.
+        """
+        self.__batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.__batch_depth -= 1
+            if self.__batch_depth == 0:
+                self.emit_update()
+
+    def __contains__(self, figure) -> bool:
+        return figure in self.__order
+
+    def index_of(self, figure) -> int | None:
+        """Позиция фигуры в z-порядке (None, если фигуры нет в хранилище)."""
+        pos = self.__order.get(figure)
+        if pos is None or pos < self.__order_valid:
+            return pos
+        figs = self.__figures
+        for i in range(self.__order_valid, len(figs)):
+            self.__order[figs[i]] = i
+        self.__order_valid = len(figs)
+        return self.__order[figure]
+
+    def _place(self, index: int, figure):
+        # вставка в список + учёт позиции и связей фигуры
+        self.__figures.insert(index, figure)
+        self.__order[figure] = index
+        if index < self.__order_valid:
+            self.__order_valid = index
+        elif self.__order_valid == index == len(self.__figures) - 1:
+            # добавление в конец при верных позициях; вставка в середину сдвигает всё, что после
+            self.__order_valid = index + 1
+        if isinstance(figure, FigureGroup):
+            for child in figure.figures:
+                self.__groups_of.setdefault(child, weakref.WeakSet()).add(figure)
+
+    def _remove_at(self, row: int, figure):
+        self._reindex_removed(figure, row)
+        del self.__figures[row]
+        del self.__order[figure]
+        self.__order_valid = min(self.__order_valid, row)
+        if isinstance(figure, FigureGroup):
+            for child in figure.figures:
+                groups = self.__groups_of.get(child)
+                if groups is not None:
+                    groups.discard(figure)
+
+    def _link(self, subject, observer):
+        """observer начинает наблюдать subject (стрелка subject -> observer)."""
+        subject.add_observer(observer)
+        self.__observed_in.setdefault(observer, weakref.WeakSet()).add(subject)
+
+    def _unlink(self, subject, observer):
+        subject.remove_observer(observer)
+        subjects = self.__observed_in.get(observer)
+        if subjects is not None:
+            subjects.discard(subject)
+
+    def linked_figures(self, figures) -> list:
+        """Фигуры + все, до кого дойдёт notify_move по цепочке наблюдателей."""
+        result, seen, stack = [], set(), list(figures)
+        while stack:
+            f = stack.pop()
+            if f in seen:
+                continue
+            seen.add(f)
+            result.append(f)
+            stack.extend(o for o in f.get_observers() if isinstance(o, Figure))
+        return result
+
+    def scene_rect(self) -> QRect:
+        """Общий bounds() всех дорисованных фигур (пустой QRect, если их нет)."""
+        rect = self.__extent.rect()
+        for doc in self.__lazy_docs:
+            ext = doc.extent()
+            rect = ext if rect.isNull() else rect.united(ext)
+        return rect
+
+    def _query_point(self, x: int, y: int) -> set:
+        found = self.__index.query_point(x, y)
+        for doc in self.__lazy_docs:
+            found.update(doc.proxy(r) for r in doc.rows_at(x, y))
+        return found
+
+    def _query_rect(self, rect: QRect) -> set:
+        found = self.__index.query_rect(rect)
+        for doc in self.__lazy_docs:
+            found.update(doc.proxy(r) for r in doc.rows_in(rect))
+        return found
+
+    def figures_at(self, x: int, y: int) -> list:
+        """Фигуры под точкой (точный hit_test), сверху вниз."""
+        candidates = self._materialize(sorted(self._query_point(x, y), key=self.index_of, reverse=True))
+        return [f for f in candidates if f.hit_test(x, y)]
+
+    def figure_at(self, x: int, y: int):
+        """Самая верхняя фигура под точкой или None."""
+        for f in self._materialize(sorted(self._query_point(x, y), key=self.index_of, reverse=True)):
+            if f.hit_test(x, y):
+                return f
+        return None
+
+    def figures_in(self, rect: QRect) -> list:
+        """Фигуры, чей bounds() пересекает rect, в порядке отрисовки (снизу вверх)."""
+        return self._materialize(sorted(self._query_rect(rect), key=self.index_of))
+
+    # --- ленивые документы ---
+    def _track_lazy(self, proxy: LazyFigure, present: bool):
+        # документ участвует в запросах, пока в хранилище есть хоть одна его строка;
+        # последнюю строку заменили фигурой или убрали (в том числе новым документом) — mmap закрывается
+        doc = proxy.document
+        doc.set_live(proxy.row, present)
+        if doc.has_live():
+            self.__lazy_docs[doc] = None
+        elif doc in self.__lazy_docs:
+            del self.__lazy_docs[doc]
+            if self.__kept_docs is None:
+                doc.close()
+            else:
+                self.__kept_docs[doc] = None
+
+    def keep_documents(self, keep: bool):
+        """
+        keep=True — ленивые документы не закрываются, даже если из хранилища ушла последняя их строка:
+        замену документа ещё можно откатить, вернув старые строки.
+        keep=False — закрыть те из них, что так и остались без строк.
+        """
+        if keep:
+            if self.__kept_docs is None:
+                self.__kept_docs = {}
+            return
+        kept, self.__kept_docs = self.__kept_docs or {}, None
+        for doc in kept:
+            if not doc.has_live():
+                doc.close()
+
+    def _materialize(self, figures: list) -> list:
+        """
+        Заглушки LazyFigure среди figures заменяются настоящими фигурами — в ответе и в хранилище.
+        Наружу (отрисовка, hit-test, выделение) заглушки не уходят.
+        """
+        if not any(isinstance(f, LazyFigure) for f in figures):
+            return figures
+        result = [self._replace(f, f.materialize()) if isinstance(f, LazyFigure) and f in self else f
+                  for f in figures]
+        self.emit_update()
+        return result
+
+    def _replace(self, old, new):
+        row = self.index_of(old)
+        self.__figures[row] = new
+        del self.__order[old]
+        self.__order[new] = row
+        bounds = new.bounds()
+        self._track_lazy(old, False)
+        self.__index.update(new, bounds)
+        self.__extent.update(new, bounds)
+        if old in self.__selection:
+            new.selected = True
+            self.__selection = {new if f is old else f: None for f in self.__selection}
+        if isinstance(new, FigureGroup):
+            for child in new.figures:
+                self.__groups_of.setdefault(child, weakref.WeakSet()).add(new)
+        self._record(ChangeSet.REPLACED, new, row, old_bounds=bounds, new_bounds=QRect(bounds), replaced=old)
+        return new
+
+    def refresh(self, figure):
+        """Фигуру изменили снаружи (панель свойств и т.п.) — обновить индекс и перерисовать."""
+        figure.invalidate_shape()
+        self._reindex(self.linked_figures([figure]), ChangeSet.RESTYLED)
+        self.emit_update()
 
     def _on_pen_width_changed(self, w: int):
-        for f in self.get_selected():
-            f.ess.pen_width = w
-        self.canvas_updated.emit()
+        selected = self.get_selected()
+        for f in selected:
+            f.restyle(pen_width=w)
+        self._reindex(selected, ChangeSet.RESTYLED)
+        self.emit_update()
 
     def _on_brush_color_changed(self, c):
-        for f in self.get_selected():
-            f.ess.brush_color = c
-        self.canvas_updated.emit()
+        selected = self.get_selected()
+        for f in selected:
+            f.restyle(brush_color=c)
+        self._restyled(selected)
+        self.emit_update()
 
     def _on_pen_color_changed(self, c):
-        for f in self.get_selected():
-            f.ess.pen_color = c
-        self.canvas_updated.emit()
+        selected = self.get_selected()
+        for f in selected:
+            f.restyle(pen_color=c)
+        self._restyled(selected)
+        self.emit_update()
 
     def _on_radius_changed(self, r: int):
-        for f in self.get_selected():
+        selected = self.get_selected()
+        for f in selected:
             if hasattr(f, 'radius'):
                 try:
                     f.radius = r
                 except Exception:
                     pass
-        self.canvas_updated.emit()
+        self._reindex(selected, ChangeSet.RESTYLED)
+        self.emit_update()
 
     # (7) НЕ пишем обратно в settings.* при хоткеях
     def adjust_size_selected(self, delta: int):
         changed = False
-        for f in self.get_selected():
-            if hasattr(f, 'ess') and isinstance(f.ess, DrawEssentials):
-                f.ess.pen_width = max(1, f.ess.pen_width + delta)
+        selected = self.get_selected()
+        for f in selected:
+            if hasattr(f, 'ess') and isinstance(f.ess, Style):
+                f.restyle(pen_width=max(1, f.ess.pen_width + delta))
                 changed = True
             if hasattr(f, 'radius'):
                 try:
@@ -70,53 +414,87 @@ class FigureStorage(QObject, Object):
                 except Exception:
                     pass
         if changed:
-            self.canvas_updated.emit()
+            self._reindex(selected, ChangeSet.RESTYLED)
+            self.emit_update()
 
     def add(self, figure):
         incomplete = self.get_incomplete()
         if incomplete and type(incomplete) == type(figure):
             incomplete.continue_drawing_point(figure.points[0][0], figure.points[0][1])
-            self.canvas_updated.emit()
+            self._reindex([incomplete], ChangeSet.RESTYLED)
+            self.emit_update()
             return
         elif incomplete:
             # silently drop unfinished of another type (или можно подсказать пользователю)
             self.delete(incomplete)
         if isinstance(figure, Hand):
             return
-        self.__figures.append(figure)
-        self.canvas_updated.emit()
+        row = len(self.__figures)
+        self._place(row, figure)
+        self._reindex([figure])
+        self._record(ChangeSet.ADDED, figure, row, new_bounds=figure.bounds())
+        self.emit_update()
+
+    # Низкоуровневые вставка/изъятие для команд: без разрыва связей и без уведомления,
+    # вызывающий оборачивает серию изменений в batch() (или сам вызывает emit_update()).
+    def insert(self, index: int | None, figure):
+        if index is None or index > len(self.__figures):
+            index = len(self.__figures)
+        self._place(index, figure)
+        if figure.selected:
+            # например, undo удаления выделенных фигур
+            self.__selection[figure] = None
+        self._reindex([figure])
+        self._record(ChangeSet.ADDED, figure, index, new_bounds=figure.bounds())
+
+    def take(self, figure) -> bool:
+        row = self.index_of(figure)
+        if row is None:
+            return False
+        self._remove_at(row, figure)
+        return True
+
+    def _reindex_removed(self, figure, row: int):
+        if isinstance(figure, LazyFigure):
+            # строки нет в сетке: её bounds — из индекса документа, пока тот ещё открыт
+            old = figure.bounds()
+            self._track_lazy(figure, False)
+        else:
+            old = self.__index.rect_of(figure)
+        if old is not None:
+            self._add_damage(old)
+        self._mark_damaged(self._arrow_partners([figure]))
+        self.__index.remove(figure)
+        self.__extent.remove(figure)
+        self.__selection.pop(figure, None)
+        self._record(ChangeSet.REMOVED, figure, row, old_bounds=old)
 
     def get_all(self): return self.__figures
 
-    # --- helpers for ordered weak timeline ---
-    def _clean_selected_timeline(self):
-        # удалить мёртвые weakrefs
-        self.__selected_timeline = [r for r in self.__selected_timeline if r() is not None]
-
-    def _add_to_timeline(self, figure):
-        # не дублируем, сохраняем порядок
-        self._clean_selected_timeline()
-        for r in self.__selected_timeline:
-            if r() is figure:
-                return
-        self.__selected_timeline.append(weakref.ref(figure))
+    # --- выделение ---
+    def is_selected(self, figure) -> bool:
+        return figure in self.__selection
 
-    def _remove_from_timeline(self, figure):
-        self.__selected_timeline = [r for r in self.__selected_timeline if r() is not None and r() is not figure]
+    def selected_count(self) -> int:
+        return len(self.__selection)
 
-    def _timeline_as_list(self):
-        self._clean_selected_timeline()
-        return [r() for r in self.__selected_timeline if r() is not None]
-    
+    def selection_order(self) -> list:
+        """Выделенные фигуры в порядке выбора."""
+        return list(self.__selection)
 
     def select_figure(self, figure, state: bool = True):
-        if figure in self.get_all():
+        if figure in self:
+            if state and isinstance(figure, LazyFigure):
+                # выделенное будут двигать и править — только настоящая фигура
+                figure = self._materialize([figure])[0]
             figure.selected = state
             if state:
-                self._add_to_timeline(figure)
+                self.__selection[figure] = None
             else:
-                self._remove_from_timeline(figure)
-            self.canvas_updated.emit()
+                self.__selection.pop(figure, None)
+            self._mark_damaged([figure])
+            self._record(ChangeSet.SELECTION, figure)
+            self.emit_update()
 
     def get_incomplete(self):
         for fig in self.__figures:
@@ -125,56 +503,52 @@ class FigureStorage(QObject, Object):
         return None
 
     def get_selected(self):
-        return [f for f in self.__figures if getattr(f, "selected", False)]
+        """Выделенные фигуры в z-порядке (как в списке фигур)."""
+        if len(self.__selection) < 2:
+            return list(self.__selection)
+        return sorted(self.__selection, key=self.index_of)
 
     def deselect_all(self):
-        self.__selected_timeline.clear()
-        changed = False
-        for f in self.__figures:
-            if getattr(f, "selected", False):
-                f.selected = False
-                changed = True
-        if changed:
-            self.canvas_updated.emit()
+        selection, self.__selection = self.__selection, {}
+        for f in selection:
+            f.selected = False
+            self._mark_damaged([f])
+            self._record(ChangeSet.SELECTION, f)
+        if selection:
+            self.emit_update()
 
     def delete(self, figure):
-        if figure in self.__figures:
+        row = self.index_of(figure)
+        if row is not None:
             # 1) убрать ссылку из списка фигур
-            self.__figures.remove(figure)
+            self._remove_at(row, figure)
 
-            # 2) удалить фигуру из observer-списков остальных фигур (чтобы стрелки/связи разорвались сразу)
-            for f in list(self.__figures):
-                try:
-                    f.remove_observer(figure)
-                except Exception:
-                    pass
+            # 2) удалить фигуру из observer-списков тех, за кем она наблюдала (чтобы стрелки/связи разорвались сразу)
+            for subject in list(self.__observed_in.pop(figure, ())):
+                subject.remove_observer(figure)
 
-                # если есть группа — убрать ребёнка из группы
-                try:
-                    if isinstance(f, FigureGroup) and figure in f.figures:
-                        try:
-                            f.figures.remove(figure)
-                        except ValueError:
-                            pass
-                except Exception:
-                    pass
-
-            # явно убрать из timeline, чтобы не ждать GC
-            try:
-                self._remove_from_timeline(figure)
-            except Exception:
-                pass
+            # если фигура — ребёнок группы хранилища, убрать её из группы
+            for group in list(self.__groups_of.pop(figure, ())):
+                if group in self and figure in group.figures:
+                    group.figures.remove(figure)
+                    group.invalidate_shape()
+                    self._reindex([group])
+                    self._record(ChangeSet.REORDERED, group)
 
-            self.canvas_updated.emit()
+            self.emit_update()
 
     def delete_selected(self):
         fig = self.get_selected()
-        for f in fig:
-            self.delete(f)
+        # сверху вниз: позиции нижележащих фигур при этом не сдвигаются
+        with self.batch():
+            for f in reversed(fig):
+                self.delete(f)
 
     def clear_all(self):
-        for f in self.get_all():
-            self.delete(f)
+        # копия списка: delete меняет его на ходу; с конца — каждое удаление O(связей фигуры)
+        with self.batch():
+            for f in reversed(list(self.get_all())):
+                self.delete(f)
 
     def create_group(self, settings: DrawEssentials):
         selected = self.get_selected()
@@ -183,9 +557,10 @@ class FigureStorage(QObject, Object):
             return
 
         group_figure = FigureGroup(figures=selected, ess=settings)
-        for f in selected:
-            self.delete(f)
-        self.add(group_figure)
+        with self.batch():
+            for f in reversed(selected):
+                self.delete(f)
+            self.add(group_figure)
 
     def destroy_group(self):
         selected = self.get_selected()
@@ -194,56 +569,63 @@ class FigureStorage(QObject, Object):
             return
 
         if isinstance(selected[0], FigureGroup):
-            for child in selected[0].figures:
-                self.add(child)
-            self.delete(selected[0])
+            with self.batch():
+                for child in selected[0].figures:
+                    self.add(child)
+                self.delete(selected[0])
 
     def _on_frame_arrows(self, arrow_tool: ArrowTools):
         """Обработать действие arrow-tool над выделенными фигурами."""
         print("Frame arrows action:", arrow_tool)
 
-        current_selected = self.get_selected()
-        # берём элементы из timeline в порядке выбора, но только те, что сейчас выделены
-        selected = [fig for fig in self._timeline_as_list() if fig in current_selected]
+        # берём выделенные в порядке выбора
+        selected = self.selection_order()
 
         if len(selected) != 2:
             print("Need exactly two selected figures to apply frame arrows.")
             return
         
         fig1, fig2 = selected
+        # старые стрелки обеих фигур тоже нужно стереть
+        self._mark_damaged([fig1, fig2, *self._arrow_partners([fig1, fig2])])
+        self.__arrow_sources.add(fig1)
+        self.__arrow_sources.add(fig2)
 
         # Снимаем/ставим связи в зависимости от режима
         if arrow_tool == ArrowTools.SINGLE:
             # односторонняя связь: при движении fig1 — будет обновляться fig2
-            fig1.add_observer(fig2)
+            self._link(fig1, fig2)
             # удаляем обратную связь
-            try:
-                fig2.remove_observer(fig1)
-            except Exception:
-                pass
+            self._unlink(fig2, fig1)
         elif arrow_tool == ArrowTools.DOUBLE:
             # двусторонняя — обе фигуры наблюдают друг за другом
-            fig1.add_observer(fig2)
-            fig2.add_observer(fig1)
+            self._link(fig1, fig2)
+            self._link(fig2, fig1)
         elif arrow_tool == ArrowTools.NONE:
             # снимаем любые связи между двумя фигурами
-            try:
-                fig1.remove_observer(fig2)
-            except Exception:
-                pass
-            try:
-                fig2.remove_observer(fig1)
-            except Exception:
-                pass
+            self._unlink(fig1, fig2)
+            self._unlink(fig2, fig1)
 
             fig1._move_master = None
             fig2._move_master = None
-        self.canvas_updated.emit()
-
-    def paint_arrows(self, painter: QPainter):
-        for fig in self.get_all():
-            if fig.have_arrows():
+        self.emit_update()
+
+    def paint_arrows(self, painter: QPainter, moving: set | None = None, dynamic: bool = False):
+        """
+        Нарисовать стрелки. Если задан moving — только «динамические» стрелки (касаются moving)
+        при dynamic=True или только «статические» при dynamic=False.
+        """
+        # стрелки бывают только у фигур, связанных через _on_frame_arrows
+        sources = [f for f in self.__arrow_sources if f in self]
+        for fig in sorted(sources, key=self.index_of):
+            if not fig.have_arrows():
+                continue
+            if moving is None:
                 fig.draw_arrows(painter)
+                continue
+            targets = [o for o in fig.get_observers() if ((fig in moving) or (o in moving)) == dynamic]
+            if targets:
+                fig.draw_arrows(painter, targets)
 
     def copy_selected_to_clipboard(self):
         # копируем элементы в буфер
@@ -256,6 +638,8 @@ class FigureStorage(QObject, Object):
             if len(selected) > 1:
                 # объединяем в группу и передаём в to_json как список
                 figure = FigureGroup(figures=selected)
+                # группа снимает флаг selected с детей — приводим выделение в соответствие
+                self.deselect_all()
             else:
                 # to_json ожидает итерируемый объект (список)
                 figure = selected[0]
@@ -281,4 +665,6 @@ class FigureStorage(QObject, Object):
     def move(self, figures: list[Figure], dx, dy, bounds=None):
         for fig in figures:
             fig.change_position(dx, dy, bounds)
-        self.canvas_updated.emit()
\ No newline at end of file
+        # вместе с фигурами по notify_move могли сдвинуться их наблюдатели
+        self._reindex(self.linked_figures(figures), ChangeSet.MOVED)
+        self.emit_update()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+import weakref
+from dataclasses import dataclass, field, replace
+from functools import cache
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QPen, QBrush
+from settings import DrawEssentials
+
+
+def _rgba(color: QColor) -> tuple[int, int, int, int]:
+    c = QColor(color)
+    return (c.red(), c.green(), c.blue(), c.alpha())
+
+
+@dataclass(frozen=True)
+class Style:
+    """
+    Неизменяемый стиль фигуры (то же, что DrawEssentials, но без изменяемых QColor).
+    Экземпляры интернируются в StyleTable, поэтому фигуры с одинаковым стилем делят один объект;
+    правка стиля фигуры — это переход на другой (тоже общий) Style, а не изменение этого.
+    """
+    pen_rgba: tuple[int, int, int, int] = (1, 1, 1, 255)
+    brush_rgba: tuple[int, int, int, int] = (255, 255, 255, 100)
+    pen_width: int = 2
+    radius: int = 5
+    # QPen/QBrush строятся один раз на стиль (перья — по толщине: у Point она своя)
+    _pens: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _brush: QBrush | None = field(default=None, init=False, repr=False, compare=False)
+    # таблица, в которой стиль интернирован (повторный intern — без поиска)
+    _table: StyleTable | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def pen_color(self) -> QColor:
+        return QColor(*self.pen_rgba)
+
+    @property
+    def brush_color(self) -> QColor:
+        return QColor(*self.brush_rgba)
+
+    def pen(self, width: int | None = None) -> QPen:
+        """Перо цвета pen_color толщиной width (по умолчанию pen_width). Общее — не изменять."""
+        width = self.pen_width if width is None else width
+        pen = self._pens.get(width)
+        if pen is None:
+            pen = self._pens[width] = QPen(self.pen_color, width)
+        return pen
+
+    def brush(self) -> QBrush:
+        if self._brush is None:
+            object.__setattr__(self, "_brush", QBrush(self.brush_color))
+        return self._brush
+
+    @classmethod
+    def from_ess(cls, ess: DrawEssentials) -> Style:
+        return cls(_rgba(ess.pen_color), _rgba(ess.brush_color), int(ess.pen_width), int(ess.radius))
+
+    def to_ess(self) -> DrawEssentials:
+        return DrawEssentials(pen_color=self.pen_color, brush_color=self.brush_color,
+                              pen_width=self.pen_width, radius=self.radius)
+
+    def to_dict(self) -> dict:
+        return {
+            "pen_color": self.pen_rgba,
+            "brush_color": self.brush_rgba,
+            "pen_width": self.pen_width,
+            "radius": self.radius,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict | None) -> Style:
+        default = _default_style()
+        if not d:
+            return default
+        return cls(tuple(d.get("pen_color", (0, 0, 0, 255))),
+                   tuple(d.get("brush_color", (255, 255, 255, 100))),
+                   int(d.get("pen_width", default.pen_width)),
+                   int(d.get("radius", default.radius)))
+
+
+@cache
+def _default_style() -> Style:
+    # стиль по умолчанию нужен на каждую загружаемую фигуру — DrawEssentials с QColor строим один раз
+    return Style.from_ess(DrawEssentials())
+
+
+_dash_pens: dict = {}
+
+def dash_pen(color: QColor, width: int) -> QPen:
+    """Общее штриховое перо (рамка выделения) для цвета и толщины."""
+    key = (color.rgba(), width)
+    pen = _dash_pens.get(key)
+    if pen is None:
+        pen = _dash_pens[key] = QPen(color, width)
+        pen.setStyle(Qt.PenStyle.DashLine)
+    return pen
+
+
+class StyleTable:
+    """Таблица интернированных стилей: один Style на каждый различный набор значений."""
+    def __init__(self):
+        # стиль живёт, пока на него ссылается хоть одна фигура
+        self._styles = weakref.WeakValueDictionary()
+
+    def __len__(self) -> int:
+        return len(self._styles)
+
+    def intern(self, value: Style | DrawEssentials | None) -> Style:
+        if isinstance(value, Style) and value._table is self:
+            return value
+        if value is None:
+            value = DrawEssentials()
+        style = value if isinstance(value, Style) else Style.from_ess(value)
+        # ключ — кортеж значений, а не сам Style, иначе словарь держал бы стиль вечно
+        key = (style.pen_rgba, style.brush_rgba, style.pen_width, style.radius)
+        shared = self._styles.get(key)
+        if shared is None:
+            self._styles[key] = shared = style
+            object.__setattr__(style, "_table", self)
+        return shared
+
+    def derive(self, style: Style, **changes) -> Style:
+        """
+        Копия стиля с изменёнными полями (copy-on-write).
+        Принимает имена DrawEssentials: pen_color/brush_color (QColor), pen_width, radius.
+        """
+        if "pen_color" in changes:
+            changes["pen_rgba"] = _rgba(changes.pop("pen_color"))
+        if "brush_color" in changes:
+            changes["brush_rgba"] = _rgba(changes.pop("brush_color"))
+        for k in ("pen_width", "radius"):
+            if k in changes:
+                changes[k] = int(changes[k])
+        return self.intern(replace(style, **changes))
+
+
+# общая таблица для всех фигур приложения
+STYLES = StyleTable()
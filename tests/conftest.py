@@ -0,0 +1,15 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app():
+    # фигуры — QObject, картинки и перья требуют экземпляра приложения
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,60 @@
+"""Журнал автосохранения не читает заглушки ленивого .figb в потоке GUI, а восстановление их не теряет."""
+import json
+
+import autosave
+import factory
+from figures import Line, Rectangle
+from lazy_document import LazyDocument
+from storage import FigureStorage
+
+
+def _items(figures) -> str:
+    return json.dumps([factory._item(f) for f in figures], sort_keys=True)
+
+
+def _load_lazy(storage, path):
+    doc = factory.open_lazy(path)
+    with storage.batch():
+        storage.clear_all()
+        for f in doc.proxies():
+            storage.insert(None, f)
+    return doc
+
+
+def test_lazy_open_is_not_read_on_gui_thread(tmp_path, monkeypatch):
+    path = str(tmp_path / "doc.figb")
+    factory.save_binary([Line(i, i, i + 5, i + 9) for i in range(200)], path)
+    storage = FigureStorage()
+    journal = autosave.Journal(storage, directory=str(tmp_path / "autosave"))
+    journal.start()
+    reads = []
+    item = LazyDocument.item
+    monkeypatch.setattr(LazyDocument, "item", lambda self, i: reads.append(i) or item(self, i))
+    doc = _load_lazy(storage, path)
+    storage.add(Rectangle(1, 2, 30, 40))
+    journal.flush()
+    assert reads == []
+    expected = _items(storage.get_all())
+    # сохранение подменяет файл: у журнала остаётся отображение прежнего
+    factory.save_binary([Line(0, 0, 1, 1)], path)
+    journal.close(discard=False)
+    assert _items(autosave.recover(str(tmp_path / "autosave"))) == expected
+    doc.close()
+
+
+def test_replaced_file_falls_back_to_items(tmp_path):
+    path = str(tmp_path / "doc.figb")
+    factory.save_binary([Line(i, i, i + 5, i + 9) for i in range(20)], path)
+    storage = FigureStorage()
+    journal = autosave.Journal(storage, directory=str(tmp_path / "autosave"))
+    journal.start()
+    doc = factory.open_lazy(path)
+    # файл на диске уже не тот, что отображён заглушками — элементы берутся из документа сразу
+    factory.save_binary([Line(0, 0, 1, 1)], path)
+    with storage.batch():
+        for f in doc.proxies():
+            storage.insert(None, f)
+    expected = _items(storage.get_all())
+    journal.close(discard=False)
+    assert _items(autosave.recover(str(tmp_path / "autosave"))) == expected
+    doc.close()
@@ -0,0 +1,79 @@
+"""Двоичный формат (.figb): круговое преобразование всех видов фигур и групп, индекс bounds."""
+import json
+
+import pytest
+from PyQt6.QtGui import QColor
+
+import binary_format
+import factory
+from figures import Point, Line, Rectangle, Square, Circle, Ellipse, Triangle, FigureGroup
+from settings import DrawEssentials
+
+STYLES = [DrawEssentials(pen_color=QColor(10, 20, 30), brush_color=QColor(200, 100, 50, 100), pen_width=1),
+          DrawEssentials(pen_color=QColor(255, 0, 0, 128), pen_width=7, radius=3)]
+
+
+def _primitives(style):
+    return [Point(5, -7, ess=style), Line(0, 0, -300, 40, ess=style), Rectangle(10, 20, -30, 400, ess=style),
+            Square(50, 50, 150, 60, ess=style), Circle(100, 100, 130, 90, ess=style),
+            Ellipse(-50, 60, 10, 200, ess=style), Triangle(0, 0, 100, 0, 50, -80, ess=style)]
+
+
+def _scene() -> list:
+    figs = _primitives(STYLES[0]) + _primitives(STYLES[1])
+    inner = FigureGroup([Line(1, 2, 3, 4, ess=STYLES[1]), Point(9, 9, ess=STYLES[0])], ess=STYLES[1])
+    figs.append(FigureGroup([Circle(0, 0, 5, 5, ess=STYLES[0]), inner, Triangle(1, 1, 9, 1, 5, 7)], ess=STYLES[0]))
+    return figs
+
+
+def _plain(data):
+    # JSON читает цвета списками, двоичный формат — кортежами
+    return json.loads(json.dumps(data))
+
+
+def test_json_figb_json_roundtrip():
+    text = factory.to_json(_scene())
+    again = factory.to_json(factory.from_binary(factory.to_binary(factory.from_json(text))))
+    assert json.loads(again) == json.loads(text)
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_items_roundtrip(indexed):
+    figs = _scene()
+    items, bounds = factory.snapshot(figs, binary=True)
+    data = binary_format.encode(items, bounds if indexed else None)
+    assert binary_format.is_binary(data[:binary_format.HEADER_SIZE])
+    assert binary_format.is_indexed(data[:binary_format.HEADER_SIZE]) is indexed
+    assert _plain(binary_format.decode(data)) == _plain(items)
+    assert [f.to_dict() for f in factory.from_binary(data)] == [f.to_dict() for f in figs]
+
+
+def test_document_rows_match_figures():
+    figs = _scene()
+    doc = binary_format.Document(factory.to_binary(figs))
+    assert len(doc) == len(figs)
+    for i, f in enumerate(figs):
+        b = f.bounds()
+        assert doc.bounds(i) == (b.x(), b.y(), b.width(), b.height()), type(f).__name__
+        assert doc.type_name(i) == type(f).__name__
+        assert _plain(doc.item(i)) == _plain(factory._item(f))
+    # по номеру в любом порядке — чтение одной записи не зависит от предыдущей
+    assert _plain(doc.item(3)) == _plain(factory._item(figs[3]))
+    doc.release()
+
+
+def test_document_requires_index():
+    with pytest.raises(RuntimeError):
+        binary_format.Document(binary_format.encode(factory._items(_scene())))
+
+
+def test_values_outside_i32_and_empty():
+    odd = [{"_type": "Line", "ess": None, "x1": 2 ** 40, "y1": 1.5, "x2": None, "y2": "текст"}]
+    assert _plain(binary_format.decode(binary_format.encode(odd))) == odd
+    assert binary_format.decode(binary_format.encode([])) == []
+
+
+def test_truncated_document_is_rejected():
+    data = factory.to_binary(_scene())
+    with pytest.raises(RuntimeError):
+        binary_format.decode(data[:len(data) // 2])
@@ -0,0 +1,49 @@
+"""Слой перетаскивания холста: по его окончании перерисовывается только область движущихся фигур."""
+from PyQt6.QtCore import QPoint, QRect, Qt
+from PyQt6.QtTest import QTest
+
+from canvas_widget import Canvas
+from figures import Rectangle
+from settings import DrawSettings
+from storage import FigureStorage
+
+
+def _canvas(monkeypatch, *figures):
+    storage = FigureStorage()
+    for f in figures:
+        storage.add(f)
+    canvas = Canvas(DrawSettings(), storage)
+    canvas.resize(400, 400)
+    canvas.show()
+    updates = []
+    monkeypatch.setattr(canvas, "update", lambda *args: updates.append(args[0] if args else None))
+    return canvas, storage, updates
+
+
+def _margin(rect: QRect) -> QRect:
+    m = FigureStorage.DAMAGE_MARGIN
+    return rect.adjusted(-m, -m, m, m)
+
+
+def test_click_repaints_only_moving_figure(monkeypatch):
+    near, far = Rectangle(10, 10, 50, 50), Rectangle(300, 300, 350, 350)
+    canvas, storage, updates = _canvas(monkeypatch, near, far)
+    QTest.mouseClick(canvas, Qt.MouseButton.LeftButton, pos=QPoint(10, 30))
+    assert storage.get_selected() == [near]
+    assert updates and None not in updates
+    assert all(_margin(near.bounds()).contains(r) for r in updates)
+
+
+def test_other_change_during_drag_repaints_its_damage(monkeypatch):
+    near = Rectangle(10, 10, 50, 50)
+    canvas, storage, updates = _canvas(monkeypatch, near)
+    QTest.mousePress(canvas, Qt.MouseButton.LeftButton, pos=QPoint(10, 30))
+    assert canvas._static_layer is not None
+    updates.clear()
+    added = Rectangle(200, 200, 250, 250)
+    storage.add(added)
+    # слой сброшен, перерисованы и движущаяся фигура, и добавленная
+    assert canvas._static_layer is None
+    assert any(_margin(near.bounds()) == r for r in updates)
+    assert any(r is not None and r.contains(added.bounds()) for r in updates)
+    QTest.mouseRelease(canvas, Qt.MouseButton.LeftButton, pos=QPoint(10, 30))
@@ -0,0 +1,45 @@
+"""Canvas не даёт уменьшить окно так, что нарисованная фигура обрежется (охват — scene_rect хранилища)."""
+from PyQt6.QtCore import QRect, QSize
+
+import canvas_widget
+from canvas_widget import Canvas
+from figures import Square, Rectangle
+from settings import DrawSettings
+from storage import FigureStorage
+
+
+def _canvas(monkeypatch, *figures) -> Canvas:
+    monkeypatch.setattr(canvas_widget.QMessageBox, "information", lambda *args: None)
+    storage = FigureStorage()
+    for f in figures:
+        storage.add(f)
+    canvas = Canvas(DrawSettings(), storage)
+    canvas.resize(400, 400)
+    canvas.show()
+    return canvas
+
+
+def test_scene_rect_covers_drawn_square():
+    storage = FigureStorage()
+    square = Square(50, 50, 150, 60)
+    storage.add(square)
+    # квадрат 100x100 от (50, 50), а не прямоугольник по двум точкам
+    assert storage.scene_rect().contains(QRect(50, 50, 101, 101))
+
+
+def test_resize_keeps_square_visible(monkeypatch):
+    canvas = _canvas(monkeypatch, Square(50, 50, 150, 60))
+    # по точкам построения хватило бы высоты 100, но квадрат доходит до y = 150
+    canvas.resize(300, 100)
+    assert canvas.size() == QSize(400, 400)
+    canvas.resize(300, 200)
+    assert canvas.size() == QSize(300, 200)
+    canvas.close()
+
+
+def test_resize_allowed_when_figures_fit(monkeypatch):
+    canvas = _canvas(monkeypatch, Rectangle(10, 10, 60, 60))
+    canvas.resize(120, 120)
+    assert canvas.size() == QSize(120, 120)
+    assert canvas.settings.csize == QSize(120, 120)
+    canvas.close()
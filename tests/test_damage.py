@@ -0,0 +1,62 @@
+"""Всё, что рисует фигура (штрих любой толщины, рамка выделения), лежит в bounds() + DAMAGE_MARGIN."""
+import random
+
+import pytest
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPainter
+
+from figures import Point, Line, Rectangle, Square, Circle, Ellipse, Triangle, FigureGroup
+from storage import FigureStorage
+
+SIZE = 800
+
+
+def _figure(rnd: random.Random):
+    c = lambda: rnd.randint(150, SIZE - 150)
+    kind = rnd.choice([Point, Line, Rectangle, Square, Circle, Ellipse, Triangle])
+    if kind is Point:
+        f = Point(c(), c())
+    elif kind is Triangle:
+        f = Triangle(c(), c(), c(), c(), c(), c())
+    elif kind in (Circle, Ellipse):
+        x, y = c(), c()
+        f = kind(x, y, x + rnd.randint(0, 100), y + rnd.randint(0, 100))
+    else:
+        f = kind(c(), c(), c(), c())
+    f.restyle(pen_width=rnd.choice([1, 3, 12, 13, 25, 40]))
+    return f
+
+
+def _outside_damage(fig) -> bool:
+    """Есть ли непрозрачные пиксели вне bounds() + DAMAGE_MARGIN."""
+    image = QImage(SIZE, SIZE, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    fig.draw(painter)
+    m = FigureStorage.DAMAGE_MARGIN
+    # стираем допустимую область — остаться должна пустая картинка
+    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
+    painter.fillRect(fig.bounds().adjusted(-m, -m, m, m), Qt.GlobalColor.transparent)
+    painter.end()
+    empty = QImage(SIZE, SIZE, QImage.Format.Format_ARGB32_Premultiplied)
+    empty.fill(Qt.GlobalColor.transparent)
+    return image != empty
+
+
+@pytest.mark.parametrize("selected", [False, True])
+def test_painting_stays_inside_damage(selected):
+    rnd = random.Random(2)
+    for _ in range(150):
+        f = _figure(rnd)
+        f.selected = selected
+        assert not _outside_damage(f), (type(f).__name__, f.pen_width, f.bounds())
+
+
+def test_group_painting_stays_inside_damage():
+    rnd = random.Random(3)
+    for _ in range(30):
+        g = FigureGroup([_figure(rnd), _figure(rnd)])
+        g.restyle(pen_width=rnd.choice([1, 20, 40]))
+        g.selected = True
+        assert not _outside_damage(g)
@@ -0,0 +1,85 @@
+"""Фоновые сохранение и загрузка (file_tasks.FileTask): результат, ошибка, отмена."""
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+import factory
+import file_tasks
+from figures import Line, Rectangle
+
+
+def _run(task: file_tasks.FileTask, cancel: bool = False) -> dict:
+    """Запустить задачу и дождаться её сигналов; ключ — имя пришедшего сигнала."""
+    got = {}
+    task.done.connect(lambda result: got.setdefault("done", result))
+    task.failed.connect(lambda e: got.setdefault("failed", e))
+    task.cancelled.connect(lambda: got.setdefault("cancelled", True))
+    if cancel:
+        task.cancel()
+    task.start()
+    task.wait()
+    # сигналы из пула приходят очередью — доставляем их
+    QCoreApplication.processEvents()
+    return got
+
+
+def _figures() -> list:
+    return [Line(i, 0, i + 10, 10) if i % 2 else Rectangle(i, i, 5, 5) for i in range(3 * factory.LOAD_CHUNK)]
+
+
+@pytest.mark.parametrize("name", ["doc.json", "doc.figb"])
+def test_save_and_load(tmp_path, name):
+    figs = _figures()
+    path = str(tmp_path / name)
+    assert _run(file_tasks.save(figs, path)) == {"done": path}
+    got = _run(file_tasks.load(path, lazy=False))
+    assert [f.to_dict() for f in got["done"]] == [f.to_dict() for f in figs]
+
+
+@pytest.mark.parametrize("name", ["doc.json", "doc.figb"])
+def test_cancelled_save_keeps_old_file(tmp_path, name):
+    path = tmp_path / name
+    save = factory.save_binary if name.endswith(".figb") else factory.save
+    save([Line(0, 0, 1, 1)], str(path))
+    before = path.read_bytes()
+    assert _run(file_tasks.save(_figures(), str(path)), cancel=True) == {"cancelled": True}
+    assert path.read_bytes() == before
+    assert not (tmp_path / (name + ".tmp")).exists()
+
+
+def test_cancelled_load(tmp_path):
+    path = str(tmp_path / "doc.json")
+    factory.save(_figures(), path)
+    assert _run(file_tasks.load(path), cancel=True) == {"cancelled": True}
+
+
+def test_failed_load(tmp_path):
+    got = _run(file_tasks.load(str(tmp_path / "missing.json")))
+    assert isinstance(got.get("failed"), FileNotFoundError) and "done" not in got
+    bad = tmp_path / "bad.json"
+    bad.write_text('[{"_type": "NoSuchFigure"}]')
+    assert isinstance(_run(file_tasks.load(str(bad))).get("failed"), RuntimeError)
+
+
+def test_failed_save_keeps_old_file(tmp_path):
+    path = tmp_path / "doc.json"
+    factory.save([Line(0, 0, 1, 1)], str(path))
+    before = path.read_bytes()
+    # каталог на месте временного файла — запись падает
+    (tmp_path / "doc.json.tmp").mkdir()
+    got = _run(file_tasks.save(_figures(), str(path)))
+    assert isinstance(got.get("failed"), OSError)
+    assert path.read_bytes() == before
+
+
+def test_load_chunks_arrive_before_done(tmp_path):
+    figs = _figures()
+    path = str(tmp_path / "doc.json")
+    factory.save(figs, path)
+    task = file_tasks.load(path, lazy=False)
+    chunks = []
+    # на момент done все порции уже пришли
+    task.chunk.connect(chunks.append)
+    task.done.connect(lambda result: chunks.append(None))
+    got = _run(task)
+    assert len(chunks) == 4 and chunks[-1] is None
+    assert [f for chunk in chunks[:-1] for f in chunk] == got["done"]
@@ -0,0 +1,41 @@
+"""GroupCommand: группировка только фигур хранилища, undo на прежние места, связи снимаются через хранилище."""
+import pytest
+
+from commands import CommandManager, GroupCommand
+from figures import FigureGroup, Line, Rectangle
+from storage import FigureStorage
+
+
+def _storage(n=4):
+    storage = FigureStorage(cmd_manager=CommandManager())
+    figs = [Rectangle(10 * i, 10 * i, 10 * i + 5, 10 * i + 5) for i in range(n)]
+    for f in figs:
+        storage.add(f)
+    return storage, figs
+
+
+def test_figures_outside_storage_are_skipped():
+    storage, figs = _storage()
+    stray = Line(0, 0, 5, 5)
+    cmd = GroupCommand(storage, [figs[3], stray, figs[1]], None)
+    assert cmd.figures == [figs[3], figs[1]] and cmd.indices == [3, 1]
+    storage.cmd_manager.do(cmd)
+    assert storage.get_all() == [figs[0], figs[2], cmd.group]
+    storage.cmd_manager.undo()
+    assert storage.get_all() == figs
+
+
+def test_too_few_stored_figures():
+    storage, figs = _storage()
+    with pytest.raises(ValueError):
+        GroupCommand(storage, [figs[0], Line(0, 0, 5, 5)], None)
+
+
+def test_links_removed_through_storage():
+    storage, figs = _storage()
+    storage._link(figs[0], figs[3])
+    storage.cmd_manager.do(GroupCommand(storage, figs[:2], None))
+    assert not figs[0].get_observers()
+    # обратная связь хранилища тоже снята: figs[3] больше ни за кем не наблюдает
+    assert figs[0] not in storage._FigureStorage__observed_in.get(figs[3], ())
+    assert isinstance(storage.get_all()[-1], FigureGroup)
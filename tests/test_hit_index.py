@@ -0,0 +1,103 @@
+"""figure_at/figures_at через сетку хранилища совпадают с перебором hit_test по всем фигурам."""
+import random
+
+import pytest
+from PyQt6.QtCore import QRect
+
+from figures import Point, Line, Rectangle, Square, Circle, Ellipse, Triangle, FigureGroup
+from storage import FigureStorage
+
+SIZE = 600
+
+
+def _figure(rnd: random.Random):
+    c = lambda: rnd.randint(0, SIZE)
+    kind = rnd.choice([Point, Line, Rectangle, Square, Circle, Ellipse, Triangle])
+    if kind is Point:
+        f = Point(c(), c())
+    elif kind is Triangle:
+        f = Triangle(c(), c(), c(), c(), c(), c())
+    else:
+        f = kind(c(), c(), c(), c())
+    # толстые перья — там, где штрих дальше всего выходит за геометрию
+    f.restyle(pen_width=rnd.choice([1, 2, 5, 12, 20, 40]))
+    return f
+
+
+def _scene(seed: int, n: int = 80) -> FigureStorage:
+    rnd = random.Random(seed)
+    storage = FigureStorage()
+    for _ in range(n):
+        storage.add(_figure(rnd))
+    for _ in range(3):
+        storage.add(FigureGroup([_figure(rnd), _figure(rnd)]))
+    return storage
+
+
+def _linear(storage, x, y) -> list:
+    return [f for f in reversed(storage.get_all()) if f.hit_test(x, y)]
+
+
+def _probes(storage, rnd: random.Random, n: int):
+    # случайные точки плюс точки у краёв bounds(), где промахивалась сетка
+    for _ in range(n):
+        yield rnd.randint(-60, SIZE + 60), rnd.randint(-60, SIZE + 60)
+    for f in storage.get_all():
+        b = f.bounds()
+        for x in (b.left() - 1, b.left(), b.left() + 3, b.center().x(), b.right() - 3, b.right(), b.right() + 1):
+            for y in (b.top() - 1, b.top(), b.top() + 3, b.center().y(), b.bottom() - 3, b.bottom(), b.bottom() + 1):
+                yield x, y
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_figure_at_matches_linear_scan(seed):
+    storage = _scene(seed)
+    rnd = random.Random(seed)
+    for x, y in _probes(storage, rnd, 800):
+        expected = _linear(storage, x, y)
+        assert storage.figures_at(x, y) == expected, (x, y)
+        assert storage.figure_at(x, y) is (expected[0] if expected else None), (x, y)
+
+
+def test_hit_reach_inside_bounds():
+    rnd = random.Random(1)
+    for _ in range(300):
+        f = _figure(rnd)
+        b = f.bounds()
+        for _ in range(200):
+            x, y = rnd.randint(-100, SIZE + 100), rnd.randint(-100, SIZE + 100)
+            if f.hit_test(x, y):
+                assert b.contains(x, y), (f, f.get_points() if hasattr(f, "get_points") else None, x, y)
+
+
+def test_circle_rim_over_figure_below():
+    storage = FigureStorage()
+    below = Rectangle(100, 100, 200, 200)
+    circle = Circle(489, 164, 165, 276)
+    storage.add(below)
+    storage.add(circle)
+    assert circle.hit_test(162, 148)
+    assert storage.figure_at(162, 148) is circle
+
+
+def test_moved_figures_stay_findable():
+    storage = _scene(11, 40)
+    rnd = random.Random(11)
+    for _ in range(20):
+        figs = rnd.sample(storage.get_all(), 5)
+        storage.move(figs, rnd.randint(-30, 30), rnd.randint(-30, 30), QRect(-1000, -1000, 3000, 3000))
+        for x, y in _probes(storage, rnd, 200):
+            assert storage.figure_at(x, y) is next(iter(_linear(storage, x, y)), None), (x, y)
+
+
+def test_square_found_over_its_drawn_area():
+    # Square рисуется квадратом по наибольшей стороне — ниже второй точки построения
+    storage = FigureStorage()
+    square = Square(50, 50, 150, 60)
+    storage.add(square)
+    assert square.hit_test(100, 140)
+    assert storage.figure_at(100, 140) is square
+    storage.move([square], 200, 200, QRect(0, 0, 1000, 1000))
+    assert storage.figure_at(100, 140) is None
+    assert storage.figure_at(300, 340) is square
+    assert storage.figures_in(QRect(290, 330, 20, 20)) == [square]
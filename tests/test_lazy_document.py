@@ -0,0 +1,98 @@
+"""Ленивое открытие .figb: в хранилище лёгкие строки индекса, фигуры строятся по обращению, документ закрывается."""
+import json
+
+from PyQt6.QtCore import QRect, QItemSelectionModel
+
+import factory
+from figures import Figure, Rectangle, Line, FigureGroup
+from lazy_document import LazyFigure
+from storage import FigureStorage
+from tree_view import TreeView
+
+
+def _doc(tmp_path, n=50):
+    figs = [Rectangle(10 * i, 10 * i, 10 * i + 5, 10 * i + 5) for i in range(n)] + \
+           [FigureGroup([Line(0, 0, 5, 5), Line(600, 600, 610, 620)])]
+    path = str(tmp_path / "doc.figb")
+    factory.save_binary(figs, path)
+    return path, json.loads(factory.to_json(figs))
+
+
+def _open(storage, path):
+    doc = factory.open_lazy(path)
+    with storage.batch():
+        storage.clear_all()
+        for f in doc.proxies():
+            storage.insert(None, f)
+    return doc
+
+
+def test_rows_are_not_figures_until_touched(tmp_path):
+    path, expected = _doc(tmp_path)
+    storage = FigureStorage()
+    TreeView(storage)
+    doc = _open(storage, path)
+    rows = storage.get_all()
+    assert all(type(f) is LazyFigure for f in rows)
+    assert not hasattr(rows[0], "__dict__")
+    touched = storage.figures_in(QRect(0, 0, 25, 25))
+    assert touched and all(isinstance(f, Figure) for f in touched)
+    assert sum(isinstance(f, LazyFigure) for f in storage.get_all()) == len(rows) - len(touched)
+    assert json.loads(factory.to_json(storage.get_all())) == expected
+    assert not doc.closed
+
+
+def test_document_closed_when_replaced(tmp_path):
+    path, _ = _doc(tmp_path)
+    storage = FigureStorage()
+    first = _open(storage, path)
+    second = _open(storage, path)
+    assert first.closed and not second.closed
+    storage.clear_all()
+    assert second.closed
+    assert storage.scene_rect().isNull()
+
+
+def test_document_closed_when_last_row_materialized(tmp_path):
+    path, expected = _doc(tmp_path, 5)
+    storage = FigureStorage()
+    doc = _open(storage, path)
+    storage.figures_in(QRect(-1000, -1000, 3000, 3000))
+    assert doc.closed
+    assert not any(isinstance(f, LazyFigure) for f in storage.get_all())
+    assert json.loads(factory.to_json(storage.get_all())) == expected
+
+
+def test_tree_selects_lazy_row(tmp_path):
+    path, _ = _doc(tmp_path)
+    storage = FigureStorage()
+    view = TreeView(storage)
+    _open(storage, path)
+    flags = QItemSelectionModel.SelectionFlag
+    view.selectionModel().select(view.tree_model.index(7, 0), flags.Select | flags.Rows)
+    (fig,) = storage.get_selected()
+    assert isinstance(fig, Rectangle) and storage.index_of(fig) == 7
+    assert view.tree_model.index(7, 0).internalPointer() is fig
+
+
+def test_kept_document_can_be_restored(tmp_path):
+    # отменённая загрузка: строки старого документа возвращаются в хранилище
+    path, expected = _doc(tmp_path)
+    storage = FigureStorage()
+    doc = _open(storage, path)
+    old = list(storage.get_all())
+    storage.keep_documents(True)
+    storage.clear_all()
+    assert not doc.closed
+    with storage.batch():
+        for f in old:
+            storage.insert(None, f)
+    storage.keep_documents(False)
+    assert not doc.closed and storage.scene_rect() == doc.extent()
+    assert json.loads(factory.to_json(storage.get_all())) == expected
+    # загрузка закончилась: старый документ без строк закрывается, когда хранение снято
+    storage.keep_documents(True)
+    _open(storage, path)
+    assert not doc.closed
+    storage.keep_documents(False)
+    assert doc.closed
@@ -0,0 +1,81 @@
+"""Загрузка в пуле процессов (parallel_load) даёт те же фигуры, что и factory.load, во всех форматах."""
+import json
+import random
+
+import pytest
+from PyQt6.QtGui import QColor
+
+import binary_format
+import factory
+import file_tasks
+import parallel_load
+from figures import Point, Line, Rectangle, Square, Circle, Ellipse, Triangle, FigureGroup
+from settings import DrawEssentials
+
+
+def _scene(n: int = 300, seed: int = 3) -> list:
+    rnd = random.Random(seed)
+    styles = [DrawEssentials(pen_color=QColor(rnd.randrange(256), 0, 0), pen_width=rnd.randint(1, 6)) for _ in range(5)]
+    kinds = [Line, Rectangle, Square, Circle, Ellipse]
+    figs = []
+    for i in range(n):
+        ess = rnd.choice(styles)
+        c = [rnd.randint(-500, 500) for _ in range(6)]
+        if i % 25 == 0:
+            figs.append(FigureGroup([Point(c[0], c[1], ess=ess), Triangle(*c, ess=ess)], ess=ess))
+        else:
+            figs.append(rnd.choice(kinds)(*c[:4], ess=ess))
+    return figs
+
+
+def _dump(figs) -> str:
+    return json.dumps([factory._item(f) for f in figs], sort_keys=True)
+
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("parallel")
+    figs = _scene()
+    paths = {"json": tmp / "doc.json", "figb": tmp / "doc.figb", "figb v1": tmp / "doc-v1.figb"}
+    factory.save(figs, str(paths["json"]))
+    factory.save_binary(figs, str(paths["figb"]))
+    paths["figb v1"].write_bytes(binary_format.encode(factory._items(figs)))
+    return figs, paths
+
+
+@pytest.mark.parametrize("kind", ["json", "figb", "figb v1"])
+def test_same_as_sequential(files, kind):
+    figs, paths = files
+    path = str(paths[kind])
+    seen = []
+    # мелкие порции: несколько задач на процесс, порядок документа должен сохраниться
+    chunks = list(parallel_load.iter_load(path, workers=2, chunk_size=40, progress=lambda *p: seen.append(p)))
+    got = [f for chunk in chunks for f in chunk]
+    assert len(chunks) > 2
+    assert _dump(got) == _dump(factory.load(path)) == _dump(figs)
+    assert seen[-1][0] == seen[-1][1]
+    # одинаковые стили — один объект, как и при обычной загрузке
+    assert len({id(f.ess) for f in got}) == len({f.ess for f in got})
+
+
+def test_file_task_uses_pool(files, monkeypatch):
+    figs, paths = files
+    # пул берётся для большого файла и при лишних ядрах — подставляем и то и другое
+    monkeypatch.setattr(parallel_load, "MIN_SIZE", 0)
+    monkeypatch.setattr(file_tasks.os, "cpu_count", lambda: 2)
+    used = []
+    real = parallel_load.iter_load
+
+    def iter_load(path, **kwargs):
+        used.append(path)
+        return real(path, **kwargs)
+    monkeypatch.setattr(parallel_load, "iter_load", iter_load)
+    got = file_tasks._load(str(paths["json"]), True, lambda chunk: None, progress=lambda *p: None, cancelled=lambda: False)
+    assert used and _dump(got) == _dump(figs)
+
+
+def test_bad_item_is_reported(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps([{"_type": "Line", "x1": "a", "y1": 0, "x2": 1, "y2": 1}]))
+    with pytest.raises(RuntimeError):
+        parallel_load.load(str(path), workers=1)
@@ -0,0 +1,37 @@
+"""Флажок selected в панели свойств меняет выделение хранилища, а не только флаг фигуры."""
+from figures import Rectangle
+from properties_panel import PropertiesPanel
+from storage import FigureStorage
+
+
+def test_selected_checkbox_deselects_in_storage():
+    storage = FigureStorage()
+    fig = Rectangle(10, 10, 50, 50)
+    storage.add(fig)
+    storage.select_figure(fig)
+    panel = PropertiesPanel(storage)
+    assert panel._editors["selected"].isChecked()
+
+    panel._editors["selected"].setChecked(False)
+
+    assert not fig.selected
+    assert storage.get_selected() == []
+    assert storage.selected_count() == 0
+
+
+def test_move_updates_editors_in_place():
+    storage = FigureStorage()
+    fig = Rectangle(10, 10, 50, 50)
+    storage.add(fig)
+    storage.select_figure(fig)
+    panel = PropertiesPanel(storage)
+    editors = dict(panel._editors)
+
+    storage.move([fig], 5, 7)
+
+    # те же виджеты, новые значения
+    assert panel._editors == editors
+    assert panel._editors["points"].text() == str(fig.points) == str([[15, 17], [55, 57]])
+
+    storage.refresh(fig)
+    assert panel._editors["points"] is not editors["points"]
@@ -0,0 +1,55 @@
+"""Кэш отрисовки (Figure.paint) не отстаёт от правок фигуры через хранилище."""
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPainter
+
+from figures import Defaults, Point, Circle, Rectangle, FigureGroup
+from storage import FigureStorage
+
+
+def _render(fig, cached: bool) -> QImage:
+    image = QImage(200, 200, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    fig.paint(painter) if cached else fig.draw(painter)
+    painter.end()
+    return image
+
+
+def test_cache_follows_radius_and_style(monkeypatch):
+    monkeypatch.setattr(Defaults, "RENDER_CACHE", True)
+    storage = FigureStorage()
+    figs = [Point(100, 100), Circle(100, 100, 130, 100), Rectangle(40, 40, 160, 120)]
+    for f in figs:
+        storage.add(f)
+        storage.select_figure(f)
+    # по одной правке за раз: любая правка стиля сбросила бы кэш и за соседнюю
+    for signal, value in ((storage.settings.radiusChanged, 9), (storage.settings.penWidthChanged, 7)):
+        before = [_render(f, cached=True) for f in figs]
+        signal.emit(value)
+        for f, old in zip(figs, before):
+            image = _render(f, cached=True)
+            assert image == _render(f, cached=False), (type(f).__name__, value)
+        assert any(_render(f, cached=True) != old for f, old in zip(figs, before))
+
+
+def test_only_groups_cached_by_default():
+    assert Defaults.RENDER_CACHE is False
+    rect = Rectangle(40, 40, 160, 120)
+    _render(rect, cached=True)
+    assert rect._picture is None
+
+
+def test_group_picture_moves_and_follows_children():
+    point = Point(100, 100)
+    group = FigureGroup([Rectangle(20, 20, 60, 50), point])
+    assert _render(group, cached=True) == _render(group, cached=False)
+    picture = group._picture
+    # сдвиг: та же картинка, нарисованная со смещением
+    group.change_position(15, 10)
+    assert _render(group, cached=True) == _render(group, cached=False)
+    assert group._picture is picture
+    # изменился ребёнок — картинка группы перезаписывается
+    point.radius = 12
+    assert group._picture is None
+    assert _render(group, cached=True) == _render(group, cached=False)
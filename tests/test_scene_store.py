@@ -0,0 +1,130 @@
+"""
+Запросы SceneStore по колонкам (hit_rows, topmost_at, rows_in, bounds_columns, ShapeHandle) совпадают
+с Figure.hit_test / bounds() фигур из тех же строк на случайных сценах, включая вырожденные фигуры
+и прямоугольники запроса.
+"""
+import random
+
+import pytest
+from PyQt6.QtCore import QRect, Qt
+from PyQt6.QtGui import QImage, QPainter
+
+import scene_store
+from figures import Figure
+from scene_store import SceneStore, KINDS, POINT, TRIANGLE
+
+SIZE = 300
+
+
+def _coords(rnd: random.Random, n: int) -> list:
+    c = lambda: rnd.randint(0, SIZE)
+    pts = [[c(), c()] for _ in range(n)]
+    degenerate = rnd.random()
+    if n > 1 and degenerate < 0.15:
+        pts[1] = list(pts[0])                      # точки совпали: нулевой размер/радиус
+    elif n > 1 and degenerate < 0.3:
+        pts[1][0] = pts[0][0]                      # вертикальный отрезок, нулевая ширина
+    elif n > 1 and degenerate < 0.4:
+        pts[1][1] = pts[0][1]                      # горизонтальный, нулевая высота
+    elif n == 3 and degenerate < 0.5:
+        pts[2] = [2 * pts[1][0] - pts[0][0], 2 * pts[1][1] - pts[0][1]]   # вырожденный треугольник
+    return [v for p in pts for v in p]
+
+
+def _store(seed: int, n: int = 150) -> SceneStore:
+    rnd = random.Random(seed)
+    store = SceneStore()
+    for _ in range(n):
+        code = rnd.randrange(len(KINDS))
+        npoints = 1 if code == POINT else 3 if code == TRIANGLE else 2
+        store.append(code, _coords(rnd, npoints))
+        store[-1].pen_width = rnd.choice([1, 2, 3, 9, 10, 25])
+    return store
+
+
+def _union(store: SceneStore) -> QRect:
+    rect = QRect()
+    for f in store.to_figures():
+        rect = f.bounds() if rect.isNull() else rect.united(f.bounds())
+    return rect
+
+
+def _rects(rnd: random.Random, n: int):
+    c = lambda: rnd.randint(-20, SIZE + 20)
+    d = lambda: rnd.randint(-SIZE // 2, SIZE // 2)
+    for _ in range(n):
+        yield QRect(c(), c(), d(), d())
+    for _ in range(n):
+        # нулевая ширина или высота, отрицательные размеры, пустой QRect
+        yield QRect(c(), c(), 0, d())
+        yield QRect(c(), c(), d(), 0)
+        yield QRect(c(), c(), -rnd.randint(1, 50), -rnd.randint(1, 50))
+    yield QRect()
+    yield QRect(5, 5, 0, 0)
+
+
+def _check(store: SceneStore, seed: int):
+    rnd = random.Random(seed)
+    handles = [h.figure() for h in store]
+    bounds = [h.bounds() for h in handles]
+    if scene_store.np is not None:
+        l, t, r, b = store.bounds_columns()
+        assert [QRect(*v) for v in zip(l.tolist(), t.tolist(), (r - l + 1).tolist(), (b - t + 1).tolist())] == bounds
+    points = [(rnd.randint(-30, SIZE + 30), rnd.randint(-30, SIZE + 30)) for _ in range(400)]
+    # и точки у самых краёв bounds(), где расходятся округления
+    for rect in bounds[:40]:
+        points += [(rect.left() - 1, rect.top()), (rect.left(), rect.center().y()), (rect.right(), rect.bottom()),
+                   (rect.right() + 1, rect.center().y()), (rect.center().x(), rect.bottom() + 1)]
+    for x, y in points:
+        expected = [row for row, h in enumerate(handles) if h.hit_test(x, y)]
+        assert store.hit_rows(x, y) == expected, (x, y)
+        assert store.topmost_at(x, y) == (expected[-1] if expected else None), (x, y)
+    for rect in _rects(rnd, 150):
+        assert store.rows_in(rect) == [i for i, b in enumerate(bounds) if b.intersects(rect)], rect
+        assert store.rows_in(rect, contained=True) == \
+            [i for i, b in enumerate(bounds) if Figure.is_fit_in_bounds(b, rect)], rect
+
+
+def test_handles_match_figures():
+    store = _store(0)
+    rnd = random.Random(0)
+    for h in store:
+        fig = h.figure()
+        assert h.bounds() == fig.bounds()
+        assert h.to_dict() == fig.to_dict()
+        assert (h.pen_width, h.radius) == (fig.pen_width, fig.radius)
+        b = fig.bounds()
+        for _ in range(40):
+            x, y = rnd.randint(b.left() - 3, b.right() + 3), rnd.randint(b.top() - 3, b.bottom() + 3)
+            assert h.hit_test(x, y) == fig.hit_test(x, y), (h, x, y)
+    assert store.bounds() == _union(store)
+
+
+def _render(paint) -> QImage:
+    image = QImage(SIZE + 100, SIZE + 100, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    paint(painter)
+    painter.end()
+    return image
+
+
+def test_paint_matches_figures():
+    import renderer
+    store = _store(4, 60)
+    store[3].selected = True
+    assert _render(store.paint) == _render(lambda p: renderer.paint_figures(p, store.to_figures()))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_batch_queries_match_scalar(seed):
+    pytest.importorskip("numpy")
+    _check(_store(seed), seed)
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_fallback_without_numpy_matches_scalar(seed, monkeypatch):
+    monkeypatch.setattr(scene_store, "np", None)
+    store = _store(seed, 60)
+    _check(store, seed)
+    assert store.bounds() == _union(store)
@@ -0,0 +1,72 @@
+"""Потоковая загрузка JSON (factory._JsonStream / iter_load): порции, границы буфера, порядок ключей."""
+import io
+import json
+
+import pytest
+
+import factory
+from figures import Point, Line, Rectangle, Circle, FigureGroup
+
+
+def _scene(n: int = 50) -> list:
+    figs = []
+    for i in range(n):
+        figs.append([Point(i, -i), Line(i, 0, 1234567 + i, 2.5 * i), Rectangle(0, i, 10, 20), Circle(i, i, 2 * i, 3)][i % 4])
+    figs.append(FigureGroup([Line(1, 2, 3, 4), FigureGroup([Point(7, 8), Point(9, 9)])]))
+    return figs
+
+
+def _dicts(figs) -> list:
+    return [f.to_dict() for f in figs]
+
+
+@pytest.fixture
+def small_buffer(monkeypatch):
+    # крошечный буфер: значения, числа и ключи рвутся на границах чтения
+    monkeypatch.setattr(factory, "_READ_SIZE", 7)
+
+
+def test_stream_matches_json(small_buffer):
+    doc = {"a": [1, -2.5e3, "строка", {"b": None}], "c": True, "figures": []}
+    stream = factory._JsonStream(io.StringIO(json.dumps(doc, indent=2)))
+    got = {}
+    for key in stream.members():
+        got[key] = stream.value()
+    stream.end()
+    assert got == doc
+
+
+def test_iter_load_chunks(tmp_path, small_buffer):
+    figs = _scene()
+    path = tmp_path / "doc.json"
+    factory.save(figs, str(path))
+    seen = []
+    chunks = list(factory.iter_load(str(path), chunk_size=8, progress=lambda done, total: seen.append((done, total))))
+    assert [len(c) for c in chunks[:-1]] == [8] * (len(chunks) - 1)
+    assert _dicts(f for c in chunks for f in c) == _dicts(figs)
+    assert seen[-1][0] == seen[-1][1] == path.stat().st_size
+
+
+def test_figures_before_styles(tmp_path, small_buffer):
+    # чужой порядок ключей: фигуры отдаются после разбора всего объекта
+    figs = _scene(10)
+    doc = json.loads(factory.to_json(figs))
+    path = tmp_path / "reordered.json"
+    path.write_text(json.dumps({"figures": doc["figures"], "styles": doc["styles"], "version": doc["version"]}))
+    assert _dicts(factory.load(str(path))) == _dicts(figs)
+
+
+def test_empty_documents(tmp_path):
+    for text in ("[]", '{"version": 2, "styles": [], "figures": []}'):
+        path = tmp_path / "empty.json"
+        path.write_text(text)
+        assert factory.load(str(path)) == []
+
+
+@pytest.mark.parametrize("text", ['[{"_type": "Point", "x": 1, "y": 2}', '{"version": 2, "figures": [] "styles": []}',
+                                  '[] []', '[{"_type": "Point", "x": 1, "y": 2} {}]'])
+def test_malformed_document(tmp_path, text):
+    path = tmp_path / "bad.json"
+    path.write_text(text)
+    with pytest.raises((RuntimeError, ValueError)):
+        factory.load(str(path))
@@ -0,0 +1,58 @@
+"""Интернирование стилей и палитра styles в документе v2; документы v1 читаются как раньше."""
+import json
+
+import pytest
+from PyQt6.QtGui import QColor
+
+import factory
+from figures import Line, Rectangle, Circle, FigureGroup
+from settings import DrawEssentials
+
+RED = DrawEssentials(pen_color=QColor(255, 0, 0), pen_width=3)
+BLUE = DrawEssentials(pen_color=QColor(0, 0, 255), brush_color=QColor(0, 0, 255, 60), radius=4)
+
+
+def _scene() -> list:
+    group = FigureGroup([Line(0, 0, 5, 5, ess=RED), Circle(10, 10, 20, 20, ess=BLUE)], ess=RED)
+    return [Rectangle(0, 0, 10, 10, ess=RED), Line(1, 1, 2, 2, ess=BLUE), Circle(5, 5, 9, 9, ess=RED), group]
+
+
+def test_equal_styles_are_shared():
+    a, b = Line(0, 0, 1, 1, ess=RED), Rectangle(0, 0, 1, 1, ess=DrawEssentials(pen_color=QColor(255, 0, 0), pen_width=3))
+    assert a.ess is b.ess
+    a.restyle(pen_width=5)
+    # copy-on-write: смена стиля одной фигуры не трогает другую
+    assert a.ess is not b.ess and b.ess.pen_width == 3
+    assert Circle(0, 0, 1, 1, ess=BLUE).ess is not b.ess
+
+
+def test_document_has_one_palette_entry_per_style():
+    doc = json.loads(factory.to_json(_scene()))
+    assert doc["version"] == factory.FORMAT_VERSION
+    assert len(doc["styles"]) == 2
+    figures = doc["figures"]
+    assert all("ess" not in item for item in figures)
+    assert [item["style"] for item in figures[:3]] == [0, 1, 0]
+    assert [child["style"] for child in figures[3]["figures"]] == [0, 1]
+
+
+def test_palette_roundtrip():
+    figs = _scene()
+    loaded = factory.from_json(factory.to_json(figs))
+    assert [f.to_dict() for f in loaded] == [f.to_dict() for f in figs]
+    # загруженные фигуры снова делят стили
+    assert loaded[0].ess is loaded[2].ess is figs[0].ess
+
+
+def test_v1_document_still_loads(tmp_path):
+    figs = _scene()
+    v1 = json.dumps(factory._items(figs))
+    assert [f.to_dict() for f in factory.from_json(v1)] == [f.to_dict() for f in figs]
+    path = tmp_path / "old.json"
+    path.write_text(v1, encoding="utf-8")
+    assert [f.to_dict() for f in factory.load(str(path))] == [f.to_dict() for f in figs]
+
+
+def test_unknown_version_is_rejected():
+    with pytest.raises(RuntimeError):
+        factory.from_json(json.dumps({"version": 99, "styles": [], "figures": []}))
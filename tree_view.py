@@ -1,23 +1,233 @@
-from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem
-from PyQt6.QtCore import Qt
+import weakref
+from PyQt6.QtWidgets import QTreeView, QAbstractItemView
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, QItemSelection, QItemSelectionModel
 from observer import Observer
 from figures import FigureGroup, Figure
 from commands import DeleteCommand
+from lazy_document import LazyFigure
 
 
-class TreeView(QTreeWidget, Observer):
+def _runs(cs):
+    """
+    Изменения ChangeSet по порядку, соседние вставки/удаления смежных строк склеены:
+    (вид, первая строка, фигуры по строкам, изменение). Загрузка и clear_all — по одному блоку.
+    """
+    kind = row = None
+    figs: list = []
+    # удаление сверху вниз (delete_selected, clear_all) копится в обратном порядке и разворачивается в конце
+    descending = False
+    for c in cs.changes:
+        if figs and c.row is not None and c.kind == kind:
+            if kind == cs.ADDED and c.row == row + len(figs):
+                figs.append(c.figure)
+                continue
+            if kind == cs.REMOVED and c.row == row - 1 and (descending or len(figs) == 1):
+                row = c.row
+                descending = True
+                figs.append(c.figure)
+                continue
+            if kind == cs.REMOVED and c.row == row and not descending:
+                figs.append(c.figure)
+                continue
+        if figs:
+            yield kind, row, figs[::-1] if descending else figs, None
+            figs = []
+        descending = False
+        if c.kind in (cs.ADDED, cs.REMOVED) and c.row is not None:
+            kind, row, figs = c.kind, c.row, [c.figure]
+        else:
+            yield c.kind, c.row, [c.figure], c
+    if figs:
+        yield kind, row, figs[::-1] if descending else figs, None
+
+
+class FigureTreeModel(QAbstractItemModel):
+    """
+    Модель дерева фигур: верхний уровень — фигуры хранилища, дети — содержимое групп.
+    Держит собственную копию строк и меняет её только через begin/end*Rows,
+    поэтому каждое событие хранилища стоит O(изменённого), а не O(всех фигур).
+    """
     def __init__(self, storage, parent=None):
         super().__init__(parent)
         self.storage = storage
-        self.setHeaderLabels(["TreeView"])
-        self.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
+        self._rows: list = list(storage.get_all())
+        self._row_of: dict | None = None
+        # group -> копия списка детей (заводится лениво, когда вид раскрывает группу)
+        self._kids = weakref.WeakKeyDictionary()
+        self._parent_of = weakref.WeakKeyDictionary()
+
+    # --- служебные методы ---
+    def _top_row(self, fig) -> int | None:
+        if self._row_of is None:
+            self._row_of = {f: i for i, f in enumerate(self._rows)}
+        return self._row_of.get(fig)
+
+    def _children(self, parent_fig) -> list:
+        if parent_fig is None:
+            return self._rows
+        if not isinstance(parent_fig, FigureGroup):
+            return []
+        kids = self._kids.get(parent_fig)
+        if kids is None:
+            kids = list(parent_fig.figures)
+            self._kids[parent_fig] = kids
+            for child in kids:
+                self._parent_of[child] = parent_fig
+        return kids
+
+    def figure_index(self, fig) -> QModelIndex:
+        row = self._top_row(fig)
+        if row is not None:
+            return self.createIndex(row, 0, fig)
+        group = self._parent_of.get(fig)
+        if group is None:
+            return QModelIndex()
+        parent = self.figure_index(group)
+        kids = self._kids.get(group)
+        if not parent.isValid() or not kids or fig not in kids:
+            return QModelIndex()
+        return self.createIndex(kids.index(fig), 0, fig)
+
+    # --- QAbstractItemModel ---
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        parent_fig = parent.internalPointer() if parent.isValid() else None
+        return self.createIndex(row, column, self._children(parent_fig)[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        fig = index.internalPointer()
+        if self._top_row(fig) is not None:
+            return QModelIndex()
+        group = self._parent_of.get(fig)
+        return self.figure_index(group) if group is not None else QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._children(parent.internalPointer() if parent.isValid() else None))
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        fig = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return fig.type_name if isinstance(fig, LazyFigure) else fig.__class__.__name__
+        if role == Qt.ItemDataRole.UserRole:
+            return fig
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        # выделять можно только фигуры верхнего уровня, детей группы — нет
+        if index.parent().isValid():
+            return Qt.ItemFlag.ItemIsEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return "TreeView"
+        return None
+
+    # --- реакции на события хранилища ---
+    def on_inserted(self, figs: list, row: int) -> int:
+        """Вставить подряд идущие фигуры начиная со строки row; вернуть фактическую строку."""
+        row = max(0, min(row, len(self._rows)))
+        self.beginInsertRows(QModelIndex(), row, row + len(figs) - 1)
+        if row == len(self._rows) and self._row_of is not None:
+            # добавление в конец (загрузка, вставка) позиций остальных не сдвигает
+            self._row_of.update(zip(figs, range(row, row + len(figs))))
+        else:
+            self._row_of = None
+        self._rows[row:row] = figs
+        self.endInsertRows()
+        return row
+
+    def on_removed(self, figs: list, row: int | None):
+        """Убрать фигуры, занимающие строки row, row+1, ...; при расхождении — по одной."""
+        n = len(figs)
+        if row is None or row < 0 or any(a is not b for a, b in zip(self._rows[row:row + n], figs)) \
+                or row + n > len(self._rows):
+            for fig in figs:
+                r = self._top_row(fig)
+                if r is not None:
+                    self._remove_rows(r, 1)
+            return
+        self._remove_rows(row, n)
+
+    def _remove_rows(self, row: int, n: int):
+        self.beginRemoveRows(QModelIndex(), row, row + n - 1)
+        if row + n == len(self._rows) and self._row_of is not None:
+            for fig in self._rows[row:]:
+                del self._row_of[fig]
+        else:
+            self._row_of = None
+        del self._rows[row:row + n]
+        self.endRemoveRows()
+
+    def on_replaced(self, old, new, row: int | None):
+        if row is None or not (0 <= row < len(self._rows)) or self._rows[row] is not old:
+            row = self._top_row(old)
+            if row is None:
+                return
+        old_idx = self.createIndex(row, 0, old)
+        self._rows[row] = new
+        if self._row_of is not None:
+            del self._row_of[old]
+            self._row_of[new] = row
+        new_idx = self.createIndex(row, 0, new)
+        # выделение и текущая строка вида держат индекс со ссылкой на заглушку — переводим на фигуру
+        self.changePersistentIndex(old_idx, new_idx)
+        self.dataChanged.emit(new_idx, new_idx)
+
+    def on_regrouped(self, group):
+        parent = self.figure_index(group)
+        old = self._kids.get(group)
+        if not parent.isValid() or old is None:
+            # вид ещё не раскрывал группу — дети прочитаются заново при запросе
+            self._kids.pop(group, None)
+            return
+        if old:
+            self.beginRemoveRows(parent, 0, len(old) - 1)
+            del self._kids[group]
+            self.endRemoveRows()
+        else:
+            del self._kids[group]
+        new = list(group.figures)
+        if new:
+            self.beginInsertRows(parent, 0, len(new) - 1)
+            self._children(group)
+            self.endInsertRows()
+
+    def on_changed(self, figures):
+        for fig in figures:
+            idx = self.figure_index(fig)
+            if idx.isValid():
+                self.dataChanged.emit(idx, idx)
+
+
+class TreeView(QTreeView, Observer):
+    def __init__(self, storage, parent=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.tree_model = FigureTreeModel(storage, self)
+        self.setModel(self.tree_model)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
 
         self._updating = False
 
         self.storage.add_observer(self)
-        self.itemSelectionChanged.connect(self._on_item_selection_changed)
+        self.selectionModel().selectionChanged.connect(self._on_view_selection_changed)
 
-        self._rebuild()
+        # начальное состояние: скрыть недорисованные и отразить текущее выделение
+        self._hide_unfinished(0, self.tree_model._rows)
+        self._sync_selection(self.storage.get_selected())
 
     def keyPressEvent(self, event):
         key = event.key()
@@ -27,75 +237,98 @@ class TreeView(QTreeWidget, Observer):
 
     # === update от storage ===
     def update(self, subject, event) -> None:
-        if subject is self.storage and not self._updating:
-            self._rebuild()
+        if subject is not self.storage or event.type != "changes":
+            return
+        cs = (event.payload or {}).get("changes")
+        if cs is None:
+            return
+        if self._updating:
+            # выделение из самого дерева могло заменить заглушку настоящей фигурой — строку надо поправить
+            for c in cs.of(cs.REPLACED):
+                self.tree_model.on_replaced(c.replaced, c.figure, c.row)
+            return
+        self._updating = True
+        try:
+            # структурные изменения проигрываем по порядку — строки в них согласованы друг с другом;
+            # перемещения дерево не интересуют
+            for kind, row, figs, c in _runs(cs):
+                if kind == cs.ADDED:
+                    row = self.tree_model.on_inserted(figs, len(self.tree_model._rows) if row is None else row)
+                    self._hide_unfinished(row, figs)
+                elif kind == cs.REMOVED:
+                    self.tree_model.on_removed(figs, row)
+                elif kind == cs.REORDERED:
+                    self.tree_model.on_regrouped(c.figure)
+                elif kind == cs.REPLACED:
+                    self.tree_model.on_replaced(c.replaced, c.figure, c.row)
+            restyled = cs.figures(cs.RESTYLED)
+            self.tree_model.on_changed(restyled)
+            for fig in restyled:
+                self._sync_hidden(fig)
+            # у новых строк выделения в виде нет — трогаем только выделенные из них
+            added = [f for f in cs.figures(cs.ADDED) if self.storage.is_selected(f)]
+            self._sync_selection(cs.figures(cs.SELECTION) + added)
+        finally:
+            self._updating = False
 
     # === служебные методы ===
-    @staticmethod
-    def _make_item(parent, item: Figure, selectable: bool) -> QTreeWidgetItem | None:
-        # Если у фигуры есть метод/атрибут finished, считаем её допустимой только если:
-        # - атрибут/метод отсутствует (тогда работаем), или
-        # - атрибут есть и равно True, или
-        # - атрибут — callable и возвращает True.
-        finished = getattr(item, "finished", None)
-        if callable(finished):
-            if not finished():
-                return None
-        elif finished is False:
-            return None
-
-        it = QTreeWidgetItem(parent, [item.__class__.__name__])
-        it.setData(0, Qt.ItemDataRole.UserRole, item)
+    def _sync_hidden(self, fig):
+        # недорисованные фигуры в дереве не показываем
+        idx = self.tree_model.figure_index(fig)
+        if idx.isValid():
+            self.setRowHidden(idx.row(), idx.parent(), getattr(fig, "finished", True) is False)
 
-        # настраиваем флаги
-        flags = it.flags()
-        if not selectable:
-            flags &= ~Qt.ItemFlag.ItemIsSelectable
-            print(Qt.ItemFlag.ItemIsSelectable)
-        it.setFlags(flags)
+    def _hide_unfinished(self, row: int, figs):
+        # строки row, row+1, ... только что вставлены и видимы; прячем лишь недорисованные
+        for k, fig in enumerate(figs):
+            if getattr(fig, "finished", True) is False:
+                self.setRowHidden(row + k, QModelIndex(), True)
 
+    def _sync_selection(self, figures):
+        # одно select() на всё выделение и одно на снятие; подряд идущие строки — одним диапазоном
+        rows = {True: [], False: []}
+        for fig in figures:
+            row = self.tree_model._top_row(fig)
+            if row is not None:
+                rows[self.storage.is_selected(fig)].append(row)
+        flags = QItemSelectionModel.SelectionFlag
+        for state, mode in ((False, flags.Deselect), (True, flags.Select)):
+            if rows[state]:
+                self.selectionModel().select(self._ranges(sorted(rows[state])), mode | flags.Rows)
 
-        if selectable and getattr(item, "selected", False):
-            it.setSelected(True)
+    def _ranges(self, rows: list) -> QItemSelection:
+        selection = QItemSelection()
+        model = self.tree_model
+        start = prev = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == prev + 1:
+                prev = row
+                continue
+            selection.select(model.createIndex(start, 0, model._rows[start]),
+                             model.createIndex(prev, 0, model._rows[prev]))
+            if row is not None:
+                start = prev = row
+        return selection
 
-        return it
-
-    def _rebuild(self):
-        self._updating = True
-        self.clear()
-
-        for fig in self.storage.get_all():
-            if isinstance(fig, FigureGroup):
-                # саму группу можно выделять
-                parent_item = self._make_item(self, fig, selectable=True)
-                # детей группы — нельзя
-                for child in fig.figures:
-                    self._make_item(parent_item, child, selectable=False)
-            else:
-                # одиночные фигуры на верхнем уровне — можно
-                self._make_item(self, fig, selectable=True)
-
-        self._updating = False
-
-    def _on_item_selection_changed(self):
+    def _on_view_selection_changed(self, selected, deselected):
         if self._updating:
             return
 
         self._updating = True
-
-        selected_figs = set()
-        for it in self.selectedItems():
-            fig = it.data(0, Qt.ItemDataRole.UserRole)
-            if isinstance(fig, Figure):
-                selected_figs.add(fig)
-
-        self.storage.deselect_all()
-        for fig in selected_figs:
-            if fig in self.storage.get_all():
-                self.storage.select_figure(fig, state=True)
-            else:
-                setattr(fig, "selected", True)
-
-        self.storage.canvas_updated.emit()
-
-        self._updating = False
+        try:
+            # применяем только разницу, без deselect_all + повторного выбора всех
+            for idx in deselected.indexes():
+                fig = idx.data(Qt.ItemDataRole.UserRole)
+                if isinstance(fig, (Figure, LazyFigure)):
+                    self.storage.select_figure(fig, state=False)
+            for idx in selected.indexes():
+                fig = idx.data(Qt.ItemDataRole.UserRole)
+                # строка ленивого документа: select_figure сам построит фигуру
+                if not isinstance(fig, (Figure, LazyFigure)):
+                    continue
+                if fig in self.storage:
+                    self.storage.select_figure(fig, state=True)
+                else:
+                    setattr(fig, "selected", True)
+        finally:
+            self._updating = False